@@ -0,0 +1,184 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import time
+
+import loop_monitor
+import metrics
+
+# Admission control for new calls (gateway /ws/media and POST /api/call/start).
+#
+# An overloaded gateway degrades every call at once (late audio, late barge-in), so new
+# calls are turned away before that point instead:
+# - max_calls: GATEWAY_MAX_CALLS media sessions admitted by this process (0 = no limit).
+#   Outbound calls started here hold a slot from create_call until ACS opens their
+#   media WebSocket (or GATEWAY_ADMISSION_RESERVE_S passes), so a burst of call starts
+#   can't oversubscribe the process.
+# - loop_lag: the smoothed event-loop lag (loop_monitor.lag_avg_ms) is above
+#   GATEWAY_MAX_LOOP_LAG_MS (0 = off). Shedding stops once it is back under half the
+#   threshold, so admission does not flap around the limit.
+#
+# A new media WebSocket may wait up to GATEWAY_ADMISSION_DEFER_MS for capacity before
+# it is rejected with HTTP 503 + Retry-After (before the WebSocket upgrade). Limits are
+# per process: with GATEWAY_WORKERS > 1 every worker applies them to its own calls.
+#
+# Reservations are only kept in single-process mode. With GATEWAY_WORKERS > 1 the
+# worker that handles POST /api/call/start is not, in general, the one SO_REUSEPORT
+# hands the call's media WebSocket (or its CallDisconnected callback) to, so a
+# reservation would be stranded on one worker while the call is counted again on
+# another. There /api/call/start only checks the worker's current capacity, and the
+# call takes its slot when the media WebSocket is admitted.
+
+MAX_CALLS = max(0, int(os.getenv("GATEWAY_MAX_CALLS", "0")))
+MAX_LOOP_LAG_MS = max(0.0, float(os.getenv("GATEWAY_MAX_LOOP_LAG_MS", "0")))
+DEFER_MS = max(0, int(os.getenv("GATEWAY_ADMISSION_DEFER_MS", "0")))
+RESERVE_S = max(1.0, float(os.getenv("GATEWAY_ADMISSION_RESERVE_S", "30")))
+RETRY_AFTER_S = max(1, int(os.getenv("GATEWAY_ADMISSION_RETRY_AFTER_S", "5")))
+# Workers inherit the supervisor's environment (unified_gateway.GATEWAY_WORKERS).
+RESERVATIONS = max(1, int(os.getenv("GATEWAY_WORKERS", "1"))) <= 1
+
+REASON_MAX_CALLS = "max_calls"
+REASON_LOOP_LAG = "loop_lag"
+
+_LAG_RESUME_FACTOR = 0.5
+_DEFER_POLL_S = 0.05
+
+
+class Admission:
+  """Process-wide call slots. Loop-side only (no locking)."""
+
+  __slots__ = ("max_calls", "max_lag_ms", "monitor", "reservations", "active", "admitted", "_reserved", "_shedding")
+
+  def __init__(
+    self,
+    max_calls: int = MAX_CALLS,
+    max_lag_ms: float = MAX_LOOP_LAG_MS,
+    monitor=None,
+    *,
+    reservations: bool = RESERVATIONS,
+  ):
+    self.max_calls = int(max_calls)
+    self.max_lag_ms = float(max_lag_ms)
+    self.monitor = monitor or loop_monitor.MONITOR
+    self.reservations = bool(reservations)
+    self.active = 0
+    self.admitted = 0
+    # key (callConnectionId, or a placeholder while create_call runs) -> expiry (monotonic)
+    self._reserved: dict[str, float] = {}
+    self._shedding = False
+
+  def _reserved_count(self) -> int:
+    if self._reserved:
+      now = time.monotonic()
+      for key in [k for k, exp in self._reserved.items() if exp <= now]:
+        del self._reserved[key]
+    return len(self._reserved)
+
+  def _lag_ms(self) -> float | None:
+    return self.monitor.lag_avg_ms if self.monitor.running else None
+
+  def reason(self) -> str | None:
+    """Why a new call would be rejected right now (None = admitted)."""
+    lag = self._lag_ms()
+    if self.max_lag_ms > 0 and lag is not None:
+      if self._shedding:
+        self._shedding = lag > self.max_lag_ms * _LAG_RESUME_FACTOR
+      else:
+        self._shedding = lag > self.max_lag_ms
+      if self._shedding:
+        return REASON_LOOP_LAG
+    else:
+      self._shedding = False
+    if self.max_calls > 0 and self.active + self._reserved_count() >= self.max_calls:
+      return REASON_MAX_CALLS
+    return None
+
+  def _reject(self, reason: str) -> str:
+    metrics.ADMISSION_REJECTED[reason].inc()
+    return reason
+
+  def try_acquire(self, call_id: str | None = None) -> str | None:
+    """Take a slot for a new media session; returns the rejection reason, or None.
+
+    A call reserved by `reserve()` takes over its reservation and is always admitted.
+    """
+    if call_id and self._reserved.pop(call_id, None) is not None:
+      self.active += 1
+      self.admitted += 1
+      return None
+    reason = self.reason()
+    if reason is not None:
+      return self._reject(reason)
+    self.active += 1
+    self.admitted += 1
+    return None
+
+  async def acquire(self, call_id: str | None = None, *, wait_ms: int = DEFER_MS) -> str | None:
+    """`try_acquire`, waiting up to `wait_ms` for capacity before rejecting."""
+    reason = self.reason() if not (call_id and call_id in self._reserved) else None
+    if reason is None or wait_ms <= 0:
+      return self.try_acquire(call_id)
+    metrics.ADMISSION_DEFERRED.inc()
+    deadline = time.monotonic() + wait_ms / 1000.0
+    while time.monotonic() < deadline:
+      await asyncio.sleep(_DEFER_POLL_S)
+      if self.reason() is None:
+        return self.try_acquire(call_id)
+    return self.try_acquire(call_id)
+
+  def release(self) -> None:
+    self.active = max(0, self.active - 1)
+
+  def reserve(self, key: str) -> str | None:
+    """Hold a slot for a call that is being started; returns the rejection reason, or None.
+
+    Without reservations (multi-worker) this only checks the current capacity.
+    """
+    reason = self.reason()
+    if reason is not None:
+      return self._reject(reason)
+    if self.reservations:
+      self._reserved[key] = time.monotonic() + RESERVE_S
+    return None
+
+  def rekey(self, key: str, call_id: str | None) -> None:
+    """The reservation `key` belongs to `call_id` (create_call returned)."""
+    exp = self._reserved.pop(key, None)
+    if exp is not None and call_id:
+      self._reserved[call_id] = exp
+
+  def unreserve(self, key: str) -> None:
+    self._reserved.pop(key, None)
+
+  def accepting(self) -> bool:
+    return self.reason() is None
+
+  def capacity(self) -> dict:
+    reason = self.reason()
+    reserved = self._reserved_count()
+    lag = self._lag_ms()
+    return {
+      "accepting": reason is None,
+      "reason": reason,
+      "activeCalls": self.active,
+      "reservedCalls": reserved,
+      "reservations": self.reservations,
+      "maxCalls": self.max_calls or None,
+      "availableCalls": max(0, self.max_calls - self.active - reserved) if self.max_calls else None,
+      "loopLagMs": round(lag, 1) if lag is not None else None,
+      "maxLoopLagMs": self.max_lag_ms or None,
+      "admittedTotal": self.admitted,
+      "rejectedTotal": {r: c.value for r, c in metrics.ADMISSION_REJECTED.items()},
+      "retryAfterS": RETRY_AFTER_S,
+    }
+
+
+ADMISSION = Admission()
+
+
+def _collect() -> None:
+  metrics.ADMISSION_ACCEPTING.set(1 if ADMISSION.accepting() else 0)
+
+
+metrics.REGISTRY.collector(_collect)
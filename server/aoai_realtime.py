@@ -1,47 +1,197 @@
-import os, json, base64, asyncio
+import os, json, asyncio
 from pathlib import Path
 import websockets
-from azure.identity import DefaultAzureCredential
+
+from aoai_token_provider import get_token_provider
+from media import codec
+from structured_log import log
 
 ENDPOINT = os.getenv("AZURE_OPENAI_ENDPOINT")  # https://<resource>.openai.azure.com (or wss://...)
 DEPLOYMENT = os.getenv("AZURE_OPENAI_DEPLOYMENT")  # 例: gpt-realtime
 API_KEY = os.getenv("AZURE_OPENAI_API_KEY")  # PoCはキー、推奨はEntra/MI [11](https://learn.microsoft.com/en-us/azure/ai-foundry/openai/supported-languages)
 VOICE = os.getenv("AOAI_VOICE", "sage")
 
+# Server-side turn detection sent in session.update. The media gateway's local VAD gate
+# derives its pre-roll / hangover from these values (scripts/acs_media_ws_server.py).
+TURN_DETECTION = {
+  "type": "server_vad",
+  "threshold": 0.5,
+  "prefix_padding_ms": 300,
+  "silence_duration_ms": 1000,
+  "create_response": False,
+}
+
 
 _DEFAULT_INSTRUCTIONS = (
   "あなたは株式会社西友（せいゆう）の日本語音声アシスタントです。常に丁寧語（です・ます調）で応答し、なれなれしい言葉遣い・タメ口・過度なフランク表現は避けてください。ユーザーの発話内容に忠実に回答し、根拠のない推測や断定はしません。最新情報が必要な場合は、参照元（URLや資料）を確認して取得できる場合のみ反映し、取得できない場合は『現時点では確認できません』と明確に伝え、必要なURL/情報の提示をお願いしてください。聞き取れない場合は推測せず、日本語で『恐れ入りますが、もう一度お願いいたします。』と聞き返してください。"
 )
 
 
-def _load_instructions() -> str:
-  """Load AOAI system instructions.
+# Named instruction profiles, selectable per call:
+#   AOAI_INSTRUCTIONS_PROFILES="sales=./prompts/sales.txt,support=./prompts/support.txt"
+# The "default" profile uses AOAI_INSTRUCTIONS_FILE / AOAI_INSTRUCTIONS / built-in default.
+DEFAULT_PROFILE = "default"
+# How often (at most) the instructions file is stat()ed for changes.
+INSTRUCTIONS_CHECK_INTERVAL_S = float(os.getenv("AOAI_INSTRUCTIONS_CHECK_INTERVAL_S", "2"))
+
+
+def _resolve_path(path: str) -> Path:
+  p = Path(path)
+  if not p.is_absolute():
+    # Resolve relative paths from the current working directory (typically `server/`).
+    p = Path.cwd() / p
+  return p
+
+
+def _profile_paths() -> dict[str, str]:
+  raw = os.getenv("AOAI_INSTRUCTIONS_PROFILES") or ""
+  out: dict[str, str] = {}
+  for seg in raw.split(","):
+    if "=" not in seg:
+      continue
+    name, path = seg.split("=", 1)
+    name, path = name.strip(), path.strip()
+    if name and path:
+      out[name] = path
+  return out
 
-  Precedence:
+
+def _instructions_source(profile: str) -> tuple[Path | None, str | None]:
+  """Where the instructions for `profile` come from.
+
+  Precedence for the default profile:
   1) AOAI_INSTRUCTIONS_FILE (UTF-8 text)
   2) AOAI_INSTRUCTIONS (inline string)
   3) built-in default
+  Named profiles use their file from AOAI_INSTRUCTIONS_PROFILES.
   """
+  if profile != DEFAULT_PROFILE:
+    path = _profile_paths().get(profile)
+    if path:
+      return _resolve_path(path), None
   path = (os.getenv("AOAI_INSTRUCTIONS_FILE") or "").strip()
-  if path:
-    p = Path(path)
-    if not p.is_absolute():
-      # Resolve relative paths from the current working directory (typically `server/`).
-      p = Path.cwd() / p
+  inline = os.getenv("AOAI_INSTRUCTIONS")
+  return (_resolve_path(path) if path else None), inline
+
+
+def _read_instructions(path: Path | None, inline: str | None) -> str:
+  if path is not None:
     try:
-      text = p.read_text(encoding="utf-8")
+      text = path.read_text(encoding="utf-8")
     except Exception as e:
-      raise RuntimeError(f"Failed to read AOAI_INSTRUCTIONS_FILE: {p} ({e})")
+      raise RuntimeError(f"Failed to read AOAI instructions file: {path} ({e})")
     if text.strip():
       return text
     # If the file exists but is empty/whitespace, fall back.
 
-  inline = os.getenv("AOAI_INSTRUCTIONS")
   if inline is not None and inline.strip():
     return inline
 
   return _DEFAULT_INSTRUCTIONS
 
+
+def _mtime_ns(path: Path | None) -> int | None:
+  if path is None:
+    return None
+  try:
+    return path.stat().st_mtime_ns
+  except OSError:
+    return None
+
+
+def _session_update_payload(instructions: str) -> dict:
+  # session.update（イベント仕様）[3](https://learn.microsoft.com/en-us/azure/ai-foundry/openai/realtime-audio-reference?view=foundry-classic)[10](https://learn.microsoft.com/en-us/azure/ai-foundry/openai/realtime-audio-reference)
+  return {
+    "type": "session.update",
+    "event_id": "session_update_1",
+    "session": {
+      # When required, accepted values are: realtime, transcription, translation.
+      "type": "realtime",
+      "instructions": instructions,
+      # Azure Realtime expects output_modalities + audio input/output settings.
+      "output_modalities": ["audio"],
+      "audio": {
+        "input": {
+          "format": {"type": "audio/pcm", "rate": 24000},
+          "transcription": {"model": "whisper-1", "language": "ja"},
+          "turn_detection": dict(TURN_DETECTION),
+        },
+        "output": {
+          "voice": os.getenv("AOAI_VOICE", VOICE),
+          "format": {"type": "audio/pcm", "rate": 24000},
+        },
+      },
+    },
+  }
+
+
+class _SessionFrame:
+  __slots__ = ("frame", "config_key", "path", "mtime_ns", "checked_at", "lock")
+
+  def __init__(self):
+    self.frame: str | None = None
+    self.config_key: tuple | None = None
+    self.path: Path | None = None
+    self.mtime_ns: int | None = None
+    self.checked_at = 0.0
+    self.lock = asyncio.Lock()
+
+
+_SESSION_FRAMES: dict[str, _SessionFrame] = {}
+
+
+def _config_key(profile: str) -> tuple:
+  # Everything (besides file contents) that affects the session.update body.
+  return (
+    profile,
+    os.getenv("AOAI_INSTRUCTIONS_FILE"),
+    os.getenv("AOAI_INSTRUCTIONS"),
+    os.getenv("AOAI_INSTRUCTIONS_PROFILES"),
+    os.getenv("AOAI_VOICE", VOICE),
+  )
+
+
+async def get_session_update_frame(profile: str | None = None) -> str:
+  """Serialized session.update for `profile`, rebuilt only when its inputs change.
+
+  The instructions file is stat()ed at most every AOAI_INSTRUCTIONS_CHECK_INTERVAL_S,
+  off the event loop; the common path returns the cached string without I/O.
+  """
+  name = (profile or DEFAULT_PROFILE).strip() or DEFAULT_PROFILE
+  if name != DEFAULT_PROFILE and name not in _profile_paths():
+    log("Unknown AOAI instructions profile; using default", {"profile": name})
+    name = DEFAULT_PROFILE
+
+  entry = _SESSION_FRAMES.get(name)
+  if entry is None:
+    entry = _SESSION_FRAMES[name] = _SessionFrame()
+
+  loop = asyncio.get_running_loop()
+  key = _config_key(name)
+  if entry.frame is not None and entry.config_key == key and loop.time() - entry.checked_at < INSTRUCTIONS_CHECK_INTERVAL_S:
+    return entry.frame
+
+  async with entry.lock:
+    key = _config_key(name)
+    if entry.frame is not None and entry.config_key == key:
+      if loop.time() - entry.checked_at < INSTRUCTIONS_CHECK_INTERVAL_S:
+        return entry.frame
+      mtime = await asyncio.to_thread(_mtime_ns, entry.path)
+      entry.checked_at = loop.time()
+      if mtime == entry.mtime_ns:
+        return entry.frame
+
+    path, inline = _instructions_source(name)
+    mtime = await asyncio.to_thread(_mtime_ns, path)
+    instructions = await asyncio.to_thread(_read_instructions, path, inline)
+    entry.frame = json.dumps(_session_update_payload(instructions))
+    entry.config_key = key
+    entry.path = path
+    entry.mtime_ns = mtime
+    entry.checked_at = loop.time()
+    return entry.frame
+
+
 def ws_url():
   # Azure OpenAI Realtime WebSocket endpoint [1](https://learn.microsoft.com/en-us/azure/ai-foundry/openai/how-to/realtime-audio-websockets)[2](https://learn.microsoft.com/en-us/azure/ai-foundry/openai/how-to/realtime-audio-websockets?view=foundry-classic)
   endpoint = os.getenv("AZURE_OPENAI_ENDPOINT")
@@ -61,56 +211,62 @@ async def auth_headers():
   if API_KEY:
     return {"api-key": API_KEY}
   # Keyless (Entra ID / Managed Identity) は Azure Identity で実装可能 [11](https://learn.microsoft.com/en-us/azure/ai-foundry/openai/supported-languages)
-  cred = DefaultAzureCredential()
-  token = await asyncio.get_event_loop().run_in_executor(
-    None, lambda: cred.get_token("https://cognitiveservices.azure.com/.default")
-  )
-  return {"Authorization": f"Bearer {token.token}"}
+  # The token is cached process-wide and refreshed in the background (aoai_token_provider).
+  token = await get_token_provider().get_token()
+  return {"Authorization": f"Bearer {token}"}
 
 class AOAIRealtime:
-  def __init__(self):
+  def __init__(self, *, profile: str | None = None):
     self.ws = None
+    self.profile = profile
+    self._session_frame: str | None = None
 
   async def connect(self):
     headers = await auth_headers()
     self.ws = await websockets.connect(ws_url(), additional_headers=headers)
+    self._session_frame = await get_session_update_frame(self.profile)
+    await self.ws.send(self._session_frame)
 
-    instructions = _load_instructions()
-
-    # session.update（イベント仕様）[3](https://learn.microsoft.com/en-us/azure/ai-foundry/openai/realtime-audio-reference?view=foundry-classic)[10](https://learn.microsoft.com/en-us/azure/ai-foundry/openai/realtime-audio-reference)
-    await self.ws.send(json.dumps({
-      "type": "session.update",
-      "event_id": "session_update_1",
-      "session": {
-        # When required, accepted values are: realtime, transcription, translation.
-        "type": "realtime",
-        "instructions": instructions,
-        # Azure Realtime expects output_modalities + audio input/output settings.
-        "output_modalities": ["audio"],
-        "audio": {
-          "input": {
-            "format": {"type": "audio/pcm", "rate": 24000},
-            "transcription": {"model": "whisper-1", "language": "ja"},
-            "turn_detection": {
-              "type": "server_vad",
-              "threshold": 0.5,
-              "prefix_padding_ms": 300,
-              "silence_duration_ms": 1000,
-              "create_response": False,
-            },
-          },
-          "output": {
-            "voice": VOICE,
-            "format": {"type": "audio/pcm", "rate": 24000},
-          },
-        },
-      }
-    }))
+  async def apply_profile(self, profile: str | None) -> bool:
+    """Re-send session.update if `profile` (or its instructions) differ from what was sent.
+
+    Lets pre-warmed sessions be retargeted per call; returns True if an update was sent.
+    """
+    frame = await get_session_update_frame(profile)
+    self.profile = profile
+    if frame is self._session_frame or frame == self._session_frame:
+      return False
+    self._session_frame = frame
+    await self.ws.send(frame)
+    return True
+
+  async def wait_session_updated(self, *, timeout: float = 10.0) -> None:
+    """Consume events until `session.updated` arrives (session is configured).
+
+    Used by the session pool so warm sessions are fully configured before use.
+    Events read here (session.created/updated) are informational and dropped.
+    """
+    async def _wait():
+      while True:
+        ev = json.loads(await self.ws.recv())
+        t = ev.get("type")
+        if t == "session.updated":
+          return
+        if t == "error":
+          raise RuntimeError(f"AOAI session.update failed: {ev.get('error') or ev}")
+
+    await asyncio.wait_for(_wait(), timeout=timeout)
+
+  async def ping(self, *, timeout: float = 5.0) -> float:
+    """WebSocket ping round trip (seconds). Raises if the socket is unhealthy."""
+    if self.ws is None:
+      raise RuntimeError("not connected")
+    waiter = await self.ws.ping()
+    return await asyncio.wait_for(waiter, timeout=timeout)
 
   async def append_audio(self, pcm16_bytes: bytes):
     # input_audio_buffer.append [3](https://learn.microsoft.com/en-us/azure/ai-foundry/openai/realtime-audio-reference?view=foundry-classic)
-    b64 = base64.b64encode(pcm16_bytes).decode("ascii")
-    await self.ws.send(json.dumps({"type": "input_audio_buffer.append", "audio": b64}))
+    await self.ws.send(codec.encode_aoai_append(pcm16_bytes))
 
   async def create_response(self, *, event_id: str = "response_create_1", instructions: str | None = None, temperature: float | None = None):
     # response.create (When server_vad is enabled, the server commits audio automatically.)
@@ -130,7 +286,13 @@ class AOAIRealtime:
 
   async def events(self):
     async for msg in self.ws:
-      yield json.loads(msg)
+      # Audio deltas dominate traffic: slice the payload out without a full parse.
+      if codec.SLICE_FAST_PATH and isinstance(msg, str):
+        fast = codec.extract_aoai_audio_delta(msg)
+        if fast is not None:
+          yield {"type": fast[0], "delta": fast[1]}
+          continue
+      yield codec.loads(msg)
 
   async def close(self):
     if self.ws:
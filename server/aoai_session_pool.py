@@ -0,0 +1,224 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import time
+from collections import deque
+from contextlib import suppress
+
+from aoai_realtime import AOAIRealtime
+from structured_log import log
+
+# Pre-warmed AOAI Realtime sessions.
+# Each pooled session has already done TLS + auth + session.update and received
+# session.updated, so a new call can start streaming audio immediately.
+# Disabled unless AOAI_POOL_MIN_SIZE > 0.
+POOL_MIN_SIZE = int(os.getenv("AOAI_POOL_MIN_SIZE", "0"))
+POOL_MAX_SIZE = int(os.getenv("AOAI_POOL_MAX_SIZE", "4"))
+# AOAI closes idle/long-lived sessions server-side; recycle well before that.
+POOL_IDLE_TTL_S = float(os.getenv("AOAI_POOL_IDLE_TTL_S", "240"))
+POOL_HEALTH_INTERVAL_S = float(os.getenv("AOAI_POOL_HEALTH_INTERVAL_S", "20"))
+POOL_CONNECT_TIMEOUT_S = float(os.getenv("AOAI_POOL_CONNECT_TIMEOUT_S", "15"))
+
+
+class _IdleSession:
+  __slots__ = ("rt", "created")
+
+  def __init__(self, rt: AOAIRealtime, created: float):
+    self.rt = rt
+    self.created = created
+
+
+class AOAISessionPool:
+  def __init__(
+    self,
+    *,
+    min_size: int = POOL_MIN_SIZE,
+    max_size: int = POOL_MAX_SIZE,
+    idle_ttl_s: float = POOL_IDLE_TTL_S,
+    health_interval_s: float = POOL_HEALTH_INTERVAL_S,
+    connect_timeout_s: float = POOL_CONNECT_TIMEOUT_S,
+    factory=AOAIRealtime,
+  ):
+    self.min_size = max(0, int(min_size))
+    self.max_size = max(self.min_size, int(max_size))
+    self.idle_ttl_s = float(idle_ttl_s)
+    self.health_interval_s = max(1.0, float(health_interval_s))
+    self.connect_timeout_s = float(connect_timeout_s)
+    self._factory = factory
+    self._idle: deque[_IdleSession] = deque()
+    self._connecting = 0
+    self._wakeup: asyncio.Event | None = None
+    self._task: asyncio.Task | None = None
+    self._closed = False
+    # Counters
+    self.hits = 0
+    self.misses = 0
+    self.created = 0
+    self.connect_failures = 0
+    # Failures since the last successful connect (drives the retry backoff).
+    self.consecutive_failures = 0
+    self.expired = 0
+    self.unhealthy = 0
+    self.connect_ms_total = 0.0
+    self.connect_ms_last = 0.0
+
+  def start(self) -> None:
+    if self._task is not None:
+      return
+    self._wakeup = asyncio.Event()
+    self._task = asyncio.create_task(self._maintain())
+
+  def acquire_nowait(self) -> AOAIRealtime | None:
+    """Take a ready session, or None if none is warm (caller connects cold)."""
+    now = time.monotonic()
+    rt = None
+    while self._idle:
+      item = self._idle.popleft()
+      if now - item.created < self.idle_ttl_s:
+        rt = item.rt
+        break
+      self.expired += 1
+      asyncio.create_task(_close_quietly(item.rt))
+    if rt is None:
+      self.misses += 1
+    else:
+      self.hits += 1
+    self._kick()
+    return rt
+
+  def stats(self) -> dict:
+    return {
+      "minSize": self.min_size,
+      "maxSize": self.max_size,
+      "idle": len(self._idle),
+      "connecting": self._connecting,
+      "hits": self.hits,
+      "misses": self.misses,
+      "created": self.created,
+      "connectFailures": self.connect_failures,
+      "consecutiveFailures": self.consecutive_failures,
+      "expired": self.expired,
+      "unhealthy": self.unhealthy,
+      "connectMsAvg": round(self.connect_ms_total / self.created, 1) if self.created else None,
+      "connectMsLast": round(self.connect_ms_last, 1) if self.created else None,
+    }
+
+  async def close(self) -> None:
+    self._closed = True
+    if self._task is not None:
+      self._task.cancel()
+      with suppress(BaseException):
+        await self._task
+      self._task = None
+    while self._idle:
+      await _close_quietly(self._idle.popleft().rt)
+
+  def _kick(self) -> None:
+    if self._wakeup is not None:
+      self._wakeup.set()
+
+  async def _open_one(self) -> None:
+    t0 = time.perf_counter()
+    rt = self._factory()
+    try:
+      await asyncio.wait_for(rt.connect(), timeout=self.connect_timeout_s)
+      await rt.wait_session_updated(timeout=self.connect_timeout_s)
+    except Exception as e:
+      self.connect_failures += 1
+      self.consecutive_failures += 1
+      log("AOAI pool connect failed", {"error": repr(e), "consecutive": self.consecutive_failures})
+      await _close_quietly(rt)
+      # Back off a little so a broken endpoint/credential doesn't spin; an occasional
+      # transient failure between successes only waits a second.
+      await asyncio.sleep(min(30.0, 1.0 * self.consecutive_failures))
+      return
+    finally:
+      self._connecting -= 1
+      self._kick()
+
+    elapsed_ms = (time.perf_counter() - t0) * 1000.0
+    self.consecutive_failures = 0
+    self.created += 1
+    self.connect_ms_total += elapsed_ms
+    self.connect_ms_last = elapsed_ms
+    if self._closed:
+      await _close_quietly(rt)
+      return
+    self._idle.append(_IdleSession(rt, time.monotonic()))
+
+  def _refill(self) -> None:
+    # Keep `min_size` warm sessions, never exceeding `max_size` idle + in-flight.
+    want = self.min_size - len(self._idle) - self._connecting
+    room = self.max_size - len(self._idle) - self._connecting
+    for _ in range(max(0, min(want, room))):
+      self._connecting += 1
+      asyncio.create_task(self._open_one())
+
+  async def _health_check(self) -> None:
+    now = time.monotonic()
+    keep: deque[_IdleSession] = deque()
+    while self._idle:
+      item = self._idle.popleft()
+      if now - item.created >= self.idle_ttl_s:
+        self.expired += 1
+        await _close_quietly(item.rt)
+        continue
+      try:
+        await item.rt.ping(timeout=5.0)
+      except Exception:
+        self.unhealthy += 1
+        await _close_quietly(item.rt)
+        continue
+      keep.append(item)
+    # Sessions acquired/added while we were pinging stay in `self._idle`.
+    keep.extend(self._idle)
+    self._idle = keep
+
+  async def _maintain(self) -> None:
+    assert self._wakeup is not None
+    next_health = time.monotonic() + self.health_interval_s
+    while not self._closed:
+      self._refill()
+      timeout = max(0.0, next_health - time.monotonic())
+      with suppress(asyncio.TimeoutError):
+        await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+      self._wakeup.clear()
+      if time.monotonic() >= next_health:
+        try:
+          await self._health_check()
+        except Exception as e:
+          log("AOAI pool health check error", {"error": repr(e)})
+        next_health = time.monotonic() + self.health_interval_s
+
+
+async def _close_quietly(rt: AOAIRealtime) -> None:
+  with suppress(Exception):
+    await rt.close()
+
+
+_POOL: AOAISessionPool | None = None
+
+
+def get_pool() -> AOAISessionPool | None:
+  """Process-wide pool (None when pooling is disabled)."""
+  return _POOL
+
+
+def start_pool() -> AOAISessionPool | None:
+  """Create and start the process-wide pool (idempotent). Needs a running loop."""
+  global _POOL
+  if POOL_MIN_SIZE <= 0:
+    return None
+  if _POOL is None:
+    _POOL = AOAISessionPool()
+    _POOL.start()
+    log("AOAI session pool started", _POOL.stats())
+  return _POOL
+
+
+async def close_pool() -> None:
+  global _POOL
+  pool, _POOL = _POOL, None
+  if pool is not None:
+    await pool.close()
@@ -0,0 +1,207 @@
+from __future__ import annotations
+
+import asyncio
+import inspect
+import os
+import time
+from contextlib import suppress
+
+import metrics
+from structured_log import log
+
+# Process-wide Entra ID token cache for AOAI keyless auth.
+# One credential is created per process; the token is reused until shortly
+# before `expires_on` and refreshed in the background, so connects normally
+# never wait on credential-chain probing / IMDS.
+#
+# Cache hits / misses and refresh latency are exported on /metrics (aoai_token_*);
+# failed background refreshes are logged at warning level, at most once per
+# FAILURE_LOG_INTERVAL_S, while they keep retrying.
+
+AOAI_SCOPE = "https://cognitiveservices.azure.com/.default"
+# Refresh this long before expiry (Entra tokens are typically valid 60-90 min).
+REFRESH_MARGIN_S = float(os.getenv("AOAI_TOKEN_REFRESH_MARGIN_S", "300"))
+# After a failed background refresh, retry after this delay.
+REFRESH_RETRY_S = float(os.getenv("AOAI_TOKEN_REFRESH_RETRY_S", "10"))
+FAILURE_LOG_INTERVAL_S = 60.0
+
+
+def _default_credential():
+  from azure.identity import DefaultAzureCredential
+
+  return DefaultAzureCredential()
+
+
+class AsyncTokenProvider:
+  """Caches a bearer token and coalesces concurrent fetches onto one in-flight call.
+
+  `credential` is anything with `get_token(scope)` returning an object that has
+  `.token` and `.expires_on` (epoch seconds); sync or async implementations both work.
+  """
+
+  def __init__(
+    self,
+    *,
+    scope: str = AOAI_SCOPE,
+    credential=None,
+    refresh_margin_s: float = REFRESH_MARGIN_S,
+    refresh_retry_s: float = REFRESH_RETRY_S,
+  ):
+    self.scope = scope
+    self._credential = credential
+    self.refresh_margin_s = max(0.0, float(refresh_margin_s))
+    self.refresh_retry_s = max(0.5, float(refresh_retry_s))
+    self._token: str | None = None
+    self._expires_on = 0.0
+    self._inflight: asyncio.Future | None = None
+    self._refresh_task: asyncio.Task | None = None
+    # Counters
+    self.hits = 0
+    self.misses = 0
+    self.coalesced = 0
+    self.refreshes = 0
+    self.refresh_failures = 0
+    self.refresh_ms_total = 0.0
+    self.refresh_ms_max = 0.0
+    self.refresh_ms_last = 0.0
+    self.consecutive_failures = 0
+    self._failure_logged_at = 0.0
+
+  def _fresh(self) -> bool:
+    return self._token is not None and time.time() < self._expires_on - self.refresh_margin_s
+
+  async def get_token(self) -> str:
+    if self._fresh():
+      self.hits += 1
+      return self._token  # type: ignore[return-value]
+    if self._inflight is not None:
+      self.coalesced += 1
+      return await asyncio.shield(self._inflight)
+    self.misses += 1
+    # Still valid but inside the refresh margin: serve it and refresh in the background.
+    if self._token is not None and time.time() < self._expires_on:
+      self._start_fetch()
+      return self._token
+    return await asyncio.shield(self._start_fetch())
+
+  def _start_fetch(self) -> asyncio.Future:
+    if self._inflight is None:
+      self._inflight = asyncio.ensure_future(self._fetch())
+      self._inflight.add_done_callback(self._fetch_done)
+    return self._inflight
+
+  def _fetch_done(self, fut: asyncio.Future) -> None:
+    self._inflight = None
+    if not fut.cancelled():
+      # Mark exceptions as retrieved for callers that didn't await.
+      fut.exception()
+
+  async def _fetch(self) -> str:
+    if self._credential is None:
+      self._credential = await asyncio.to_thread(_default_credential)
+    t0 = time.perf_counter()
+    try:
+      get_token = self._credential.get_token
+      if inspect.iscoroutinefunction(get_token):
+        tok = await get_token(self.scope)
+      else:
+        # Sync credentials block (HTTP/IMDS); run them off the event loop.
+        tok = await asyncio.to_thread(get_token, self.scope)
+    except Exception as e:
+      self.refresh_failures += 1
+      self.consecutive_failures += 1
+      self._log_failure(e)
+      self._schedule_refresh(self.refresh_retry_s)
+      raise
+    elapsed_ms = (time.perf_counter() - t0) * 1000.0
+    if self.consecutive_failures:
+      log("AOAI token refresh recovered", {"failures": self.consecutive_failures, "refreshMs": round(elapsed_ms, 1)})
+      self.consecutive_failures = 0
+      self._failure_logged_at = 0.0
+    self.refreshes += 1
+    self.refresh_ms_total += elapsed_ms
+    self.refresh_ms_last = elapsed_ms
+    self.refresh_ms_max = max(self.refresh_ms_max, elapsed_ms)
+    self._token = tok.token
+    self._expires_on = float(tok.expires_on)
+    self._schedule_refresh(max(1.0, self._expires_on - self.refresh_margin_s - time.time()))
+    return self._token
+
+  def _log_failure(self, e: Exception) -> None:
+    now = time.monotonic()
+    if self._failure_logged_at and now - self._failure_logged_at < FAILURE_LOG_INTERVAL_S:
+      return
+    self._failure_logged_at = now
+    log(
+      "AOAI token refresh failed",
+      {
+        "error": repr(e),
+        "consecutiveFailures": self.consecutive_failures,
+        "retryS": self.refresh_retry_s,
+        "expiresInS": round(self._expires_on - time.time(), 1) if self._token else None,
+      },
+      level="warning",
+    )
+
+  def _schedule_refresh(self, delay_s: float) -> None:
+    if self._refresh_task is not None and not self._refresh_task.done():
+      self._refresh_task.cancel()
+    self._refresh_task = asyncio.get_running_loop().create_task(self._refresh_later(delay_s))
+
+  async def _refresh_later(self, delay_s: float) -> None:
+    await asyncio.sleep(delay_s)
+    # Detach from this task so the new fetch can schedule the next refresh.
+    self._refresh_task = None
+    with suppress(Exception):
+      await self._start_fetch()
+
+  def stats(self) -> dict:
+    return {
+      "hits": self.hits,
+      "misses": self.misses,
+      "coalesced": self.coalesced,
+      "refreshes": self.refreshes,
+      "refreshFailures": self.refresh_failures,
+      "consecutiveFailures": self.consecutive_failures,
+      "refreshMsAvg": round(self.refresh_ms_total / self.refreshes, 1) if self.refreshes else None,
+      "refreshMsMax": round(self.refresh_ms_max, 1),
+      "refreshMsLast": round(self.refresh_ms_last, 1),
+      "expiresInS": round(self._expires_on - time.time(), 1) if self._token else None,
+    }
+
+  async def close(self) -> None:
+    if self._refresh_task is not None:
+      self._refresh_task.cancel()
+      with suppress(BaseException):
+        await self._refresh_task
+      self._refresh_task = None
+    close = getattr(self._credential, "close", None)
+    if callable(close):
+      with suppress(Exception):
+        res = close()
+        if inspect.isawaitable(res):
+          await res
+
+
+_PROVIDER: AsyncTokenProvider | None = None
+
+
+def get_token_provider() -> AsyncTokenProvider:
+  """Process-wide provider for the AOAI scope."""
+  global _PROVIDER
+  if _PROVIDER is None:
+    _PROVIDER = AsyncTokenProvider()
+    metrics.REGISTRY.collector(_collect)
+  return _PROVIDER
+
+
+def _collect() -> None:
+  p = _PROVIDER
+  metrics.AOAI_TOKEN_REQUESTS["hit"].value = p.hits
+  metrics.AOAI_TOKEN_REQUESTS["miss"].value = p.misses
+  metrics.AOAI_TOKEN_REQUESTS["coalesced"].value = p.coalesced
+  metrics.AOAI_TOKEN_REFRESHES["ok"].value = p.refreshes
+  metrics.AOAI_TOKEN_REFRESHES["failed"].value = p.refresh_failures
+  metrics.AOAI_TOKEN_REFRESH_SECONDS.value = round(p.refresh_ms_total, 3)
+  metrics.AOAI_TOKEN_REFRESH_LAST_SECONDS.set(round(p.refresh_ms_last / 1000.0, 4))
+  metrics.AOAI_TOKEN_EXPIRES_IN_SECONDS.set(round(max(0.0, p._expires_on - time.time()), 1) if p._token else 0)
@@ -1,7 +1,11 @@
-import os, asyncio, json
+import os, asyncio, hmac, json, uuid
+from urllib.parse import quote
 from fastapi import FastAPI, Request
 from fastapi.responses import JSONResponse
 from pydantic import BaseModel
+from structured_log import log
+from admission import ADMISSION, RETRY_AFTER_S
+import call_registry
 from fastapi.middleware.cors import CORSMiddleware
 from azure.communication.identity import CommunicationIdentityClient
 from azure.core.exceptions import ClientAuthenticationError
@@ -171,7 +175,7 @@ def _require_callback_uri_host() -> str:
   return host.rstrip("/")
 
 
-def _ws_transport_url() -> str:
+def _ws_transport_url(instructions_profile: str | None = None) -> str:
   # ACS Media Streaming requires ws(s)://. We derive it from CALLBACK_URI_HOST.
   host = _require_callback_uri_host()
   if host.startswith("https://"):
@@ -180,10 +184,14 @@ def _ws_transport_url() -> str:
     ws_host = "ws://" + host[len("http://"):]
   else:
     ws_host = host
-  return f"{ws_host}/ws/media"
+  url = f"{ws_host}/ws/media"
+  if instructions_profile:
+    # The media handler picks the AOAI instructions profile from this query param.
+    url += f"?profile={quote(instructions_profile, safe='')}"
+  return url
 
 
-def _media_streaming_options() -> MediaStreamingOptions:
+def _media_streaming_options(instructions_profile: str | None = None) -> MediaStreamingOptions:
   # Keep this simple: start streaming immediately; bidirectional is optional.
   enable_bidi = _env_bool("ACS_MEDIA_ENABLE_BIDIRECTIONAL", True)
   kwargs: dict = {
@@ -196,7 +204,7 @@ def _media_streaming_options() -> MediaStreamingOptions:
       kwargs["audio_format"] = fmt
 
   return MediaStreamingOptions(
-    transport_url=_ws_transport_url(),
+    transport_url=_ws_transport_url(instructions_profile),
     transport_type=StreamingTransportType.WEBSOCKET,
     content_type=MediaStreamingContentType.AUDIO,
     audio_channel_type=_select_acs_audio_channel_type(),
@@ -235,13 +243,63 @@ def _parse_acs_events(body: bytes) -> list[dict]:
     normalized.append({"type": ev_type, "data": data, "raw": ev})
   return normalized
 
+# Call Automation events that trigger a control action on the call's live media session
+# (call_registry.py). Media sessions live in this process only when the gateway serves
+# FastAPI (python app.py); otherwise the events are just logged.
+#
+# /api/callbacks is a public route, so control actions need proof that the event came
+# from ACS: start_server_call puts ACS_CALLBACK_SECRET into the callback URL's query
+# (?token=...) and only callbacks carrying it are routed. Without a secret, or with
+# ACS_CALLBACK_CONTROL=0 (default), callbacks are only logged.
+CALLBACK_SECRET = (os.getenv("ACS_CALLBACK_SECRET") or "").strip()
+CALLBACK_CONTROL_ENABLED = _env_bool("ACS_CALLBACK_CONTROL", False) and bool(CALLBACK_SECRET)
+if _env_bool("ACS_CALLBACK_CONTROL", False) and not CALLBACK_SECRET:
+  log("ACS_CALLBACK_CONTROL ignored: ACS_CALLBACK_SECRET is not set (callbacks are only logged)", level="warning")
+# Opt-in: PlayStarted is also sent for prompts played by design (hold music,
+# announcements), which must not cut off the assistant.
+CALLBACK_STOP_AUDIO_ON_PLAY = _env_bool("ACS_CALLBACK_STOP_AUDIO_ON_PLAY", False)
+CALLBACK_ACTIONS = {
+  # The call or its media stream ended: release the session (AOAI, queues) right away
+  # instead of waiting for the media WebSocket to time out.
+  "Microsoft.Communication.CallDisconnected": call_registry.ACTION_HANGUP,
+  "Microsoft.Communication.MediaStreamingStopped": call_registry.ACTION_HANGUP,
+  "Microsoft.Communication.MediaStreamingFailed": call_registry.ACTION_HANGUP,
+}
+if CALLBACK_STOP_AUDIO_ON_PLAY:
+  # A Call Automation prompt started playing: stop the assistant talking over it.
+  CALLBACK_ACTIONS["Microsoft.Communication.PlayStarted"] = call_registry.ACTION_STOP_AUDIO
+
+
+def _secret_matches(given: str | None, expected: str) -> bool:
+  return bool(expected) and hmac.compare_digest((given or "").encode("utf-8"), expected.encode("utf-8"))
+
+
+def _callback_url(callback_host: str) -> str:
+  url = f"{callback_host}/api/callbacks"
+  return f"{url}?token={quote(CALLBACK_SECRET, safe='')}" if CALLBACK_SECRET else url
+
+
+def _loggable_callback_url(url: str) -> str:
+  return url.replace(quote(CALLBACK_SECRET, safe=""), "***") if CALLBACK_SECRET else url
+
+
 @app.post("/api/callbacks")
 async def call_automation_callback(request: Request):
   # Handles Call Automation callback events emitted for server-initiated calls.
+  if CALLBACK_SECRET and not _secret_matches(request.query_params.get("token"), CALLBACK_SECRET):
+    log("Rejected ACS callback (bad token)", {"client": request.client.host if request.client else None}, level="warning")
+    return JSONResponse({"error": "unauthorized"}, status_code=401)
   events = _parse_acs_events(await request.body())
   for event in events:
     ev_type = event.get("type")
-    print(f"Received ACS event: {ev_type}")
+    call_id = (event.get("data") or {}).get("callConnectionId")
+    log("Received ACS event", {"type": ev_type, "callConnectionId": call_id})
+
+    call_registry.REGISTRY.note_callback(call_id, ev_type)
+    action = CALLBACK_ACTIONS.get(ev_type) if CALLBACK_CONTROL_ENABLED else None
+    if action is not None:
+      routed = call_registry.REGISTRY.route(call_id, action, {"reason": ev_type})
+      log("ACS event control", {"type": ev_type, "callConnectionId": call_id, "action": action, "routed": routed})
 
     # Media streaming failures often include useful diagnostics under `data`.
     if ev_type in (
@@ -249,18 +307,22 @@ async def call_automation_callback(request: Request):
       "Microsoft.Communication.MediaStreamingStarted",
       "Microsoft.Communication.MediaStreamingStopped",
     ):
-      try:
-        print("ACS media streaming event data:", json.dumps(event.get("data") or {}, ensure_ascii=False))
-      except Exception:
-        print("ACS media streaming event data:", event.get("data"))
+      log("ACS media streaming event data", {"type": ev_type, "data": event.get("data") or {}})
+
+    # A call that ends (or fails to stream) before its media WebSocket connects
+    # gives its reserved admission slot back.
+    if ev_type in ("Microsoft.Communication.CallDisconnected", "Microsoft.Communication.MediaStreamingFailed"):
+      ADMISSION.unreserve(call_id or "")
   return JSONResponse({"status": "ok"})
 
 
 @app.get("/api/health")
-def health():
-  """Lightweight config check for local debugging.
+async def health():
+  """Lightweight config check for local debugging, plus call capacity.
 
-  Intentionally does NOT return secrets.
+  Intentionally does NOT return secrets. Returns 503 while admission control is
+  shedding new calls (see admission.py), so a load balancer probe can route around
+  a saturated instance.
   """
   callback_host = (CALLBACK_URI_HOST or "").strip()
   callback_ok = bool(callback_host)
@@ -272,9 +334,11 @@ def health():
       ws_url = None
 
   acs_info = _acs_conn_string_sanity(ACS_CONN)
+  capacity = ADMISSION.capacity()
   return JSONResponse(
     {
       "ok": True,
+      "capacity": capacity,
       "acs": {
         "callAutomationClientConfigured": call_automation_client is not None,
         "identityClientConfigured": ACS_CONN is not None and bool(ACS_CONN.strip()),
@@ -296,13 +360,59 @@ def health():
         "audioFormat": _env_str("ACS_MEDIA_AUDIO_FORMAT", "pcm16k"),
         "audioChannelType": _env_str("ACS_MEDIA_AUDIO_CHANNEL_TYPE", "mixed"),
       },
-    }
+    },
+    status_code=200 if capacity["accepting"] else 503,
+    headers=None if capacity["accepting"] else {"Retry-After": str(RETRY_AFTER_S)},
   )
 
 
+# /api/calls lists every live callConnectionId on the public port: off unless
+# CALLS_API_TOKEN is set, and then only with `Authorization: Bearer <token>`.
+CALLS_API_TOKEN = (os.getenv("CALLS_API_TOKEN") or "").strip()
+
+
+def _calls_api_denied(request: Request) -> JSONResponse | None:
+  if not CALLS_API_TOKEN:
+    return JSONResponse({"error": "not found", "hint": "CALLS_API_TOKEN を設定すると有効になります"}, status_code=404)
+  auth = request.headers.get("authorization") or ""
+  scheme, _, token = auth.partition(" ")
+  if scheme.lower() != "bearer" or not _secret_matches(token.strip(), CALLS_API_TOKEN):
+    return JSONResponse({"error": "unauthorized"}, status_code=401, headers={"WWW-Authenticate": "Bearer"})
+  return None
+
+
+@app.get("/api/calls")
+async def list_calls(request: Request):
+  """Live media sessions on this process (see call_registry.py)."""
+  denied = _calls_api_denied(request)
+  if denied is not None:
+    return denied
+  return JSONResponse({**call_registry.REGISTRY.stats(), "calls": call_registry.REGISTRY.snapshot()})
+
+
+@app.get("/api/calls/{call_id}")
+async def get_call(call_id: str, request: Request):
+  denied = _calls_api_denied(request)
+  if denied is not None:
+    return denied
+  rec = call_registry.REGISTRY.get(call_id)
+  if rec is None:
+    return JSONResponse(
+      {
+        "error": "call not found",
+        "callConnectionId": call_id,
+        "hint": "メディア WebSocket が接続中の通話のみ表示されます（マルチワーカー構成では受け付けたワーカーのみ）",
+      },
+      status_code=404,
+    )
+  return JSONResponse(rec.snapshot(detail=True))
+
+
 class StartServerCallRequest(BaseModel):
   targetUserId: str
   sourceDisplayName: str | None = None
+  # Optional AOAI instructions profile (see AOAI_INSTRUCTIONS_PROFILES).
+  instructionsProfile: str | None = None
 
 
 @app.post("/api/call/start")
@@ -322,7 +432,8 @@ async def start_server_call(payload: StartServerCallRequest):
 
   try:
     callback_host = _require_callback_uri_host()
-    media_streaming_options = _media_streaming_options()
+    profile = (payload.instructionsProfile or "").strip() or None
+    media_streaming_options = _media_streaming_options(profile)
   except Exception as e:
     return JSONResponse(
       {
@@ -332,16 +443,34 @@ async def start_server_call(payload: StartServerCallRequest):
       status_code=500,
     )
 
-  callback_url = f"{callback_host}/api/callbacks"
+  # Admission control: hold a media slot for this call until ACS connects its WebSocket
+  # (single-process only; with GATEWAY_WORKERS > 1 this just checks capacity, see admission.py).
+  reservation = f"pending-{uuid.uuid4().hex}"
+  reason = ADMISSION.reserve(reservation)
+  if reason is not None:
+    capacity = ADMISSION.capacity()
+    log("create_call rejected (admission)", {"targetUserId": target_user_id, "reason": reason, "capacity": capacity}, level="warning")
+    return JSONResponse(
+      {
+        "error": "サーバーが混雑しているため通話を開始できません",
+        "reason": reason,
+        "capacity": capacity,
+        "hint": f"{RETRY_AFTER_S} 秒ほど待ってから再試行してください",
+      },
+      status_code=503,
+      headers={"Retry-After": str(RETRY_AFTER_S)},
+    )
+
+  callback_url = _callback_url(callback_host)
   target = CommunicationUserIdentifier(target_user_id)
   source_display_name = payload.sourceDisplayName or "Realtime Server"
 
-  print(
-    "create_call:",
+  log(
+    "create_call",
     {
       "targetUserId": target_user_id,
-      "callbackUrl": callback_url,
-      "mediaStreamingTransportUrl": _ws_transport_url(),
+      "callbackUrl": _loggable_callback_url(callback_url),
+      "mediaStreamingTransportUrl": _ws_transport_url(profile),
       "mediaStreaming": {
         "enableBidirectional": _env_bool("ACS_MEDIA_ENABLE_BIDIRECTIONAL", True),
         "audioFormat": _env_str("ACS_MEDIA_AUDIO_FORMAT", "pcm16k"),
@@ -359,12 +488,14 @@ async def start_server_call(payload: StartServerCallRequest):
       media_streaming=media_streaming_options,
     )
   except Exception as e:
+    ADMISSION.unreserve(reservation)
     return JSONResponse({"error": f"create_call failed: {e}"}, status_code=500)
 
   call_connection_id = getattr(result, "call_connection_id", None) or getattr(result, "callConnectionId", None)
   server_call_id = getattr(result, "server_call_id", None) or getattr(result, "serverCallId", None)
-  print(
-    "create_call result:",
+  ADMISSION.rekey(reservation, call_connection_id)
+  log(
+    "create_call result",
     {"callConnectionId": call_connection_id, "serverCallId": server_call_id},
   )
   return JSONResponse(
@@ -372,8 +503,8 @@ async def start_server_call(payload: StartServerCallRequest):
       "ok": True,
       "callConnectionId": call_connection_id,
       "serverCallId": server_call_id,
-      "callbackUrl": callback_url,
-      "mediaStreamingTransportUrl": _ws_transport_url(),
+      "callbackUrl": _loggable_callback_url(callback_url),
+      "mediaStreamingTransportUrl": _ws_transport_url(profile),
     }
   )
 
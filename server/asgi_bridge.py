@@ -0,0 +1,164 @@
+from __future__ import annotations
+
+import asyncio
+from contextlib import suppress
+from typing import Any
+from urllib.parse import unquote
+
+from aiohttp import web
+from multidict import CIMultiDict
+
+# In-process ASGI bridge: lets the aiohttp gateway call the FastAPI app directly
+# (same event loop, no UDS hop, no HTTP re-serialization).
+
+ASGIApp = Any
+
+_ASGI_VERSION = {"version": "3.0", "spec_version": "2.3"}
+
+
+def _build_scope(request: web.Request) -> dict:
+  peer = request.transport.get_extra_info("peername") if request.transport else None
+  sock = request.transport.get_extra_info("sockname") if request.transport else None
+  raw_path = request.raw_path.split("?", 1)[0]
+  return {
+    "type": "http",
+    "asgi": _ASGI_VERSION,
+    "http_version": f"{request.version.major}.{request.version.minor}",
+    "method": request.method,
+    "scheme": request.scheme,
+    "path": unquote(raw_path),
+    "raw_path": raw_path.encode("latin-1"),
+    "query_string": request.query_string.encode("latin-1"),
+    "root_path": "",
+    # ASGI requires lower-cased header names; aiohttp keeps the raw bytes.
+    "headers": [(k.lower(), v) for k, v in request.raw_headers],
+    "client": tuple(peer[:2]) if isinstance(peer, tuple) else None,
+    "server": tuple(sock[:2]) if isinstance(sock, tuple) else None,
+  }
+
+
+class _HttpExchange:
+  """One ASGI http request/response cycle on top of an aiohttp request."""
+
+  def __init__(self, request: web.Request):
+    self._request = request
+    self._body_done = not request.body_exists
+    self._finished = asyncio.Event()
+    self._status = 500
+    self._headers: CIMultiDict[str] = CIMultiDict()
+    self._started = False
+    self._stream: web.StreamResponse | None = None
+    self.response: web.StreamResponse | None = None
+
+  async def receive(self) -> dict:
+    if not self._body_done:
+      chunk = await self._request.content.readany()
+      if not chunk or self._request.content.at_eof():
+        self._body_done = True
+      return {"type": "http.request", "body": chunk, "more_body": not self._body_done}
+    # Body fully consumed: block until the response is done (or the client leaves).
+    await self._finished.wait()
+    return {"type": "http.disconnect"}
+
+  async def send(self, message: dict) -> None:
+    mtype = message["type"]
+    if mtype == "http.response.start":
+      self._started = True
+      self._status = int(message["status"])
+      for k, v in message.get("headers") or ():
+        self._headers.add(k.decode("latin-1"), v.decode("latin-1"))
+      return
+    if mtype != "http.response.body" or not self._started or self._finished.is_set():
+      return
+
+    body = message.get("body") or b""
+    more = bool(message.get("more_body", False))
+    if self._stream is None and not more:
+      # Common case: single body message -> hand the bytes to aiohttp as-is.
+      self.response = web.Response(status=self._status, body=body, headers=self._headers)
+      self._finished.set()
+      return
+
+    if self._stream is None:
+      self._stream = web.StreamResponse(status=self._status, headers=self._headers)
+      await self._stream.prepare(self._request)
+      self.response = self._stream
+    if body:
+      await self._stream.write(body)
+    if not more:
+      await self._stream.write_eof()
+      self._finished.set()
+
+  def close(self) -> None:
+    self._finished.set()
+
+
+async def dispatch(request: web.Request, app: ASGIApp) -> web.StreamResponse:
+  """Serve one aiohttp HTTP request by calling the ASGI app in-process."""
+  exchange = _HttpExchange(request)
+  try:
+    await app(_build_scope(request), exchange.receive, exchange.send)
+  except Exception as e:
+    if exchange.response is None:
+      return web.json_response({"error": "internal error", "details": repr(e)}, status=500)
+    # Response already (partially) sent; nothing more we can report.
+  finally:
+    exchange.close()
+  if exchange.response is None:
+    return web.Response(status=500, text="ASGI app returned without a response")
+  return exchange.response
+
+
+class AsgiLifespan:
+  """Run the ASGI lifespan protocol (startup/shutdown) for an in-process app."""
+
+  def __init__(self, app: ASGIApp):
+    self._app = app
+    self._queue: asyncio.Queue[dict] = asyncio.Queue()
+    self._startup: asyncio.Future | None = None
+    self._shutdown: asyncio.Future | None = None
+    self._task: asyncio.Task | None = None
+    self.supported = True
+
+  async def _receive(self) -> dict:
+    return await self._queue.get()
+
+  async def _send(self, message: dict) -> None:
+    mtype = message["type"]
+    fut = self._startup if mtype.startswith("lifespan.startup") else self._shutdown
+    if fut is None or fut.done():
+      return
+    if mtype.endswith(".failed"):
+      fut.set_exception(RuntimeError(message.get("message") or mtype))
+    else:
+      fut.set_result(None)
+
+  async def _run(self) -> None:
+    try:
+      await self._app({"type": "lifespan", "asgi": _ASGI_VERSION, "state": {}}, self._receive, self._send)
+    except Exception:
+      # Apps without lifespan support raise on the unknown scope type.
+      self.supported = False
+    finally:
+      for fut in (self._startup, self._shutdown):
+        if fut is not None and not fut.done():
+          fut.set_result(None)
+
+  async def startup(self) -> None:
+    loop = asyncio.get_running_loop()
+    self._startup = loop.create_future()
+    self._shutdown = loop.create_future()
+    self._task = asyncio.create_task(self._run())
+    await self._queue.put({"type": "lifespan.startup"})
+    await self._startup
+
+  async def shutdown(self) -> None:
+    if self._task is None:
+      return
+    if self.supported and not self._task.done():
+      await self._queue.put({"type": "lifespan.shutdown"})
+      with suppress(Exception):
+        await asyncio.wait_for(asyncio.shield(self._shutdown), timeout=10)
+    self._task.cancel()
+    with suppress(BaseException):
+      await self._task
@@ -0,0 +1,5 @@
+"""Offline benchmarks for the server (run from `server/` as `python -m bench.<name>`).
+
+`bench.suite` covers the media hot path with machine-readable, comparable results;
+`bench.fixtures` holds the deterministic inputs shared by all benchmarks.
+"""
@@ -0,0 +1,119 @@
+"""How long does the caller keep hearing the assistant after barge-in?
+
+A fake ACS peer models bidirectional playout: received AudioData frames play back
+to back in real time from its own buffer, and `StopAudio` drops that buffer. The
+`PacedSender` streams a long response; after `--cancel-after-ms` the barge-in
+path runs (`clear()` only, as before, or `interrupt()` with StopAudio). The
+metric is the time from cancel to the end of the last frame actually played.
+
+Usage (from `server/`):
+  python -m bench.barge_in_flush [--runs 5] [--cancel-after-ms 1000] [--json out.json]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+from media import codec
+from media.playout import PacedSender
+
+_RATE = 16000
+_RESPONSE_MS = 5000
+
+
+class FakeAcsPeer:
+  """Records what the caller would hear; times are perf_counter seconds."""
+
+  def __init__(self):
+    self.play_end = 0.0
+    self.frames = 0
+    self.stops = 0
+
+  async def send(self, text: str):
+    now = time.perf_counter()
+    if text == codec.ACS_STOP_AUDIO:
+      self.stops += 1
+      # Anything still buffered is dropped; playback ends now.
+      self.play_end = min(self.play_end, now)
+      return
+    # Payload size -> duration (base64 length * 3/4 bytes of PCM16 mono).
+    b64 = text[len('{"kind":"AudioData","audioData":{"data":"') : -3]
+    duration = (len(b64) * 3 // 4) / (_RATE * 2)
+    self.play_end = max(self.play_end, now) + duration
+    self.frames += 1
+
+
+async def _once(*, paced: bool, stop_audio: bool, lead_ms: int, cancel_after_ms: int) -> float:
+  peer = FakeAcsPeer()
+
+  async def _send(pcm):
+    await peer.send(codec.encode_acs_audio(pcm))
+
+  async def _send_stop():
+    await peer.send(codec.ACS_STOP_AUDIO)
+
+  sender = PacedSender(
+    _send,
+    sample_rate=_RATE,
+    frame_ms=20,
+    lead_ms=lead_ms,
+    paced=paced,
+    send_stop=_send_stop if stop_audio else None,
+  )
+  # AOAI delivers the whole response far ahead of real time.
+  sender.push(bytes(_RATE * 2 * _RESPONSE_MS // 1000))
+  await asyncio.sleep(cancel_after_ms / 1000.0)
+  t_cancel = time.perf_counter()
+  if stop_audio:
+    sender.interrupt()
+  else:
+    sender.clear()
+  await asyncio.sleep(0.05)
+  await sender.close()
+  return max(0.0, peer.play_end - t_cancel) * 1000.0
+
+
+def run(*, runs: int, lead_ms: int, cancel_after_ms: int) -> list[dict]:
+  rows = []
+  for paced in (True, False):
+    for stop_audio in (False, True):
+      tails = [
+        asyncio.run(_once(paced=paced, stop_audio=stop_audio, lead_ms=lead_ms, cancel_after_ms=cancel_after_ms))
+        for _ in range(runs)
+      ]
+      rows.append(
+        {
+          "paced": paced,
+          "stopAudio": stop_audio,
+          "tailMsMedian": round(statistics.median(tails), 1),
+          "tailMsMax": round(max(tails), 1),
+        }
+      )
+  return rows
+
+
+def main() -> int:
+  ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+  ap.add_argument("--runs", type=int, default=5)
+  ap.add_argument("--lead-ms", type=int, default=80)
+  ap.add_argument("--cancel-after-ms", type=int, default=1000)
+  ap.add_argument("--json", help="Write results as JSON to this path.")
+  args = ap.parse_args()
+
+  rows = run(runs=args.runs, lead_ms=args.lead_ms, cancel_after_ms=args.cancel_after_ms)
+  print(f"response={_RESPONSE_MS}ms lead={args.lead_ms}ms cancel after {args.cancel_after_ms}ms")
+  print(f"{'paced':<6} {'stop':<6} {'tail ms p50':>12} {'tail ms max':>12}")
+  for r in rows:
+    print(f"{str(r['paced']):<6} {str(r['stopAudio']):<6} {r['tailMsMedian']:>12.1f} {r['tailMsMax']:>12.1f}")
+  if args.json:
+    with open(args.json, "w", encoding="utf-8") as f:
+      json.dump({"benchmark": "barge_in_flush", "results": rows}, f, indent=2)
+  return 0
+
+
+if __name__ == "__main__":
+  raise SystemExit(main())
@@ -0,0 +1,174 @@
+"""Event-loop lag with per-call DSP inline vs. on the DSP executor.
+
+Simulates `--calls` concurrent calls on one event loop. Every 20 ms each call runs
+the inbound media pipeline (ACS 16 kHz -> AOAI 24 kHz resample, barge-in detector,
+VAD gate) and, while "the assistant speaks", the outbound resample (24 kHz -> 16
+kHz). Calls are staggered across the 20 ms frame period like real arrivals.
+
+Modes:
+  inline  everything on the event loop (default handler behaviour)
+  pool    `media.dsp_executor.DspExecutor` with per-call lanes (MEDIA_WS_DSP_EXECUTOR=1)
+
+A probe task sleeps 5 ms in a loop; its oversleep is the event-loop lag that every
+WebSocket read/write of every call would see. soxr releases the GIL, so the pool
+helps when there are spare cores; on a single core it can only add handoff cost.
+
+Usage (from `server/`):
+  python -m bench.dsp_offload [--calls 64] [--seconds 5] [--threads 4] [--quality HQ] [--json out.json]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import time
+
+from bench import fixtures
+from media.barge_in import BargeInDetector
+from media.dsp_executor import DspExecutor
+from media.resampler import SOXR_AVAILABLE, Resampler
+from media.vad import VadGate
+
+_ACS_RATE = 16000
+_AOAI_RATE = 24000
+_FRAME_MS = 20
+_PROBE_MS = 5
+
+
+class _Call:
+  __slots__ = ("rs_in", "rs_out", "gate", "det", "lane_in", "lane_out")
+
+  def __init__(self, quality: str, dsp: DspExecutor | None):
+    self.rs_in = Resampler(_ACS_RATE, _AOAI_RATE, method="soxr", quality=quality)
+    self.rs_out = Resampler(_AOAI_RATE, _ACS_RATE, method="soxr", quality=quality)
+    self.gate = VadGate(_AOAI_RATE)
+    self.det = BargeInDetector(_AOAI_RATE)
+    self.lane_in = dsp.lane("in") if dsp is not None else None
+    self.lane_out = dsp.lane("out") if dsp is not None else None
+
+  def inbound(self, pcm: bytes, now_ms: int):
+    out = self.rs_in.process(pcm)
+    self.det.process(out, now_ms, armed=True)
+    return self.gate.process(out)
+
+  def outbound(self, pcm24: bytes):
+    return bytes(self.rs_out.process(pcm24))
+
+
+def _percentile(sorted_values: list[float], pct: float) -> float:
+  if not sorted_values:
+    return 0.0
+  idx = min(len(sorted_values) - 1, max(0, int(round(pct / 100.0 * (len(sorted_values) - 1)))))
+  return sorted_values[idx]
+
+
+async def _run_mode(mode: str, *, calls: int, seconds: float, threads: int, quality: str) -> dict:
+  dsp = DspExecutor(threads=threads) if mode == "pool" else None
+  frames_in = fixtures.speech_frames(_ACS_RATE, 50, frame_ms=_FRAME_MS)
+  frames_out = fixtures.speech_frames(_AOAI_RATE, 50, frame_ms=_FRAME_MS, seed=1)
+  state = [_Call(quality, dsp) for _ in range(calls)]
+  stop = False
+  frames = 0
+  late_ms: list[float] = []
+
+  async def call_loop(idx: int, call: _Call):
+    nonlocal frames
+    # Stagger calls across the frame period.
+    await asyncio.sleep(idx * _FRAME_MS / 1000.0 / max(1, calls))
+    nxt = time.perf_counter()
+    n = 0
+    while not stop:
+      now_ms = int(time.perf_counter() * 1000)
+      frame_in = frames_in[(idx + n) % len(frames_in)]
+      frame_out = frames_out[(idx + n) % len(frames_out)]
+      if dsp is None:
+        call.inbound(frame_in, now_ms)
+        call.outbound(frame_out)
+      else:
+        await dsp.run(call.lane_in, call.inbound, frame_in, now_ms)
+        await dsp.run(call.lane_out, call.outbound, frame_out)
+      frames += 1
+      n += 1
+      nxt += _FRAME_MS / 1000.0
+      delay = nxt - time.perf_counter()
+      if delay > 0:
+        await asyncio.sleep(delay)
+      else:
+        # Fell behind real time.
+        nxt = time.perf_counter()
+        await asyncio.sleep(0)
+
+  async def probe():
+    while not stop:
+      t0 = time.perf_counter()
+      await asyncio.sleep(_PROBE_MS / 1000.0)
+      late_ms.append(max(0.0, (time.perf_counter() - t0) * 1000.0 - _PROBE_MS))
+
+  tasks = [asyncio.create_task(call_loop(i, c)) for i, c in enumerate(state)]
+  # Warm-up: let all calls start before measuring.
+  await asyncio.sleep(0.5)
+  frames = 0
+  late_ms.clear()
+  probe_task = asyncio.create_task(probe())
+  cpu0, t0 = time.process_time(), time.perf_counter()
+  await asyncio.sleep(seconds)
+  cpu1, t1 = time.process_time(), time.perf_counter()
+  stop = True
+  await asyncio.gather(probe_task, *tasks, return_exceptions=True)
+  stats = dsp.stats() if dsp is not None else None
+  if dsp is not None:
+    dsp.shutdown()
+
+  lag = sorted(late_ms)
+  expected = calls * (t1 - t0) * 1000.0 / _FRAME_MS
+  return {
+    "mode": mode,
+    "calls": calls,
+    "lagMsP50": round(_percentile(lag, 50), 2),
+    "lagMsP99": round(_percentile(lag, 99), 2),
+    "lagMsMax": round(lag[-1], 2) if lag else 0.0,
+    "realtimePct": round(100.0 * frames / expected, 1) if expected else 0.0,
+    "cpuPct": round(100.0 * (cpu1 - cpu0) / (t1 - t0), 1),
+    "jobsPerBatch": stats["jobsPerBatch"] if stats else None,
+    "inlinePct": stats["inlinePct"] if stats else None,
+  }
+
+
+def run(*, calls: int, seconds: float, threads: int, quality: str) -> list[dict]:
+  return [
+    asyncio.run(_run_mode(mode, calls=calls, seconds=seconds, threads=threads, quality=quality))
+    for mode in ("inline", "pool")
+  ]
+
+
+def main() -> int:
+  ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+  ap.add_argument("--calls", type=int, default=64)
+  ap.add_argument("--seconds", type=float, default=5.0)
+  ap.add_argument("--threads", type=int, default=min(4, os.cpu_count() or 1))
+  ap.add_argument("--quality", default="HQ", help="soxr quality (LQ/MQ/HQ/VHQ).")
+  ap.add_argument("--json", help="Write results as JSON to this path.")
+  args = ap.parse_args()
+
+  if not SOXR_AVAILABLE:
+    print("soxr/numpy not installed; nothing to measure.")
+    return 1
+  rows = run(calls=args.calls, seconds=args.seconds, threads=args.threads, quality=args.quality)
+  print(f"cpus={os.cpu_count()} calls={args.calls} threads={args.threads} soxr={args.quality}")
+  print(f"{'mode':<7} {'lag p50':>8} {'lag p99':>8} {'lag max':>8} {'realtime%':>10} {'cpu%':>6} {'jobs/batch':>10}")
+  for r in rows:
+    jpb = f"{r['jobsPerBatch']:.1f}" if r["jobsPerBatch"] else "-"
+    print(
+      f"{r['mode']:<7} {r['lagMsP50']:>8.2f} {r['lagMsP99']:>8.2f} {r['lagMsMax']:>8.2f} "
+      f"{r['realtimePct']:>10.1f} {r['cpuPct']:>6.1f} {jpb:>10}"
+    )
+  if args.json:
+    with open(args.json, "w", encoding="utf-8") as f:
+      json.dump({"benchmark": "dsp_offload", "cpus": os.cpu_count(), "results": rows}, f, indent=2)
+  return 0
+
+
+if __name__ == "__main__":
+  raise SystemExit(main())
@@ -0,0 +1,133 @@
+"""Deterministic synthetic inputs shared by the benchmarks.
+
+Everything here depends only on its arguments (fixed seeds, NumPy PCG64), so two runs
+on any machine produce byte-identical fixtures and timings stay comparable between
+commits.
+
+- `speech_pcm16`: speech-like PCM16 (pitch contour with harmonics, syllable-rate
+  envelope, short pauses, low noise floor) - voiced for VAD/ZCR purposes, unlike
+  white noise or a pure tone.
+- `split_frames`: cut PCM into fixed-duration frames (20 ms by default).
+- `acs_audio_data` / `acs_audio_metadata` / `aoai_audio_delta`: wire messages built
+  with the stdlib `json`/`base64`, independent of the code under test.
+- `acs_callback_batch`: a Call Automation callback body with `n` mixed events.
+"""
+
+from __future__ import annotations
+
+import base64
+import json
+
+import numpy as np
+
+_SYLLABLE_HZ = 4.0
+_HARMONICS = 12
+_FORMANTS_HZ = ((500.0, 1.0), (1500.0, 0.5), (2500.0, 0.25))
+
+
+def _formant_gain(freqs, width_hz: float = 300.0):
+  g = np.zeros_like(freqs)
+  for center, weight in _FORMANTS_HZ:
+    g += weight * np.exp(-0.5 * ((freqs - center) / width_hz) ** 2)
+  return 0.05 + g
+
+
+def speech_pcm16(rate: int = 16000, ms: int = 1000, *, seed: int = 0, channels: int = 1, level_db: float = -20.0) -> bytes:
+  """`ms` of speech-like PCM16 at `rate`; channels > 1 are interleaved, decorrelated copies."""
+  rng = np.random.default_rng(seed)
+  n = rate * ms // 1000
+  t = np.arange(n, dtype=np.float64) / rate
+
+  out = np.empty((n, max(1, channels)), dtype=np.int16)
+  for c in range(max(1, channels)):
+    # Pitch contour around 120-200 Hz, different per channel/seed.
+    f0_base = 120.0 + 80.0 * rng.random()
+    f0 = f0_base * (1.0 + 0.15 * np.sin(2 * np.pi * 0.7 * t + rng.random() * 6.28))
+    phase = 2 * np.pi * np.cumsum(f0) / rate
+    sig = np.zeros(n)
+    for k in range(1, _HARMONICS + 1):
+      hk = k * f0
+      sig += _formant_gain(hk) * np.sin(k * phase) / k * (hk < rate / 2)
+    # Syllable envelope with ~20% pauses.
+    env = 0.25 + 0.75 * np.clip(np.sin(2 * np.pi * _SYLLABLE_HZ * t + rng.random() * 6.28), 0.0, None) ** 0.5
+    env *= np.abs(np.sin(2 * np.pi * 0.45 * t + rng.random() * 6.28)) > 0.3
+    sig = sig * env + 0.002 * rng.standard_normal(n)
+    # Overall RMS at `level_db` dBFS (voiced parts are correspondingly louder).
+    rms = float(np.sqrt(np.mean(sig * sig))) or 1.0
+    sig *= 10 ** (level_db / 20.0) * 32767.0 / rms
+    out[:, c] = np.clip(sig, -32768, 32767).astype(np.int16)
+  return out.tobytes()
+
+
+def split_frames(pcm: bytes, rate: int, *, frame_ms: int = 20, channels: int = 1) -> list[bytes]:
+  size = rate * frame_ms // 1000 * 2 * channels
+  return [pcm[i : i + size] for i in range(0, len(pcm) - size + 1, size)]
+
+
+def speech_frames(rate: int = 16000, count: int = 50, *, frame_ms: int = 20, seed: int = 0, channels: int = 1) -> list[bytes]:
+  return split_frames(speech_pcm16(rate, count * frame_ms, seed=seed, channels=channels), rate, frame_ms=frame_ms, channels=channels)
+
+
+def acs_audio_data(pcm: bytes, *, participant: str | None = None) -> str:
+  ad = {"data": base64.b64encode(pcm).decode("ascii"), "timestamp": "2024-01-01T00:00:00.000Z", "silent": False}
+  if participant is not None:
+    ad["participantRawID"] = participant
+  return json.dumps({"kind": "AudioData", "audioData": ad})
+
+
+def acs_audio_metadata(rate: int = 16000, channels: int = 1) -> str:
+  return json.dumps(
+    {
+      "kind": "AudioMetadata",
+      "audioMetadata": {"subscriptionId": "bench", "encoding": "PCM", "sampleRate": rate, "channels": channels, "length": 640},
+    }
+  )
+
+
+def aoai_audio_delta(pcm: bytes, *, item_id: str = "item_bench") -> str:
+  return json.dumps(
+    {
+      "type": "response.output_audio.delta",
+      "event_id": "event_bench",
+      "response_id": "resp_bench",
+      "item_id": item_id,
+      "output_index": 0,
+      "content_index": 0,
+      "delta": base64.b64encode(pcm).decode("ascii"),
+    }
+  )
+
+
+_CALLBACK_TYPES = (
+  "Microsoft.Communication.CallConnected",
+  "Microsoft.Communication.MediaStreamingStarted",
+  "Microsoft.Communication.ParticipantsUpdated",
+  "Microsoft.Communication.MediaStreamingStopped",
+  "Microsoft.Communication.CallDisconnected",
+)
+
+
+def acs_callback_batch(n: int, *, seed: int = 0) -> bytes:
+  """Call Automation callback body: a JSON array of `n` CloudEvents."""
+  rng = np.random.default_rng(seed)
+  events = []
+  for i in range(n):
+    ev_type = _CALLBACK_TYPES[int(rng.integers(len(_CALLBACK_TYPES)))]
+    call_id = f"call-{int(rng.integers(1 << 31)):08x}"
+    events.append(
+      {
+        "id": f"evt-{i}",
+        "source": f"calling/callConnections/{call_id}",
+        "type": ev_type,
+        "specversion": "1.0",
+        "time": "2024-01-01T00:00:00.000Z",
+        "data": {
+          "callConnectionId": call_id,
+          "serverCallId": "aHR0cHM6Ly9leGFtcGxlLmNvbS9jYWxs" * 2,
+          "correlationId": f"corr-{i}",
+          "participants": [{"identifier": {"rawId": f"8:acs:p{j}"}, "isMuted": False} for j in range(3)],
+          "mediaStreamingUpdate": {"mediaStreamingStatus": "mediaStreamingStarted", "mediaStreamingStatusDetails": "subscriptionStarted"},
+        },
+      }
+    )
+  return json.dumps(events).encode("utf-8")
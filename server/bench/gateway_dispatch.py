@@ -0,0 +1,141 @@
+"""Compare gateway -> FastAPI dispatch modes: UDS reverse proxy vs in-process ASGI.
+
+Usage (from `server/`):
+  python -m bench.gateway_dispatch --requests 3000 --concurrency 16 [--json out.json]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+
+import aiohttp
+
+import unified_gateway as gw
+
+_CALLBACK_BODY = json.dumps(
+  [
+    {
+      "type": "Microsoft.Communication.MediaStreamingStarted",
+      "data": {"callConnectionId": f"call-{i}", "mediaStreamingUpdate": {"mediaStreamingStatus": "mediaStreamingStarted"}},
+    }
+    for i in range(8)
+  ]
+).encode("utf-8")
+
+_TARGETS = (
+  ("GET", "/api/health", None),
+  ("POST", "/api/callbacks", _CALLBACK_BODY),
+)
+
+
+def _percentile(sorted_values: list[float], pct: float) -> float:
+  if not sorted_values:
+    return 0.0
+  idx = min(len(sorted_values) - 1, max(0, int(round(pct / 100.0 * (len(sorted_values) - 1)))))
+  return sorted_values[idx]
+
+
+async def _drive(base: str, method: str, path: str, body: bytes | None, *, requests: int, concurrency: int) -> dict:
+  latencies: list[float] = []
+  remaining = requests
+  errors = 0
+
+  async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=concurrency)) as session:
+    async def worker():
+      nonlocal remaining, errors
+      while remaining > 0:
+        remaining -= 1
+        t0 = time.perf_counter()
+        async with session.request(method, base + path, data=body) as resp:
+          await resp.read()
+          if resp.status != 200:
+            errors += 1
+        latencies.append(time.perf_counter() - t0)
+
+    # Warm-up (connection pools, FastAPI routing caches).
+    for _ in range(min(50, requests)):
+      async with session.request(method, base + path, data=body) as resp:
+        await resp.read()
+
+    t_start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - t_start
+
+  latencies.sort()
+  return {
+    "requests": len(latencies),
+    "errors": errors,
+    "p50Ms": round(_percentile(latencies, 50) * 1000, 3),
+    "p99Ms": round(_percentile(latencies, 99) * 1000, 3),
+    "rps": round(len(latencies) / elapsed, 1) if elapsed > 0 else 0.0,
+  }
+
+
+async def _run_mode(mode: str, fastapi_app, *, requests: int, concurrency: int) -> list[dict]:
+  server = None
+  client = None
+  lifespan = None
+  if mode == "asgi":
+    lifespan = gw.asgi_bridge.AsgiLifespan(fastapi_app)
+    await lifespan.startup()
+    runner = await gw.start_gateway(asgi_app=fastapi_app, host="127.0.0.1", port=0)
+  else:
+    uds = os.path.join(tempfile.mkdtemp(prefix="bench-gw-"), "fastapi.sock")
+    server = await gw.start_fastapi(fastapi_app=fastapi_app, uds=uds)
+    client = gw.create_upstream_client(uds_path=uds)
+    runner = await gw.start_gateway(upstream_client=client, host="127.0.0.1", port=0)
+
+  port = runner.addresses[0][1]
+  base = f"http://127.0.0.1:{port}"
+  rows = []
+  try:
+    for method, path, body in _TARGETS:
+      res = await _drive(base, method, path, body, requests=requests, concurrency=concurrency)
+      rows.append({"mode": mode, "path": path, **res})
+  finally:
+    await runner.cleanup()
+    if client is not None:
+      await client.aclose()
+    if server is not None:
+      server.should_exit = True
+      await asyncio.sleep(0.2)
+    if lifespan is not None:
+      await lifespan.shutdown()
+  return rows
+
+
+async def _main(args) -> list[dict]:
+  os.environ.setdefault("UVICORN_LOG_LEVEL", "warning")
+  from app import app as fastapi_app
+
+  rows: list[dict] = []
+  for mode in args.modes:
+    rows.extend(await _run_mode(mode, fastapi_app, requests=args.requests, concurrency=args.concurrency))
+  return rows
+
+
+def main() -> int:
+  ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+  ap.add_argument("--requests", type=int, default=3000, help="Requests per endpoint per mode.")
+  ap.add_argument("--concurrency", type=int, default=16)
+  ap.add_argument("--modes", nargs="+", default=["uds", "asgi"], choices=["uds", "asgi"])
+  ap.add_argument("--json", help="Write results as JSON to this path.")
+  args = ap.parse_args()
+
+  rows = asyncio.run(_main(args))
+  print(f"{'mode':<6} {'path':<16} {'p50 ms':>8} {'p99 ms':>8} {'req/s':>9} {'errors':>6}")
+  for r in rows:
+    print(f"{r['mode']:<6} {r['path']:<16} {r['p50Ms']:>8.3f} {r['p99Ms']:>8.3f} {r['rps']:>9.1f} {r['errors']:>6}")
+  if args.json:
+    with open(args.json, "w", encoding="utf-8") as f:
+      json.dump({"benchmark": "gateway_dispatch", "results": rows}, f, indent=2)
+  return 0
+
+
+if __name__ == "__main__":
+  raise SystemExit(main())
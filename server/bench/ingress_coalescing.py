@@ -0,0 +1,107 @@
+"""CPU per call for input_audio_buffer.append at different coalescing windows.
+
+Streams `--seconds` of 20 ms frames (24 kHz PCM16, i.e. after resampling) through
+`media.coalescer.IngressCoalescer` and sends each batch as an append event over a
+loopback WebSocket, as fast as possible. CPU is process time (sender + local
+receiver) per second of call audio; window 20 equals the previous one-append-per-frame path.
+
+Usage (from `server/`):
+  python -m bench.ingress_coalescing [--seconds 60] [--windows 20,60,100,200] [--json out.json]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import random
+import time
+
+import websockets
+
+from media import codec
+from media.coalescer import APPEND_OVERHEAD_BYTES, IngressCoalescer
+
+_RATE = 24000
+_FRAME_BYTES = _RATE * 2 * 20 // 1000
+
+
+async def _measure(window_ms: int, seconds: int) -> dict:
+  frames = [random.Random(i).randbytes(_FRAME_BYTES) for i in range(50)]
+  n_frames = seconds * 50
+  received = 0
+  done = asyncio.Event()
+  expected: list[int] = []
+
+  async def _sink(ws):
+    nonlocal received
+    async for _ in ws:
+      received += 1
+      if expected and received >= expected[0]:
+        done.set()
+
+  async with websockets.serve(_sink, "127.0.0.1", 0) as server:
+    port = server.sockets[0].getsockname()[1]
+    async with websockets.connect(f"ws://127.0.0.1:{port}") as ws:
+      co = IngressCoalescer(_RATE, window_ms=window_ms)
+      wire = 0
+      cpu0 = time.process_time()
+      for i in range(n_frames):
+        batch = co.push(frames[i % len(frames)])
+        if batch:
+          msg = codec.encode_aoai_append(batch)
+          wire += len(msg)
+          await ws.send(msg)
+      batch = co.flush()
+      if batch:
+        msg = codec.encode_aoai_append(batch)
+        wire += len(msg)
+        await ws.send(msg)
+      expected.append(co.messages_out)
+      if received < co.messages_out:
+        await done.wait()
+      cpu_s = time.process_time() - cpu0
+
+  msgs = co.messages_out
+  return {
+    "windowMs": window_ms,
+    "messagesPerS": round(msgs / seconds, 1),
+    "wireBytesPerS": round((wire + msgs * 8) / seconds),
+    "overheadBytesPerS": round(msgs * APPEND_OVERHEAD_BYTES / seconds),
+    "cpuMsPerCallS": round(cpu_s * 1000.0 / seconds, 3),
+  }
+
+
+def run(*, seconds: int, windows: list[int]) -> list[dict]:
+  rows = [asyncio.run(_measure(w, seconds)) for w in windows]
+  base = rows[0]
+  for r in rows:
+    r["msgsSavedPerS"] = round(base["messagesPerS"] - r["messagesPerS"], 1)
+    r["bytesSavedPerS"] = base["wireBytesPerS"] - r["wireBytesPerS"]
+  return rows
+
+
+def main() -> int:
+  ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+  ap.add_argument("--seconds", type=int, default=60, help="Seconds of call audio per window size.")
+  ap.add_argument("--windows", default="20,60,100,200", help="Comma-separated window sizes (ms).")
+  ap.add_argument("--json", help="Write results as JSON to this path.")
+  args = ap.parse_args()
+
+  windows = [int(w) for w in args.windows.split(",") if w.strip()]
+  rows = run(seconds=args.seconds, windows=windows)
+  print(f"json backend: {codec.JSON_BACKEND}")
+  print(f"{'window':>7} {'msg/s':>7} {'wire B/s':>9} {'saved msg/s':>12} {'saved B/s':>10} {'cpu ms/call-s':>14}")
+  for r in rows:
+    print(
+      f"{r['windowMs']:>5}ms {r['messagesPerS']:>7.1f} {r['wireBytesPerS']:>9} {r['msgsSavedPerS']:>12.1f}"
+      f" {r['bytesSavedPerS']:>10} {r['cpuMsPerCallS']:>14.3f}"
+    )
+  if args.json:
+    with open(args.json, "w", encoding="utf-8") as f:
+      json.dump({"benchmark": "ingress_coalescing", "results": rows}, f, indent=2)
+  return 0
+
+
+if __name__ == "__main__":
+  raise SystemExit(main())
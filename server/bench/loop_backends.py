@@ -0,0 +1,232 @@
+"""Gateway event-loop backends (GATEWAY_LOOP=asyncio|uvloop): per-call CPU and WS throughput.
+
+Starts the real single-process gateway (`python app.py`) once per backend against a
+local fake AOAI Realtime endpoint (the one from `bench.worker_scaling`) and runs two
+phases against it:
+
+- paced: `--calls` media WebSockets each stream a 20 ms PCM frame every 20 ms (real
+  time, like ACS). The gateway's CPU time over the window (`process_cpu_seconds_total`
+  from /metrics) divided by calls and seconds is the CPU cost of one call; the p99
+  event-loop lag comes from the gateway's own probe.
+- flood: the same number of WebSockets send frames as fast as the gateway accepts them.
+  Inbound WS messages per second and audio seconds appended to AOAI per wall second
+  are the throughput ceiling of one process.
+
+Load clients run in their own processes on the standard asyncio loop, so only the
+gateway's loop changes between rows. On a host with few cores the clients compete with
+the gateway for CPU; compare rows from the same host only.
+
+Usage (from `server/`):
+  python -m bench.loop_backends [--backends asyncio,uvloop] [--calls 20] [--seconds 10] [--json out.json]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import multiprocessing as mp
+import os
+import subprocess
+import sys
+import time
+import urllib.request
+
+from bench import fixtures
+from bench.worker_scaling import _fake_aoai_main, _wait_ready
+
+_RATE = 16000
+_FRAME_S = 0.02
+_SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _client_main(url: str, calls: int, seconds: float, paced: bool, sent, client_id: int) -> None:
+  import websockets
+
+  frames = [fixtures.acs_audio_data(f) for f in fixtures.speech_frames(_RATE, 50)]
+  meta = fixtures.acs_audio_metadata(_RATE)
+
+  async def _call(idx: int, start: float, deadline: float):
+    headers = {"x-ms-call-connection-id": f"loop-bench-{client_id}-{idx}"}
+    async with websockets.connect(url, additional_headers=headers, max_size=None) as ws:
+      await ws.send(meta)
+      n = 0
+      # Stagger paced calls across the frame period, like independent ACS streams.
+      t_next = start + (idx % 20) * _FRAME_S / 20
+      while time.monotonic() < deadline:
+        if paced:
+          delay = t_next - time.monotonic()
+          if delay > 0:
+            await asyncio.sleep(delay)
+          t_next += _FRAME_S
+        await ws.send(frames[n % len(frames)])
+        n += 1
+        if not paced and n % 50 == 0:
+          await asyncio.sleep(0)
+      with sent.get_lock():
+        sent.value += n
+
+  async def _main():
+    start = time.monotonic()
+    deadline = start + seconds
+    await asyncio.gather(*(_call(i, start, deadline) for i in range(calls)), return_exceptions=True)
+
+  asyncio.run(_main())
+
+
+def _scrape(port: int) -> dict[str, float]:
+  """Selected samples from the gateway's /metrics."""
+  want = ("process_cpu_seconds_total", "event_loop_lag_seconds_bucket", "event_loop_lag_seconds_count")
+  out: dict[str, float] = {}
+  # Generous timeout: during the flood phase the gateway loop is saturated on purpose.
+  with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics", timeout=15) as r:
+    for line in r.read().decode("utf-8").splitlines():
+      if line.startswith(want):
+        name, _, value = line.rpartition(" ")
+        out[name] = float(value)
+  return out
+
+
+def _lag_p99_ms(before: dict, after: dict) -> float | None:
+  total = after.get("event_loop_lag_seconds_count", 0) - before.get("event_loop_lag_seconds_count", 0)
+  if total <= 0:
+    return None
+  buckets = []
+  for name, v in after.items():
+    if name.startswith("event_loop_lag_seconds_bucket"):
+      le = name.split('le="', 1)[1].split('"', 1)[0]
+      buckets.append((float("inf") if le == "+Inf" else float(le), v - before.get(name, 0)))
+  for le, count in sorted(buckets):
+    if count >= total * 0.99:
+      return None if le == float("inf") else le * 1000.0
+  return None
+
+
+def _phase(ctx, url: str, port: int, *, paced: bool, clients: int, calls: int, seconds: float, warmup_s: float, appended) -> dict:
+  sent = ctx.Value("q", 0)
+  per_client = [calls // clients + (1 if i < calls % clients else 0) for i in range(clients)]
+  procs = [
+    ctx.Process(target=_client_main, args=(url, n, warmup_s + seconds, paced, sent, i), daemon=True)
+    for i, n in enumerate(per_client)
+    if n
+  ]
+  for p in procs:
+    p.start()
+  time.sleep(warmup_s)
+  m0, a0, t0 = _scrape(port), appended.value, time.perf_counter()
+  time.sleep(seconds)
+  m1, a1, t1 = _scrape(port), appended.value, time.perf_counter()
+  for p in procs:
+    p.join(30)
+  wall = t1 - t0
+  cpu_s = m1.get("process_cpu_seconds_total", 0) - m0.get("process_cpu_seconds_total", 0)
+  # AOAI input is 24 kHz PCM16; one inbound WS message per 20 ms frame.
+  audio_s = (a1 - a0) / (24000 * 2)
+  return {
+    "gatewayCpuPct": round(100.0 * cpu_s / wall, 1),
+    "cpuMsPerCallSecond": round(1000.0 * cpu_s / wall / calls, 2),
+    "lagP99Ms": _lag_p99_ms(m0, m1),
+    "audioSecondsPerSecond": round(audio_s / wall, 1),
+    "wsMessagesPerSecond": round(audio_s / _FRAME_S / wall),
+    "framesSent": sent.value,
+  }
+
+
+def _measure(backend: str, *, clients: int, calls: int, seconds: float, warmup_s: float, port: int, aoai_port: int) -> dict:
+  ctx = mp.get_context("spawn")
+  appended = ctx.Value("q", 0)
+  ready = ctx.Event()
+  aoai = ctx.Process(target=_fake_aoai_main, args=(aoai_port, appended, ready), daemon=True)
+  aoai.start()
+  ready.wait(10)
+
+  env = dict(
+    os.environ,
+    GATEWAY_LOOP=backend,
+    GATEWAY_WORKERS="1",
+    GATEWAY_PORT=str(port),
+    GATEWAY_SUPERVISOR_PORT="0",
+    FASTAPI_UDS=os.path.join(_SERVER_DIR, ".run", f"bench-{port}.sock"),
+    AZURE_OPENAI_ENDPOINT=f"http://127.0.0.1:{aoai_port}",
+    AZURE_OPENAI_DEPLOYMENT="bench",
+    AZURE_OPENAI_API_KEY="bench",
+    MEDIA_WS_ENABLE_AOAI="1",
+    AOAI_POOL_MIN_SIZE="0",
+    GATEWAY_LOOP_MONITOR_INTERVAL_MS="10",
+    # Measure processing capacity, not the overload policies.
+    GATEWAY_MAX_CALLS="0",
+    GATEWAY_MAX_LOOP_LAG_MS="0",
+    MEDIA_WS_AOAI_SEND_QUEUE_MAX_MS="600000",
+    MEDIA_WS_AOAI_SEND_QUEUE_MAX_ITEMS="100000",
+  )
+  gateway = subprocess.Popen(
+    [sys.executable, "app.py"], cwd=_SERVER_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+  )
+  try:
+    _wait_ready(port, 0, 1)
+    url = f"ws://127.0.0.1:{port}/ws/media"
+    kw = dict(clients=clients, calls=calls, seconds=seconds, warmup_s=warmup_s, appended=appended)
+    paced = _phase(ctx, url, port, paced=True, **kw)
+    flood = _phase(ctx, url, port, paced=False, **kw)
+  finally:
+    gateway.terminate()
+    try:
+      gateway.wait(15)
+    except subprocess.TimeoutExpired:
+      gateway.kill()
+    aoai.terminate()
+    aoai.join(5)
+  return {"backend": backend, "calls": calls, "paced": paced, "flood": flood}
+
+
+def run(*, backends: list[str], clients: int, calls: int, seconds: float, warmup_s: float, port: int, aoai_port: int) -> list[dict]:
+  return [
+    _measure(b, clients=clients, calls=calls, seconds=seconds, warmup_s=warmup_s, port=port, aoai_port=aoai_port)
+    for b in backends
+  ]
+
+
+def main() -> int:
+  ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+  ap.add_argument("--backends", default="asyncio,uvloop", help="Comma-separated GATEWAY_LOOP values.")
+  ap.add_argument("--clients", type=int, default=2, help="Load generator processes.")
+  ap.add_argument("--calls", type=int, default=20, help="Concurrent media WebSockets (all clients).")
+  ap.add_argument("--seconds", type=float, default=10.0, help="Measured window per phase.")
+  ap.add_argument("--warmup", type=float, default=3.0)
+  ap.add_argument("--port", type=int, default=18820)
+  ap.add_argument("--aoai-port", type=int, default=18830)
+  ap.add_argument("--json", help="Write results as JSON to this path.")
+  args = ap.parse_args()
+
+  from loop_backend import uvloop
+
+  backends = [b.strip().lower() for b in args.backends.split(",") if b.strip()]
+  if "uvloop" in backends and uvloop is None:
+    print("uvloop is not installed; the uvloop row would run on asyncio", file=sys.stderr)
+    return 2
+  rows = run(
+    backends=backends,
+    clients=max(1, args.clients),
+    calls=max(1, args.calls),
+    seconds=args.seconds,
+    warmup_s=args.warmup,
+    port=args.port,
+    aoai_port=args.aoai_port,
+  )
+  print(f"cpus={os.cpu_count()} calls={args.calls} measured {args.seconds}s per phase")
+  print(f"{'backend':>8} {'cpu%':>6} {'ms/call-s':>10} {'lag p99':>8} | {'flood msg/s':>11} {'audio s/s':>10}")
+  for r in rows:
+    p, f = r["paced"], r["flood"]
+    lag = f"{p['lagP99Ms']:.1f}" if p["lagP99Ms"] is not None else "-"
+    print(
+      f"{r['backend']:>8} {p['gatewayCpuPct']:>6.1f} {p['cpuMsPerCallSecond']:>10.2f} {lag:>8} | "
+      f"{f['wsMessagesPerSecond']:>11} {f['audioSecondsPerSecond']:>10.1f}"
+    )
+  if args.json:
+    with open(args.json, "w", encoding="utf-8") as fh:
+      json.dump({"benchmark": "loop_backends", "cpus": os.cpu_count(), "results": rows}, fh, indent=2)
+  return 0
+
+
+if __name__ == "__main__":
+  raise SystemExit(main())
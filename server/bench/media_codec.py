@@ -0,0 +1,142 @@
+"""Per-frame cost of ACS/AOAI audio frame encoding/decoding: previous code vs `media.codec`.
+
+Cases (20 ms frames unless noted):
+- acs_in:      inbound ACS AudioData (16 kHz) -> PCM bytes
+- acs_out:     PCM (100 ms @ 16 kHz) -> outbound ACS AudioData text
+- aoai_append: PCM (24 kHz) -> input_audio_buffer.append text
+- aoai_delta:  response.output_audio.delta text (24 kHz) -> PCM bytes
+
+"new" is the path the gateway takes for the selected JSON backend: payload slicing
+with stdlib json, a full orjson parse otherwise (media.codec.SLICE_FAST_PATH).
+
+Usage (from `server/`):
+  python -m bench.media_codec [--iterations 20000] [--json out.json]
+"""
+
+from __future__ import annotations
+
+import argparse
+import base64
+import json
+import random
+import time
+
+from media import codec
+
+
+def _pcm(n_bytes: int, seed: int) -> bytes:
+  return random.Random(seed).randbytes(n_bytes)
+
+
+def _cases() -> list[tuple[str, object, object, object]]:
+  acs_pcm = _pcm(640, 1)
+  acs_msg = json.dumps(
+    {
+      "kind": "AudioData",
+      "audioData": {
+        "timestamp": "2025-01-01T00:00:00.000Z",
+        "participantRawID": "8:acs:00000000-0000-0000-0000-000000000000_00000000-0000-0000-0000-000000000000",
+        "data": base64.b64encode(acs_pcm).decode("ascii"),
+        "silent": False,
+      },
+    }
+  )
+  out_pcm = _pcm(3200, 2)
+  aoai_pcm = _pcm(960, 3)
+  delta_msg = json.dumps(
+    {
+      "type": "response.output_audio.delta",
+      "event_id": "event_abc",
+      "response_id": "resp_abc",
+      "item_id": "item_abc",
+      "output_index": 0,
+      "content_index": 0,
+      "delta": base64.b64encode(aoai_pcm).decode("ascii"),
+    }
+  )
+
+  def old_acs_in(msg=acs_msg):
+    obj = json.loads(msg)
+    return base64.b64decode(obj.get("audioData", {}).get("data"))
+
+  def new_acs_in(msg=acs_msg):
+    if codec.SLICE_FAST_PATH:
+      return codec.b64decode(codec.extract_acs_audio(msg)[0])
+    return codec.b64decode(codec.loads(msg)["audioData"]["data"])
+
+  def old_acs_out(pcm=out_pcm):
+    return json.dumps({"kind": "AudioData", "audioData": {"data": base64.b64encode(pcm).decode("ascii")}})
+
+  def new_acs_out(pcm=out_pcm):
+    return codec.encode_acs_audio(pcm)
+
+  def old_append(pcm=aoai_pcm):
+    return json.dumps({"type": "input_audio_buffer.append", "audio": base64.b64encode(pcm).decode("ascii")})
+
+  def new_append(pcm=aoai_pcm):
+    return codec.encode_aoai_append(pcm)
+
+  def old_delta(msg=delta_msg):
+    return base64.b64decode(json.loads(msg).get("delta"))
+
+  def new_delta(msg=delta_msg):
+    if codec.SLICE_FAST_PATH:
+      return codec.b64decode(codec.extract_aoai_audio_delta(msg)[1])
+    return codec.b64decode(codec.loads(msg)["delta"])
+
+  assert old_acs_in() == new_acs_in() and old_delta() == new_delta()
+  assert json.loads(old_acs_out()) == json.loads(new_acs_out())
+  assert json.loads(old_append()) == json.loads(new_append())
+  return [
+    ("acs_in", old_acs_in, new_acs_in),
+    ("acs_out", old_acs_out, new_acs_out),
+    ("aoai_append", old_append, new_append),
+    ("aoai_delta", old_delta, new_delta),
+  ]
+
+
+def _time_us(fn, iterations: int) -> float:
+  for _ in range(min(1000, iterations)):
+    fn()
+  t0 = time.perf_counter_ns()
+  for _ in range(iterations):
+    fn()
+  return (time.perf_counter_ns() - t0) / iterations / 1000.0
+
+
+def run(*, iterations: int) -> list[dict]:
+  rows = []
+  for name, old, new in _cases():
+    old_us = _time_us(old, iterations)
+    new_us = _time_us(new, iterations)
+    rows.append(
+      {
+        "case": name,
+        "oldUs": round(old_us, 3),
+        "newUs": round(new_us, 3),
+        "speedup": round(old_us / new_us, 2) if new_us else None,
+        "jsonBackend": codec.JSON_BACKEND,
+      }
+    )
+  return rows
+
+
+def main() -> int:
+  ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+  ap.add_argument("--iterations", type=int, default=20000)
+  ap.add_argument("--json", help="Write results as JSON to this path.")
+  args = ap.parse_args()
+
+  rows = run(iterations=args.iterations)
+  print(f"json backend: {codec.JSON_BACKEND}")
+  print(f"{'case':<12} {'old us':>8} {'new us':>8} {'speedup':>8}")
+  for r in rows:
+    print(f"{r['case']:<12} {r['oldUs']:>8.3f} {r['newUs']:>8.3f} {r['speedup']:>7.2f}x")
+  if args.json:
+    with open(args.json, "w", encoding="utf-8") as f:
+      json.dump({"benchmark": "media_codec", "results": rows}, f, indent=2)
+  return 0
+
+
+if __name__ == "__main__":
+  raise SystemExit(main())
@@ -0,0 +1,111 @@
+"""Per-frame cost of the streaming resampler: legacy float path vs `media.resampler.Resampler`.
+
+Reports CPU time per 20 ms frame and transient heap allocation per frame
+(tracemalloc peak above baseline) for 16k->24k (ACS -> AOAI) and 24k->16k (AOAI -> ACS).
+
+Usage (from `server/`):
+  python -m bench.resampler [--frames 3000] [--quality HQ] [--json out.json]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import time
+import tracemalloc
+
+import numpy as np
+import soxr
+
+from bench import fixtures
+from media.resampler import Resampler
+
+
+def _legacy_resample(pcm: bytes, *, src_rate: int, dst_rate: int, state: dict | None, quality: str):
+  # The pre-Resampler implementation (int16 -> float32 -> soxr -> clip -> int16 -> bytes),
+  # kept here only as the benchmark baseline.
+  pcm = pcm[: len(pcm) - (len(pcm) % 2)]
+  x = np.frombuffer(pcm, dtype=np.int16).astype(np.float32) / 32768.0
+  if (
+    state is None
+    or state.get("src_rate") != src_rate
+    or state.get("dst_rate") != dst_rate
+    or state.get("quality") != quality
+    or state.get("stream") is None
+  ):
+    state = {
+      "kind": "soxr",
+      "src_rate": src_rate,
+      "dst_rate": dst_rate,
+      "quality": quality,
+      "stream": soxr.ResampleStream(src_rate, dst_rate, 1, dtype="float32", quality=quality),
+    }
+  y = state["stream"].resample_chunk(x, last=False)
+  y16 = np.clip(y * 32768.0, -32768.0, 32767.0).astype(np.int16)
+  return y16.tobytes(), state
+
+
+def _measure(step, frames: list[bytes]) -> dict:
+  # Warm-up (filter start-up, lazy allocations).
+  for f in frames[:50]:
+    step(f)
+
+  t0 = time.perf_counter_ns()
+  for f in frames:
+    step(f)
+  cpu_us = (time.perf_counter_ns() - t0) / len(frames) / 1000.0
+
+  tracemalloc.start()
+  peaks = []
+  for f in frames[:200]:
+    base, _ = tracemalloc.get_traced_memory()
+    tracemalloc.reset_peak()
+    step(f)
+    _, peak = tracemalloc.get_traced_memory()
+    peaks.append(peak - base)
+  tracemalloc.stop()
+  return {"usPerFrame": round(cpu_us, 2), "allocBytesPerFrame": int(sum(peaks) / len(peaks))}
+
+
+def run(*, frames: int, quality: str) -> list[dict]:
+  rows = []
+  for src, dst in ((16000, 24000), (24000, 16000)):
+    data = fixtures.speech_frames(src, frames)
+
+    legacy_state = {"s": None}
+
+    def legacy(f, _src=src, _dst=dst):
+      _, legacy_state["s"] = _legacy_resample(f, src_rate=_src, dst_rate=_dst, state=legacy_state["s"], quality=quality)
+
+    rs = Resampler(src, dst, method="soxr", quality=quality)
+    sink = memoryview(bytearray(16384))
+
+    def current(f):
+      # Consumers copy the view into their own (reused) buffer; include that copy in the cost.
+      out = rs.process(f)
+      sink[: len(out)] = out
+
+    for name, step in (("legacy", legacy), ("Resampler", current)):
+      rows.append({"impl": name, "direction": f"{src // 1000}k->{dst // 1000}k", "quality": quality, **_measure(step, data)})
+  return rows
+
+
+def main() -> int:
+  ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+  ap.add_argument("--frames", type=int, default=3000)
+  ap.add_argument("--quality", default="HQ", help="soxr quality: QQ/LQ/MQ/HQ/VHQ")
+  ap.add_argument("--json", help="Write results as JSON to this path.")
+  args = ap.parse_args()
+
+  rows = run(frames=args.frames, quality=args.quality)
+  print(f"{'impl':<10} {'direction':<10} {'quality':<7} {'us/frame':>9} {'alloc B/frame':>14}")
+  for r in rows:
+    print(f"{r['impl']:<10} {r['direction']:<10} {r['quality']:<7} {r['usPerFrame']:>9.2f} {r['allocBytesPerFrame']:>14}")
+  if args.json:
+    with open(args.json, "w", encoding="utf-8") as f:
+      json.dump({"benchmark": "resampler", "results": rows}, f, indent=2)
+  return 0
+
+
+if __name__ == "__main__":
+  raise SystemExit(main())
@@ -0,0 +1,119 @@
+"""Does a slow ACS peer delay AOAI event handling? Inline sends vs per-direction queues.
+
+A simulated AOAI pump handles one audio delta every `--interval-ms` and forwards it
+toward an ACS socket whose `send` takes `--acs-send-ms`. The metric is handling
+lag: how late each event is processed relative to its arrival.
+
+- inline: the pump awaits the ACS send for every delta (previous behaviour)
+- queued: the pump pushes into the bounded `PacedSender` and moves on
+
+Exits 1 when the queued mode's p99 lag exceeds `--max-lag-ms`, so the run doubles as
+a regression check that a slow ACS peer never holds up the AOAI pump.
+
+Usage (from `server/`):
+  python -m bench.slow_peer [--events 200] [--interval-ms 5] [--acs-send-ms 50] [--max-lag-ms 20] [--json out.json]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+
+from media import codec
+from media.playout import PacedSender
+
+_ACS_RATE = 16000
+_DELTA_BYTES = 960  # 20 ms @ 24 kHz, forwarded as 30 ms @ 16 kHz after resampling
+
+
+class _SlowWS:
+  def __init__(self, delay_s: float):
+    self.delay_s = delay_s
+    self.sent = 0
+
+  async def send(self, _text: str):
+    await asyncio.sleep(self.delay_s)
+    self.sent += 1
+
+
+def _pct(values: list[float], p: float) -> float:
+  s = sorted(values)
+  return s[min(len(s) - 1, int(len(s) * p))]
+
+
+async def _pump(mode: str, *, events: int, interval_s: float, acs_send_s: float, policy: str) -> dict:
+  ws = _SlowWS(acs_send_s)
+  pcm = bytes(_DELTA_BYTES)
+
+  async def _send(frame):
+    await ws.send(codec.encode_acs_audio(frame))
+
+  sender = PacedSender(_send, sample_rate=_ACS_RATE, frame_ms=20, paced=False, max_queue_ms=2000, policy=policy)
+  lags: list[float] = []
+  t0 = time.perf_counter()
+  for i in range(events):
+    due = t0 + i * interval_s
+    now = time.perf_counter()
+    if due > now:
+      await asyncio.sleep(due - now)
+    lags.append((time.perf_counter() - due) * 1000.0)
+    if mode == "inline":
+      await ws.send(codec.encode_acs_audio(pcm))
+    else:
+      sender.push(pcm)
+  elapsed = time.perf_counter() - t0
+  stats = sender.stats()
+  await sender.close()
+  return {
+    "mode": mode,
+    "lagP50Ms": round(_pct(lags, 0.50), 2),
+    "lagP99Ms": round(_pct(lags, 0.99), 2),
+    "lagMaxMs": round(max(lags), 2),
+    "pumpSeconds": round(elapsed, 3),
+    "acsSent": ws.sent,
+    "bytesShed": stats["bytesShed"] if mode == "queued" else 0,
+    "maxQueueDepthMs": stats["maxQueueDepthMs"] if mode == "queued" else None,
+  }
+
+
+def run(*, events: int, interval_ms: float, acs_send_ms: float, policy: str) -> list[dict]:
+  kw = dict(events=events, interval_s=interval_ms / 1000.0, acs_send_s=acs_send_ms / 1000.0, policy=policy)
+  return [asyncio.run(_pump(mode, **kw)) for mode in ("inline", "queued")]
+
+
+def main() -> int:
+  ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+  ap.add_argument("--events", type=int, default=200)
+  ap.add_argument("--interval-ms", type=float, default=5.0)
+  ap.add_argument("--acs-send-ms", type=float, default=50.0)
+  ap.add_argument("--policy", default="drop_oldest", help="coalesce | drop_oldest | disconnect")
+  ap.add_argument(
+    "--max-lag-ms", type=float, default=20.0, help="Fail when the queued mode's p99 handling lag exceeds this (0 = off)."
+  )
+  ap.add_argument("--json", help="Write results as JSON to this path.")
+  args = ap.parse_args()
+
+  rows = run(events=args.events, interval_ms=args.interval_ms, acs_send_ms=args.acs_send_ms, policy=args.policy)
+  print(f"events={args.events} interval={args.interval_ms}ms acs_send={args.acs_send_ms}ms")
+  print(f"{'mode':<8} {'lag p50':>8} {'lag p99':>8} {'lag max':>9} {'pump s':>7} {'shed B':>8}")
+  for r in rows:
+    print(
+      f"{r['mode']:<8} {r['lagP50Ms']:>8.2f} {r['lagP99Ms']:>8.2f} {r['lagMaxMs']:>9.2f}"
+      f" {r['pumpSeconds']:>7.3f} {r['bytesShed']:>8}"
+    )
+  if args.json:
+    with open(args.json, "w", encoding="utf-8") as f:
+      json.dump({"benchmark": "slow_peer", "results": rows}, f, indent=2)
+
+  queued = next(r for r in rows if r["mode"] == "queued")
+  if args.max_lag_ms > 0 and queued["lagP99Ms"] > args.max_lag_ms:
+    print(f"FAIL: queued lag p99 {queued['lagP99Ms']:.2f}ms > {args.max_lag_ms:.2f}ms", file=sys.stderr)
+    return 1
+  return 0
+
+
+if __name__ == "__main__":
+  raise SystemExit(main())
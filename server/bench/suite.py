@@ -0,0 +1,300 @@
+"""Microbenchmark suite for the media hot path, with machine-readable results.
+
+Cases (inputs from `bench.fixtures`, all deterministic):
+- resample/<backend>/<direction>: `media.resampler.Resampler.process` per 20 ms frame,
+  soxr at every quality level and audioop, ACS->AOAI (16k->24k) and AOAI->ACS (24k->16k)
+- downmix/stereo: `media.channels.downmix_pcm16` on a 20 ms stereo frame
+- envelope/*: `media.codec` AudioData (ACS) and input_audio_buffer.append (AOAI) text
+- safe_json/* and extract/acs_audio: parsing ACS media frames (full JSON vs fast path)
+- parse_acs_events/<n>: `app._parse_acs_events` on Call Automation callback batches
+
+Each case is calibrated to ~`--round-ms` per round and timed for `--rounds` rounds with
+the GC disabled. The median and minimum per-op times are reported; `rsd` (relative std
+dev across rounds) says how noisy the host was. Comparisons use the minimum, which is
+the least sensitive to other load on the machine.
+
+Usage (from `server/`):
+  python -m bench.suite [--filter resample] [--json out.json]
+  python -m bench.suite --json new.json --compare base.json [--threshold 10] [--fail-on-regression]
+  python -m bench.suite --results new.json --compare base.json   # compare saved runs only
+"""
+
+from __future__ import annotations
+
+import argparse
+import gc
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+from bench import fixtures
+
+_QUALITIES = ("LQ", "MQ", "HQ", "VHQ")
+_DIRECTIONS = (("16k_24k", 16000, 24000), ("24k_16k", 24000, 16000))
+
+
+# --- cases: name -> setup() returning a zero-arg op ---
+
+
+def _cycle(items: list, fn):
+  n = len(items)
+  i = 0
+
+  def op():
+    nonlocal i
+    fn(items[i])
+    i = (i + 1) % n
+
+  return op
+
+
+def _resample_case(method: str, quality: str, src: int, dst: int):
+  def setup():
+    from media.resampler import Resampler
+
+    rs = Resampler(src, dst, method=method, quality=quality)
+    if rs.kind != method:
+      return None
+    return _cycle(fixtures.speech_frames(src, 100), rs.process)
+
+  return setup
+
+
+def _downmix_setup():
+  from media.channels import downmix_pcm16
+
+  frames = fixtures.speech_frames(16000, 100, channels=2)
+  return _cycle(frames, lambda f: downmix_pcm16(f, 2))
+
+
+def _envelope_case(kind: str, rate: int, ms: int):
+  def setup():
+    from media import codec
+
+    enc = codec.encode_acs_audio if kind == "acs" else codec.encode_aoai_append
+    return _cycle(fixtures.speech_frames(rate, 50, frame_ms=ms), enc)
+
+  return setup
+
+
+def _safe_json_case(which: str):
+  def setup():
+    from scripts.acs_media_ws_server import _safe_json
+
+    if which == "metadata":
+      msgs = [fixtures.acs_audio_metadata()]
+    else:
+      msgs = [fixtures.acs_audio_data(f) for f in fixtures.speech_frames(16000, 50)]
+    return _cycle(msgs, _safe_json)
+
+  return setup
+
+
+def _extract_setup():
+  from media import codec
+
+  msgs = [fixtures.acs_audio_data(f) for f in fixtures.speech_frames(16000, 50)]
+  return _cycle(msgs, codec.extract_acs_audio)
+
+
+def _parse_events_case(n: int):
+  def setup():
+    from app import _parse_acs_events
+
+    body = fixtures.acs_callback_batch(n)
+    return lambda: _parse_acs_events(body)
+
+  return setup
+
+
+def _cases() -> list[tuple[str, object]]:
+  cases = []
+  for dname, src, dst in _DIRECTIONS:
+    for q in _QUALITIES:
+      cases.append((f"resample/soxr-{q}/{dname}", _resample_case("soxr", q, src, dst)))
+    cases.append((f"resample/audioop/{dname}", _resample_case("audioop", "HQ", src, dst)))
+  cases += [
+    ("downmix/stereo_16k_20ms", _downmix_setup),
+    ("envelope/acs_audio_data_20ms", _envelope_case("acs", 16000, 20)),
+    ("envelope/acs_audio_data_100ms", _envelope_case("acs", 16000, 100)),
+    ("envelope/aoai_append_20ms", _envelope_case("aoai", 24000, 20)),
+    ("envelope/aoai_append_60ms", _envelope_case("aoai", 24000, 60)),
+    ("safe_json/acs_audio_data", _safe_json_case("audio")),
+    ("safe_json/acs_audio_metadata", _safe_json_case("metadata")),
+    ("extract/acs_audio_data", _extract_setup),
+    ("parse_acs_events/10", _parse_events_case(10)),
+    ("parse_acs_events/100", _parse_events_case(100)),
+    ("parse_acs_events/1000", _parse_events_case(1000)),
+  ]
+  return cases
+
+
+# --- timing ---
+
+
+def _time_rounds(op, *, rounds: int, round_ms: float) -> dict:
+  # Warm-up + calibration: grow the iteration count until one round takes round_ms.
+  iterations = 1
+  while True:
+    t0 = time.perf_counter_ns()
+    for _ in range(iterations):
+      op()
+    elapsed = time.perf_counter_ns() - t0
+    if elapsed >= round_ms * 1e6 or iterations >= 1 << 22:
+      break
+    iterations = max(iterations * 2, int(iterations * round_ms * 1e6 / max(1, elapsed)))
+
+  per_op: list[float] = []
+  gc_was_enabled = gc.isenabled()
+  gc.collect()
+  gc.disable()
+  try:
+    for _ in range(rounds):
+      t0 = time.perf_counter_ns()
+      for _ in range(iterations):
+        op()
+      per_op.append((time.perf_counter_ns() - t0) / iterations / 1000.0)
+  finally:
+    if gc_was_enabled:
+      gc.enable()
+  med = statistics.median(per_op)
+  return {
+    "usMedian": round(med, 3),
+    "usMin": round(min(per_op), 3),
+    "rsdPct": round(100.0 * statistics.pstdev(per_op) / med, 1) if med else 0.0,
+    "iterations": iterations,
+    "rounds": rounds,
+  }
+
+
+def _meta() -> dict:
+  def _version(mod: str):
+    try:
+      return __import__(mod).__version__
+    except Exception:
+      return None
+
+  try:
+    commit = subprocess.run(
+      ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5, check=False
+    ).stdout.strip() or None
+  except Exception:
+    commit = None
+  from media import codec
+
+  return {
+    "commit": commit,
+    "python": sys.version.split()[0],
+    "platform": platform.platform(),
+    "machine": platform.machine(),
+    "cpus": os.cpu_count(),
+    "numpy": _version("numpy"),
+    "soxr": _version("soxr"),
+    "jsonBackend": codec.JSON_BACKEND,
+  }
+
+
+def run(*, filters: list[str], rounds: int, round_ms: float) -> list[dict]:
+  rows = []
+  for name, setup in _cases():
+    if filters and not any(f in name for f in filters):
+      continue
+    try:
+      op = setup()
+    except ImportError as e:
+      rows.append({"name": name, "skipped": f"import failed: {e}"})
+      continue
+    if op is None:
+      rows.append({"name": name, "skipped": "backend not available"})
+      continue
+    rows.append({"name": name, **_time_rounds(op, rounds=rounds, round_ms=round_ms)})
+  return rows
+
+
+# --- comparison ---
+
+
+def compare(base: dict, current: dict, *, threshold_pct: float) -> list[dict]:
+  """Per-case change of the minimum; a regression must exceed both the threshold and the noise."""
+  base_rows = {r["name"]: r for r in base.get("results", []) if "usMin" in r}
+  out = []
+  for r in current.get("results", []):
+    b = base_rows.get(r["name"])
+    if b is None or "usMin" not in r:
+      continue
+    delta = 100.0 * (r["usMin"] - b["usMin"]) / b["usMin"] if b["usMin"] else 0.0
+    noise = 2.0 * max(r.get("rsdPct", 0.0), b.get("rsdPct", 0.0))
+    limit = max(threshold_pct, noise)
+    status = "regression" if delta > limit else "improvement" if delta < -limit else "same"
+    out.append({"name": r["name"], "baseUs": b["usMin"], "us": r["usMin"], "deltaPct": round(delta, 1), "status": status})
+  return out
+
+
+def _print_results(rows: list[dict]) -> None:
+  width = max([len(r["name"]) for r in rows] + [4])
+  print(f"{'case':<{width}} {'us/op':>10} {'min':>10} {'rsd%':>6}")
+  for r in rows:
+    if "skipped" in r:
+      print(f"{r['name']:<{width}} {'skipped: ' + r['skipped']}")
+      continue
+    print(f"{r['name']:<{width}} {r['usMedian']:>10.3f} {r['usMin']:>10.3f} {r['rsdPct']:>6.1f}")
+
+
+def _print_comparison(rows: list[dict], base_meta: dict, cur_meta: dict) -> None:
+  print(f"\ncompare: base {base_meta.get('commit')} -> current {cur_meta.get('commit')}")
+  if (base_meta.get("machine"), base_meta.get("cpus")) != (cur_meta.get("machine"), cur_meta.get("cpus")):
+    print("warning: results come from different machines; ratios are not meaningful")
+  width = max([len(r["name"]) for r in rows] + [4])
+  print(f"{'case':<{width}} {'base min':>10} {'min':>10} {'delta%':>8}  status")
+  for r in rows:
+    print(f"{r['name']:<{width}} {r['baseUs']:>10.3f} {r['us']:>10.3f} {r['deltaPct']:>+8.1f}  {r['status']}")
+
+
+def main() -> int:
+  ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+  ap.add_argument("--filter", action="append", default=[], help="Only cases whose name contains this (repeatable).")
+  ap.add_argument("--rounds", type=int, default=7)
+  ap.add_argument("--round-ms", type=float, default=50.0)
+  ap.add_argument("--json", help="Write results as JSON to this path.")
+  ap.add_argument("--results", help="Load results from this JSON instead of running.")
+  ap.add_argument("--compare", help="Baseline results JSON to compare against.")
+  ap.add_argument("--threshold", type=float, default=10.0, help="Regression threshold in percent.")
+  ap.add_argument("--fail-on-regression", action="store_true", help="Exit 1 when any case regressed.")
+  ap.add_argument("--list", action="store_true", help="List case names and exit.")
+  args = ap.parse_args()
+
+  if args.list:
+    for name, _ in _cases():
+      print(name)
+    return 0
+
+  if args.results:
+    with open(args.results, encoding="utf-8") as f:
+      current = json.load(f)
+  else:
+    current = {
+      "benchmark": "suite",
+      "meta": _meta(),
+      "results": run(filters=args.filter, rounds=args.rounds, round_ms=args.round_ms),
+    }
+  _print_results(current["results"])
+  if args.json:
+    with open(args.json, "w", encoding="utf-8") as f:
+      json.dump(current, f, indent=2)
+
+  if args.compare:
+    with open(args.compare, encoding="utf-8") as f:
+      base = json.load(f)
+    rows = compare(base, current, threshold_pct=args.threshold)
+    _print_comparison(rows, base.get("meta", {}), current.get("meta", {}))
+    if args.fail_on_regression and any(r["status"] == "regression" for r in rows):
+      return 1
+  return 0
+
+
+if __name__ == "__main__":
+  raise SystemExit(main())
@@ -0,0 +1,136 @@
+"""AOAI token cache (`aoai_token_provider.AsyncTokenProvider`) against a fake credential.
+
+No Azure access needed: the credential returns synthetic tokens after `--fetch-ms`, or
+raises when told to. Reports the cost of a cached lookup and checks the cache's
+contract, exiting 1 if any check fails:
+
+- cold:     `--concurrency` simultaneous lookups share one credential call
+- hit:      a fresh token is served from the cache (no credential call)
+- refresh:  inside the refresh margin the cached token is served and one background
+            refresh replaces it
+- failure:  a failing credential is counted, retried, and logged once (rate-limited)
+            rather than on every retry
+
+Usage (from `server/`):
+  python -m bench.token_provider [--fetch-ms 50] [--concurrency 50] [--hits 100000] [--json out.json]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+
+from aoai_token_provider import AsyncTokenProvider
+
+
+class _Token:
+  __slots__ = ("token", "expires_on")
+
+  def __init__(self, token: str, expires_on: float):
+    self.token = token
+    self.expires_on = expires_on
+
+
+class _FakeCredential:
+  """Async `get_token(scope)` with a configurable delay, lifetime and failure switch."""
+
+  def __init__(self, *, fetch_s: float, lifetime_s: float):
+    self.fetch_s = fetch_s
+    self.lifetime_s = lifetime_s
+    self.fail = False
+    self.calls = 0
+
+  async def get_token(self, scope: str) -> _Token:
+    self.calls += 1
+    await asyncio.sleep(self.fetch_s)
+    if self.fail:
+      raise RuntimeError("fake credential failure")
+    return _Token(f"tok-{self.calls}", time.time() + self.lifetime_s)
+
+
+async def _run(*, fetch_ms: float, concurrency: int, hits: int) -> tuple[dict, list[str]]:
+  failures: list[str] = []
+
+  def check(ok: bool, what: str) -> None:
+    if not ok:
+      failures.append(what)
+
+  cred = _FakeCredential(fetch_s=fetch_ms / 1000.0, lifetime_s=3600.0)
+  p = AsyncTokenProvider(credential=cred, refresh_margin_s=300.0, refresh_retry_s=0.5)
+
+  # cold: concurrent first lookups coalesce onto one fetch.
+  t0 = time.perf_counter()
+  tokens = await asyncio.gather(*(p.get_token() for _ in range(concurrency)))
+  cold_ms = (time.perf_counter() - t0) * 1000.0
+  check(cred.calls == 1, f"cold: {cred.calls} credential calls for {concurrency} lookups (want 1)")
+  check(len(set(tokens)) == 1, "cold: callers got different tokens")
+  check(p.misses == 1 and p.coalesced == concurrency - 1, f"cold: misses={p.misses} coalesced={p.coalesced}")
+
+  # hit: fresh token straight from the cache.
+  t0 = time.perf_counter_ns()
+  for _ in range(hits):
+    await p.get_token()
+  hit_us = (time.perf_counter_ns() - t0) / hits / 1000.0
+  check(cred.calls == 1, f"hit: credential called {cred.calls - 1} extra times")
+  check(p.hits == hits, f"hit: hits={p.hits} (want {hits})")
+
+  # refresh: inside the margin the old token is served and refreshed in the background.
+  old = tokens[0]
+  p._expires_on = time.time() + 60.0
+  served = await p.get_token()
+  check(served == old, "refresh: lookup inside the margin waited for a new token")
+  await asyncio.sleep(fetch_ms / 1000.0 * 3 + 0.05)
+  check(cred.calls == 2 and p.refreshes == 2, f"refresh: calls={cred.calls} refreshes={p.refreshes} (want 2)")
+  check(await p.get_token() != old, "refresh: background refresh did not replace the token")
+
+  # failure: counted, retried every refresh_retry_s, surfaced to callers without a token.
+  cred.fail = True
+  p._token = None
+  p._expires_on = 0.0
+  try:
+    await p.get_token()
+    check(False, "failure: lookup succeeded with a failing credential")
+  except RuntimeError:
+    pass
+  await asyncio.sleep(p.refresh_retry_s * 2 + fetch_ms / 1000.0 * 2 + 0.1)
+  check(p.refresh_failures >= 2, f"failure: {p.refresh_failures} failed fetches (want retries)")
+  check(p.consecutive_failures == p.refresh_failures, "failure: consecutive failure count out of step")
+  cred.fail = False
+  await p.get_token()
+  check(p.consecutive_failures == 0, "failure: consecutive failures not reset after recovery")
+
+  stats = p.stats()
+  await p.close()
+  return {"coldMs": round(cold_ms, 2), "hitUs": round(hit_us, 3), "credentialCalls": cred.calls, **stats}, failures
+
+
+def main() -> int:
+  ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+  ap.add_argument("--fetch-ms", type=float, default=50.0, help="Fake credential latency.")
+  ap.add_argument("--concurrency", type=int, default=50, help="Simultaneous cold lookups.")
+  ap.add_argument("--hits", type=int, default=100000, help="Cached lookups to time.")
+  ap.add_argument("--json", help="Write results as JSON to this path.")
+  args = ap.parse_args()
+
+  result, failures = asyncio.run(
+    _run(fetch_ms=args.fetch_ms, concurrency=max(1, args.concurrency), hits=max(1, args.hits))
+  )
+  print(f"fetch={args.fetch_ms}ms concurrency={args.concurrency}")
+  print(f"cold (coalesced) {result['coldMs']:.2f} ms | hit {result['hitUs']:.3f} us | credential calls {result['credentialCalls']}")
+  print(
+    f"hits={result['hits']} misses={result['misses']} coalesced={result['coalesced']} "
+    f"refreshes={result['refreshes']} failures={result['refreshFailures']} refreshMsAvg={result['refreshMsAvg']}"
+  )
+  if args.json:
+    with open(args.json, "w", encoding="utf-8") as f:
+      json.dump({"benchmark": "token_provider", "results": result, "failures": failures}, f, indent=2)
+  for what in failures:
+    print(f"FAIL: {what}", file=sys.stderr)
+  return 1 if failures else 0
+
+
+if __name__ == "__main__":
+  raise SystemExit(main())
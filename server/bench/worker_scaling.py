@@ -0,0 +1,222 @@
+"""Gateway capacity vs. number of worker processes (GATEWAY_WORKERS).
+
+Starts the real gateway (`python app.py`) with N workers against a local fake AOAI
+Realtime endpoint, then drives it from several client processes, each holding
+`--calls` media WebSockets that stream speech-like 20 ms PCM frames as fast as the
+gateway accepts them. The fake AOAI counts appended audio; throughput is reported
+as audio seconds processed per wall second, i.e. how many real-time calls the
+gateway could sustain on this host.
+
+The single-process gateway is bound to one core, so capacity should grow roughly
+linearly with workers up to the number of cores (`os.cpu_count()`); on a 1-core
+host all rows are expected to be about equal.
+
+Usage (from `server/`):
+  python -m bench.worker_scaling [--workers 1,2,4] [--clients 4] [--calls 8] [--seconds 10] [--json out.json]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import multiprocessing as mp
+import os
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+from bench import fixtures
+
+_RATE = 16000
+_SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+# --- fake AOAI (own process) ---
+
+
+def _fake_aoai_main(port: int, appended, ready) -> None:
+  import websockets
+
+  async def _session(ws):
+    async for msg in ws:
+      if '"input_audio_buffer.append"' in msg:
+        start = msg.find('"audio":"') + 9
+        end = msg.find('"', start)
+        with appended.get_lock():
+          appended.value += (end - start) * 3 // 4
+      elif '"session.update"' in msg:
+        await ws.send('{"type":"session.updated"}')
+
+  async def _main():
+    async with websockets.serve(_session, "127.0.0.1", port, max_size=None):
+      ready.set()
+      await asyncio.Future()
+
+  asyncio.run(_main())
+
+
+# --- load clients (own processes) ---
+
+
+def _client_main(url: str, calls: int, seconds: float, sent, client_id: int) -> None:
+  import websockets
+
+  frames = [fixtures.acs_audio_data(f) for f in fixtures.speech_frames(_RATE, 50)]
+  meta = json.dumps({"kind": "AudioMetadata", "audioMetadata": {"sampleRate": _RATE, "channels": 1, "encoding": "PCM"}})
+
+  async def _call(idx: int, deadline: float):
+    headers = {"x-ms-call-connection-id": f"bench-{client_id}-{idx}"}
+    async with websockets.connect(url, additional_headers=headers, max_size=None) as ws:
+      await ws.send(meta)
+      n = 0
+      while time.monotonic() < deadline:
+        await ws.send(frames[n % len(frames)])
+        n += 1
+        if n % 50 == 0:
+          await asyncio.sleep(0)
+      with sent.get_lock():
+        sent.value += n
+
+  async def _main():
+    deadline = time.monotonic() + seconds
+    await asyncio.gather(*(_call(i, deadline) for i in range(calls)), return_exceptions=True)
+
+  asyncio.run(_main())
+
+
+# --- orchestration ---
+
+
+def _get_json(url: str) -> tuple[int, dict]:
+  try:
+    with urllib.request.urlopen(url, timeout=1) as r:
+      return r.status, json.loads(r.read() or b"{}")
+  except urllib.error.HTTPError as e:
+    return e.code, {}
+  except Exception:
+    return 0, {}
+
+
+def _wait_ready(port: int, sup_port: int, workers: int, timeout_s: float = 60.0) -> None:
+  deadline = time.monotonic() + timeout_s
+  while time.monotonic() < deadline:
+    if workers > 1:
+      status, body = _get_json(f"http://127.0.0.1:{sup_port}/health")
+      if status == 200 and body.get("ok"):
+        return
+    elif _get_json(f"http://127.0.0.1:{port}/api/health")[0] == 200:
+      return
+    time.sleep(0.25)
+  raise RuntimeError(f"gateway with {workers} worker(s) did not become ready")
+
+
+def _measure(workers: int, *, clients: int, calls: int, seconds: float, warmup_s: float, port: int, aoai_port: int) -> dict:
+  ctx = mp.get_context("spawn")
+  appended = ctx.Value("q", 0)
+  sent = ctx.Value("q", 0)
+  ready = ctx.Event()
+  aoai = ctx.Process(target=_fake_aoai_main, args=(aoai_port, appended, ready), daemon=True)
+  aoai.start()
+  ready.wait(10)
+
+  sup_port = port + 1
+  env = dict(
+    os.environ,
+    GATEWAY_WORKERS=str(workers),
+    GATEWAY_PORT=str(port),
+    GATEWAY_SUPERVISOR_PORT=str(sup_port),
+    FASTAPI_UDS=os.path.join(_SERVER_DIR, ".run", f"bench-{port}.sock"),
+    AZURE_OPENAI_ENDPOINT=f"http://127.0.0.1:{aoai_port}",
+    AZURE_OPENAI_DEPLOYMENT="bench",
+    AZURE_OPENAI_API_KEY="bench",
+    MEDIA_WS_ENABLE_AOAI="1",
+    AOAI_POOL_MIN_SIZE="0",
+    # Measure processing capacity, not the overload policy: never shed queued audio.
+    MEDIA_WS_AOAI_SEND_QUEUE_MAX_MS="600000",
+    MEDIA_WS_AOAI_SEND_QUEUE_MAX_ITEMS="100000",
+  )
+  gateway = subprocess.Popen(
+    [sys.executable, "app.py"], cwd=_SERVER_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+  )
+  try:
+    _wait_ready(port, sup_port, workers)
+    url = f"ws://127.0.0.1:{port}/ws/media"
+    procs = [
+      ctx.Process(target=_client_main, args=(url, calls, warmup_s + seconds, sent, i), daemon=True) for i in range(clients)
+    ]
+    for p in procs:
+      p.start()
+    time.sleep(warmup_s)
+    a0, t0 = appended.value, time.perf_counter()
+    time.sleep(seconds)
+    a1, t1 = appended.value, time.perf_counter()
+    for p in procs:
+      p.join(30)
+  finally:
+    gateway.terminate()
+    try:
+      gateway.wait(15)
+    except subprocess.TimeoutExpired:
+      gateway.kill()
+    aoai.terminate()
+    aoai.join(5)
+
+  # AOAI input is 24 kHz PCM16.
+  audio_s = (a1 - a0) / (24000 * 2)
+  return {
+    "workers": workers,
+    "calls": clients * calls,
+    "framesSent": sent.value,
+    "audioSecondsPerSecond": round(audio_s / (t1 - t0), 1),
+  }
+
+
+def run(*, workers: list[int], clients: int, calls: int, seconds: float, warmup_s: float, port: int, aoai_port: int) -> list[dict]:
+  rows = []
+  for n in workers:
+    rows.append(
+      _measure(n, clients=clients, calls=calls, seconds=seconds, warmup_s=warmup_s, port=port, aoai_port=aoai_port)
+    )
+  base = rows[0]["audioSecondsPerSecond"] or 1.0
+  for r in rows:
+    r["speedup"] = round(r["audioSecondsPerSecond"] / base, 2)
+  return rows
+
+
+def main() -> int:
+  ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+  ap.add_argument("--workers", default="1,2,4", help="Comma-separated worker counts.")
+  ap.add_argument("--clients", type=int, default=4, help="Load generator processes.")
+  ap.add_argument("--calls", type=int, default=8, help="Media WebSockets per client process.")
+  ap.add_argument("--seconds", type=float, default=10.0)
+  ap.add_argument("--warmup", type=float, default=3.0)
+  ap.add_argument("--port", type=int, default=18800)
+  ap.add_argument("--aoai-port", type=int, default=18810)
+  ap.add_argument("--json", help="Write results as JSON to this path.")
+  args = ap.parse_args()
+
+  workers = [int(x) for x in args.workers.split(",") if x.strip()]
+  rows = run(
+    workers=workers,
+    clients=args.clients,
+    calls=args.calls,
+    seconds=args.seconds,
+    warmup_s=args.warmup,
+    port=args.port,
+    aoai_port=args.aoai_port,
+  )
+  print(f"cpus={os.cpu_count()} calls={args.clients * args.calls} measured {args.seconds}s")
+  print(f"{'workers':>7} {'audio s/s':>10} {'speedup':>8}")
+  for r in rows:
+    print(f"{r['workers']:>7} {r['audioSecondsPerSecond']:>10.1f} {r['speedup']:>8.2f}")
+  if args.json:
+    with open(args.json, "w", encoding="utf-8") as f:
+      json.dump({"benchmark": "worker_scaling", "cpus": os.cpu_count(), "results": rows}, f, indent=2)
+  return 0
+
+
+if __name__ == "__main__":
+  raise SystemExit(main())
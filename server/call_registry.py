@@ -0,0 +1,159 @@
+from __future__ import annotations
+
+import time
+
+# Process-wide registry of live media sessions, keyed by callConnectionId.
+#
+# Each media WebSocket (scripts/acs_media_ws_server.handler) registers a `CallRecord`
+# while it runs. The record carries the call's identity and last-event times, which
+# the handler stamps in place (plain attribute writes on the hot path), plus two hooks
+# the handler provides:
+# - describe(): per-call counters and state read from the session on demand
+#   (bytes in/out, resamplers, inflight response, queue depths), so nothing is
+#   copied per frame
+# - control(action, data): runs a control action on the live session
+#
+# FastAPI (app.py) shares the process and event loop with the gateway, so /api/calls
+# and /api/callbacks use the same registry: callbacks are routed to the live session
+# by callConnectionId (`route()`); both are authenticated in app.py. Loop-side only (no locking). With GATEWAY_WORKERS > 1
+# a worker only sees the calls whose media WebSocket it accepted.
+
+ACTION_HANGUP = "hangup"  # close the media WebSocket (the session cleans up as on disconnect)
+ACTION_STOP_AUDIO = "stop_audio"  # barge-in: drop queued playout, StopAudio, cancel the response
+ACTIONS = (ACTION_HANGUP, ACTION_STOP_AUDIO)
+
+
+def _now_ms() -> int:
+  return int(time.time() * 1000)
+
+
+def _age_ms(ts: int, now: int) -> int | None:
+  return now - ts if ts else None
+
+
+class CallRecord:
+  """One live media session."""
+
+  __slots__ = (
+    "call_id",
+    "correlation_id",
+    "path",
+    "connected_ms",
+    "last_acs_in_ms",
+    "last_acs_out_ms",
+    "last_aoai_event_ms",
+    "last_aoai_event",
+    "last_callback_ms",
+    "last_callback",
+    "actions",
+    "describe",
+    "control",
+  )
+
+  def __init__(self, call_id: str, correlation_id: str | None, *, path: str | None = None, describe=None, control=None):
+    self.call_id = call_id
+    self.correlation_id = correlation_id
+    self.path = path
+    self.connected_ms = _now_ms()
+    self.last_acs_in_ms = 0
+    self.last_acs_out_ms = 0
+    self.last_aoai_event_ms = 0
+    self.last_aoai_event: str | None = None
+    self.last_callback_ms = 0
+    self.last_callback: str | None = None
+    # action -> times routed to this session
+    self.actions: dict[str, int] = {}
+    self.describe = describe
+    self.control = control
+
+  def snapshot(self, *, detail: bool = False) -> dict:
+    now = _now_ms()
+    out = {
+      "callConnectionId": self.call_id,
+      "correlationId": self.correlation_id,
+      "connectedMs": self.connected_ms,
+      "durationMs": now - self.connected_ms,
+      "lastEventAgeMs": {
+        "acsIn": _age_ms(self.last_acs_in_ms, now),
+        "acsOut": _age_ms(self.last_acs_out_ms, now),
+        "aoai": _age_ms(self.last_aoai_event_ms, now),
+        "callback": _age_ms(self.last_callback_ms, now),
+      },
+      "lastAoaiEvent": self.last_aoai_event,
+      "lastCallback": self.last_callback,
+      "actions": dict(self.actions),
+    }
+    if self.describe is not None:
+      try:
+        out.update(self.describe(detail))
+      except Exception as e:
+        out["describeError"] = repr(e)
+    if detail:
+      out["path"] = self.path
+    return out
+
+
+class CallRegistry:
+  __slots__ = ("_calls", "_seq", "registered", "routed", "unrouted")
+
+  def __init__(self):
+    self._calls: dict[str, CallRecord] = {}
+    self._seq = 0
+    self.registered = 0
+    # Control actions delivered to a live session / for calls not on this process.
+    self.routed = 0
+    self.unrouted = 0
+
+  def __len__(self) -> int:
+    return len(self._calls)
+
+  def register(self, call_id: str | None, correlation_id: str | None = None, **kw) -> CallRecord:
+    """Add a session. A session without an id gets a local one; a reconnect replaces the old record."""
+    if not call_id:
+      self._seq += 1
+      call_id = f"local-{self._seq}"
+    rec = CallRecord(call_id, correlation_id, **kw)
+    self._calls[call_id] = rec
+    self.registered += 1
+    return rec
+
+  def unregister(self, rec: CallRecord) -> None:
+    if self._calls.get(rec.call_id) is rec:
+      del self._calls[rec.call_id]
+
+  def get(self, call_id: str | None) -> CallRecord | None:
+    return self._calls.get(call_id) if call_id else None
+
+  def snapshot(self) -> list[dict]:
+    return [rec.snapshot() for rec in list(self._calls.values())]
+
+  def note_callback(self, call_id: str | None, event_type: str | None) -> CallRecord | None:
+    rec = self.get(call_id)
+    if rec is not None:
+      rec.last_callback_ms = _now_ms()
+      rec.last_callback = event_type
+    return rec
+
+  def route(self, call_id: str | None, action: str, data: dict | None = None) -> bool:
+    """Run `action` on the live session for `call_id`; False when it isn't on this process."""
+    if action not in ACTIONS:
+      raise ValueError(f"unknown call action: {action}")
+    rec = self.get(call_id)
+    if rec is None or rec.control is None:
+      self.unrouted += 1
+      return False
+    rec.control(action, data or {})
+    rec.actions[action] = rec.actions.get(action, 0) + 1
+    self.routed += 1
+    return True
+
+  def stats(self) -> dict:
+    return {
+      "activeCalls": len(self._calls),
+      "registeredTotal": self.registered,
+      "actionsRouted": self.routed,
+      "actionsUnrouted": self.unrouted,
+    }
+
+
+REGISTRY = CallRegistry()
@@ -0,0 +1,240 @@
+from __future__ import annotations
+
+import importlib
+import json
+import multiprocessing as mp
+import os
+import queue
+import signal
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from multiprocessing.connection import wait as mp_wait
+
+from structured_log import log
+
+# Multi-process gateway (GATEWAY_WORKERS > 1).
+#
+# The supervisor starts N gateway workers. Each worker is a full `unified_gateway.main()`
+# (own event loop, own FastAPI instance on its own UDS, own AOAI session pool) and binds
+# the public port with SO_REUSEPORT, so the kernel spreads new connections across
+# workers. A call's media WebSocket stays on the worker that accepted it.
+#
+# Workers are started with the "spawn" method (no inherited event loop / threads) and
+# push a status snapshot every STATUS_INTERVAL_S. Crashed workers are restarted with
+# exponential backoff. Aggregated health is served as JSON on
+# GATEWAY_SUPERVISOR_HOST:GATEWAY_SUPERVISOR_PORT/health (0 disables it).
+
+SUPERVISOR_HOST = os.getenv("GATEWAY_SUPERVISOR_HOST", "127.0.0.1")
+SUPERVISOR_PORT = int(os.getenv("GATEWAY_SUPERVISOR_PORT", "8001"))
+STATUS_INTERVAL_S = float(os.getenv("GATEWAY_WORKER_STATUS_INTERVAL_S", "2"))
+RESTART_BACKOFF_MAX_S = float(os.getenv("GATEWAY_WORKER_RESTART_BACKOFF_MAX_S", "30"))
+# A worker that stayed up this long is considered healthy again (backoff resets).
+_STABLE_S = 60.0
+
+
+def _load_app(app_ref: str):
+  module, _, attr = app_ref.partition(":")
+  return getattr(importlib.import_module(module), attr or "app")
+
+
+def _worker_main(worker_id: int, app_ref: str, status_queue) -> None:
+  """Entry point of a worker process."""
+  import loop_backend
+  import unified_gateway
+
+  def _terminate(*_):
+    # Unwind through the asyncio runner so the worker cleans up its UDS / sessions.
+    raise KeyboardInterrupt
+
+  signal.signal(signal.SIGTERM, _terminate)
+  try:
+    loop_backend.run(
+      unified_gateway.main(fastapi_app=_load_app(app_ref), worker_id=worker_id, status_queue=status_queue)
+    )
+  except KeyboardInterrupt:
+    return
+
+
+class _Worker:
+  __slots__ = ("worker_id", "process", "started_at", "restarts", "backoff_s", "restart_at", "status")
+
+  def __init__(self, worker_id: int):
+    self.worker_id = worker_id
+    self.process = None
+    self.started_at = 0.0
+    self.restarts = 0
+    self.backoff_s = 1.0
+    self.restart_at = 0.0
+    self.status: dict = {}
+
+
+class Supervisor:
+  def __init__(self, workers: int, *, app_ref: str = "app:app", health_host: str = SUPERVISOR_HOST, health_port: int = SUPERVISOR_PORT):
+    self.app_ref = app_ref
+    self.health_host = health_host
+    self.health_port = int(health_port)
+    self._ctx = mp.get_context("spawn")
+    self._status_queue = self._ctx.Queue()
+    self._workers = [_Worker(i) for i in range(max(1, int(workers)))]
+    self._lock = threading.Lock()
+    self._stopping = threading.Event()
+    self._http: ThreadingHTTPServer | None = None
+
+  # --- worker lifecycle ---
+
+  def _start(self, w: _Worker) -> None:
+    p = self._ctx.Process(
+      target=_worker_main,
+      args=(w.worker_id, self.app_ref, self._status_queue),
+      name=f"gateway-worker-{w.worker_id}",
+      daemon=False,
+    )
+    p.start()
+    w.process = p
+    w.started_at = time.monotonic()
+    w.status = {}
+    log("Gateway worker started", {"worker": w.worker_id, "pid": p.pid, "restarts": w.restarts})
+
+  def _reap(self, w: _Worker) -> None:
+    p = w.process
+    uptime = time.monotonic() - w.started_at
+    log(
+      "Gateway worker exited",
+      {"worker": w.worker_id, "pid": p.pid, "exitCode": p.exitcode, "uptimeS": round(uptime, 1)},
+      level="error",
+    )
+    w.process = None
+    if uptime >= _STABLE_S:
+      w.backoff_s = 1.0
+    w.restart_at = time.monotonic() + w.backoff_s
+    w.backoff_s = min(RESTART_BACKOFF_MAX_S, w.backoff_s * 2)
+
+  def _read_status(self) -> None:
+    while not self._stopping.is_set():
+      try:
+        st = self._status_queue.get(timeout=0.5)
+      except queue.Empty:
+        continue
+      except (EOFError, OSError):
+        return
+      wid = st.get("worker")
+      if isinstance(wid, int) and 0 <= wid < len(self._workers):
+        with self._lock:
+          self._workers[wid].status = st
+
+  # --- health ---
+
+  def health(self) -> dict:
+    now = time.monotonic()
+    with self._lock:
+      workers = []
+      for w in self._workers:
+        alive = w.process is not None and w.process.is_alive()
+        st = w.status
+        fresh = bool(st) and time.time() - st.get("ts", 0) <= STATUS_INTERVAL_S * 3
+        workers.append(
+          {
+            "worker": w.worker_id,
+            "pid": w.process.pid if w.process is not None else None,
+            "alive": alive,
+            "reporting": fresh,
+            "restarts": w.restarts,
+            "uptimeS": round(now - w.started_at, 1) if alive else None,
+            "activeCalls": st.get("activeCalls") if fresh else None,
+            "callsTotal": st.get("callsTotal") if fresh else None,
+            "accepting": st.get("accepting") if fresh else None,
+          }
+        )
+    healthy = sum(1 for w in workers if w["alive"] and w["reporting"])
+    return {
+      "ok": healthy == len(workers),
+      "workers": len(workers),
+      "healthy": healthy,
+      "restarts": sum(w["restarts"] for w in workers),
+      "activeCalls": sum(w["activeCalls"] or 0 for w in workers),
+      "acceptingWorkers": sum(1 for w in workers if w["accepting"]),
+      "detail": workers,
+    }
+
+  def _serve_health(self) -> None:
+    sup = self
+
+    class _Handler(BaseHTTPRequestHandler):
+      def do_GET(self):
+        if self.path.split("?", 1)[0] not in ("/health", "/"):
+          self.send_error(404)
+          return
+        h = sup.health()
+        body = json.dumps(h).encode("utf-8")
+        self.send_response(200 if h["ok"] else 503)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+      def log_message(self, *args):
+        return
+
+    self._http = ThreadingHTTPServer((self.health_host, self.health_port), _Handler)
+    self._http.daemon_threads = True
+    threading.Thread(target=self._http.serve_forever, name="supervisor-health", daemon=True).start()
+
+  # --- main loop ---
+
+  def stop(self, *_) -> None:
+    self._stopping.set()
+
+  def run(self) -> None:
+    signal.signal(signal.SIGTERM, self.stop)
+    signal.signal(signal.SIGINT, self.stop)
+    log(
+      "Gateway supervisor starting",
+      {"workers": len(self._workers), "health": f"http://{self.health_host}:{self.health_port}/health" if self.health_port else None},
+    )
+    if self.health_port:
+      self._serve_health()
+    threading.Thread(target=self._read_status, name="supervisor-status", daemon=True).start()
+    for w in self._workers:
+      self._start(w)
+
+    try:
+      while not self._stopping.is_set():
+        with self._lock:
+          running = [w for w in self._workers if w.process is not None]
+        ready = mp_wait([w.process.sentinel for w in running], timeout=0.5) if running else []
+        if not running:
+          time.sleep(0.5)
+        with self._lock:
+          for w in running:
+            if w.process is not None and w.process.sentinel in ready:
+              w.process.join(1)
+              self._reap(w)
+          if self._stopping.is_set():
+            break
+          now = time.monotonic()
+          for w in self._workers:
+            if w.process is None and now >= w.restart_at:
+              w.restarts += 1
+              self._start(w)
+    finally:
+      self._shutdown()
+
+  def _shutdown(self) -> None:
+    log("Gateway supervisor stopping", {"workers": len(self._workers)})
+    if self._http is not None:
+      self._http.shutdown()
+    procs = [w.process for w in self._workers if w.process is not None]
+    for p in procs:
+      if p.is_alive():
+        p.terminate()
+    deadline = time.monotonic() + 10
+    for p in procs:
+      p.join(max(0.1, deadline - time.monotonic()))
+      if p.is_alive():
+        p.kill()
+        p.join(1)
+
+
+def run(workers: int, *, app_ref: str = "app:app") -> None:
+  Supervisor(workers, app_ref=app_ref).run()
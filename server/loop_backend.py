@@ -0,0 +1,53 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import sys
+
+try:
+  import uvloop  # type: ignore
+except Exception:  # pragma: no cover
+  uvloop = None  # type: ignore
+
+# Event-loop implementation for the gateway process(es) (GATEWAY_LOOP).
+#
+# - asyncio: the standard library loop
+# - uvloop:  libuv-based loop (faster socket I/O and callbacks); falls back to asyncio
+#            with a warning when uvloop is not installed (e.g. on Windows)
+# - auto:    uvloop when available, otherwise asyncio (default)
+#
+# The loop is created through `asyncio.Runner(loop_factory=...)` instead of a global
+# event-loop policy, so nothing else in the process (tests, benchmarks, threads running
+# their own loops) is affected. FastAPI's uvicorn server runs on this same loop.
+
+BACKENDS = ("asyncio", "uvloop", "auto")
+LOOP_BACKEND = (os.getenv("GATEWAY_LOOP", "auto").strip().lower() or "auto")
+if LOOP_BACKEND not in BACKENDS:
+  LOOP_BACKEND = "auto"
+
+
+def resolve(backend: str | None = None) -> str:
+  """Concrete backend ("asyncio" or "uvloop") for a GATEWAY_LOOP value."""
+  b = (backend or LOOP_BACKEND).strip().lower()
+  if b in ("uvloop", "auto") and uvloop is not None and sys.platform != "win32":
+    return "uvloop"
+  return "asyncio"
+
+
+def loop_factory(backend: str | None = None):
+  return uvloop.new_event_loop if resolve(backend) == "uvloop" else asyncio.new_event_loop
+
+
+def run(coro, *, backend: str | None = None):
+  """`asyncio.run(coro)` on the selected loop implementation."""
+  with asyncio.Runner(loop_factory=loop_factory(backend)) as runner:
+    return runner.run(coro)
+
+
+def describe(loop: asyncio.AbstractEventLoop | None = None) -> dict:
+  loop = loop or asyncio.get_running_loop()
+  return {
+    "requested": LOOP_BACKEND,
+    "backend": "uvloop" if uvloop is not None and isinstance(loop, uvloop.Loop) else "asyncio",
+    "uvloopVersion": getattr(uvloop, "__version__", None),
+  }
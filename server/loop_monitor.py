@@ -0,0 +1,191 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import sys
+import threading
+import time
+import traceback
+
+import metrics
+from structured_log import log
+
+# Event-loop lag and process resource usage, exported on /metrics.
+#
+# A probe task sleeps GATEWAY_LOOP_MONITOR_INTERVAL_MS in a loop; how much later than
+# requested it wakes up is the time every other callback (WebSocket reads/writes of
+# every call) waited behind whatever was running. Recorded in
+# `event_loop_lag_seconds` (histogram). CPU time and RSS are sampled on each scrape.
+# `lag_avg_ms` smooths the samples over about a second, for decisions that should not
+# flap on a single slow callback (admission.py).
+#
+# Stall watchdog (GATEWAY_LOOP_STALL_MS): a probe that is late by more than that means a
+# callback held the loop. The probe can only notice after the fact, so a watchdog thread
+# watches the probe's heartbeat and, while the loop is still blocked, logs the Python
+# stack of the loop thread (`sys._current_frames()`: the coroutine / function that is
+# running) and the current task ("Event loop stall"). When the loop is back, the probe
+# logs the total blocking time ("Event loop stall ended") and counts it on /metrics.
+
+LOOP_MONITOR_INTERVAL_MS = int(os.getenv("GATEWAY_LOOP_MONITOR_INTERVAL_MS", "100"))
+LOOP_STALL_MS = int(os.getenv("GATEWAY_LOOP_STALL_MS", "250"))
+LOOP_STALL_STACK_DEPTH = int(os.getenv("GATEWAY_LOOP_STALL_STACK_DEPTH", "30"))
+
+try:
+  _PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+except (AttributeError, ValueError, OSError):  # pragma: no cover
+  _PAGE_SIZE = 4096
+
+
+def _rss_bytes() -> int:
+  try:
+    with open("/proc/self/statm", "rb") as f:
+      return int(f.read().split()[1]) * _PAGE_SIZE
+  except (OSError, ValueError, IndexError):
+    pass
+  try:
+    import resource
+
+    # Peak, not current, but the best available without /proc (KiB on Linux, bytes on macOS).
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if os.uname().sysname == "Darwin" else peak * 1024
+  except Exception:
+    return 0
+
+
+def _collect_process() -> None:
+  metrics.PROCESS_CPU_SECONDS.value = round(time.process_time(), 3)
+  metrics.PROCESS_RSS_BYTES.set(_rss_bytes())
+
+
+metrics.REGISTRY.collector(_collect_process)
+
+
+class LoopMonitor:
+  """Periodic oversleep probe on the running event loop, plus an optional stall watchdog."""
+
+  __slots__ = (
+    "interval_s",
+    "stall_s",
+    "lag_ms",
+    "lag_avg_ms",
+    "stalls",
+    "_task",
+    "_loop",
+    "_loop_thread",
+    "_beat",
+    "_stall_reported",
+    "_watchdog",
+    "_stop",
+  )
+
+  def __init__(self, interval_ms: int = LOOP_MONITOR_INTERVAL_MS, stall_ms: int = LOOP_STALL_MS):
+    self.interval_s = max(1, int(interval_ms)) / 1000.0
+    # 0 disables the watchdog.
+    self.stall_s = max(0, int(stall_ms)) / 1000.0
+    # Most recent measurement.
+    self.lag_ms = 0.0
+    # Exponentially weighted average, ~1 s time constant.
+    self.lag_avg_ms = 0.0
+    self.stalls = 0
+    self._task: asyncio.Task | None = None
+    self._loop: asyncio.AbstractEventLoop | None = None
+    self._loop_thread: int | None = None
+    # perf_counter() when the probe last ran (written on the loop, read by the watchdog).
+    self._beat = 0.0
+    self._stall_reported = False
+    self._watchdog: threading.Thread | None = None
+    self._stop = threading.Event()
+
+  @property
+  def running(self) -> bool:
+    return self._task is not None
+
+  def start(self) -> None:
+    if self._task is None:
+      self._loop = asyncio.get_running_loop()
+      self._loop_thread = threading.get_ident()
+      self._beat = time.perf_counter()
+      self._task = self._loop.create_task(self._run())
+      if self.stall_s > 0 and self._watchdog is None:
+        self._stop.clear()
+        self._watchdog = threading.Thread(target=self._watch, name="loop-stall-watchdog", daemon=True)
+        self._watchdog.start()
+
+  def stop(self) -> None:
+    if self._task is not None:
+      self._task.cancel()
+      self._task = None
+    if self._watchdog is not None:
+      self._stop.set()
+      self._watchdog = None
+
+  async def _run(self) -> None:
+    interval = self.interval_s
+    hist = metrics.LOOP_LAG_SECONDS
+    while True:
+      t0 = time.perf_counter()
+      await asyncio.sleep(interval)
+      now = time.perf_counter()
+      self._beat = now
+      elapsed = now - t0
+      lag = max(0.0, elapsed - interval)
+      self.lag_ms = lag * 1000.0
+      # Weight by the time the sample covers, so one long stall counts for its length.
+      alpha = min(1.0, elapsed)
+      self.lag_avg_ms += alpha * (self.lag_ms - self.lag_avg_ms)
+      hist.observe(lag)
+      if self.stall_s > 0 and lag >= self.stall_s:
+        self.stalls += 1
+        metrics.LOOP_STALLS.inc()
+        metrics.LOOP_STALL_SECONDS.inc(int(lag * 1e9))
+        log(
+          "Event loop stall ended",
+          {"blockedMs": round(self.lag_ms, 1), "stackLogged": self._stall_reported},
+          level="warning",
+        )
+        self._stall_reported = False
+
+  # --- watchdog thread ---
+
+  def _watch(self) -> None:
+    period = max(0.01, self.stall_s / 4)
+    while not self._stop.wait(period):
+      beat = self._beat
+      blocked = time.perf_counter() - beat - self.interval_s
+      if blocked < self.stall_s or self._stall_reported:
+        continue
+      fields = {"blockedMs": round(blocked * 1000.0, 1), **self._snapshot()}
+      # Report once per stall, and only if the loop did not resume meanwhile.
+      if self._beat == beat:
+        self._stall_reported = True
+        log("Event loop stall", fields, level="warning")
+
+  def _snapshot(self) -> dict:
+    """Loop thread's current stack and task, read from another thread (best effort)."""
+    out: dict = {"task": None, "coro": None, "stack": []}
+    try:
+      task = asyncio.current_task(self._loop)
+      if task is not None:
+        out["task"] = task.get_name()
+        out["coro"] = getattr(task.get_coro(), "__qualname__", None)
+    except Exception:
+      pass
+    frame = sys._current_frames().get(self._loop_thread)
+    if frame is not None:
+      out["stack"] = [
+        f"{fs.filename}:{fs.lineno} {fs.name}" for fs in traceback.extract_stack(frame, limit=LOOP_STALL_STACK_DEPTH)
+      ]
+    return out
+
+
+MONITOR = LoopMonitor()
+
+
+def start() -> None:
+  """Start the process-wide monitor on the running loop (no-op when disabled)."""
+  if LOOP_MONITOR_INTERVAL_MS > 0:
+    MONITOR.start()
+
+
+def stop() -> None:
+  MONITOR.stop()
@@ -0,0 +1 @@
+"""Per-call media-path building blocks (resampling, framing, codecs) for the ACS <-> AOAI bridge."""
@@ -0,0 +1,369 @@
+from __future__ import annotations
+
+import array
+import os
+import re
+import struct
+import threading
+import time
+
+# Per-call WAV archive of the caller and assistant tracks (MEDIA_WS_ARCHIVE_DIR).
+#
+# The media handler tees PCM it already has in hand (inbound after base64 decode,
+# outbound after resampling to the ACS rate) into per-call buffers; it never touches
+# the disk. One process-wide writer thread wakes every `flush_ms`, takes what each
+# call has buffered and appends it to the call's file(s) in one large write per file.
+# The 44-byte WAV header is written with zero sizes and fixed up when the call ends.
+#
+# Time alignment: the caller track is the call's clock (ACS streams it continuously in
+# real time). Assistant audio is placed where it will be played: at the current caller
+# position, or right after the previous assistant audio while that is still playing.
+# Gaps are written as silence; audio still queued for playout when the caller barges
+# in (`interrupt()`) or the call ends is discarded, as it was never heard.
+#
+# Formats:
+# - wav:    <call>-caller.wav and <call>-assistant.wav, mono, same length
+# - stereo: <call>.wav, left = caller, right = assistant
+#
+# Backlog limits: audio waiting for the writer is bounded per call and for the whole
+# process. Past either bound new audio is dropped (and counted) rather than blocking
+# the call or growing memory; the archived timeline then skips the dropped audio.
+# Throughput / backlog / drop totals are attributes of `WavArchiver` (see stats()).
+FORMAT_WAV = "wav"
+FORMAT_STEREO = "stereo"
+FORMATS = (FORMAT_WAV, FORMAT_STEREO)
+
+_SAFE_NAME = re.compile(r"[^A-Za-z0-9_.-]+")
+_WRITE_BUFFER = 1 << 20
+
+
+def normalize_format(value: str | None, default: str = FORMAT_WAV) -> str:
+  v = (value or "").strip().lower()
+  return v if v in FORMATS else default
+
+
+def wav_header(sample_rate: int, channels: int, data_bytes: int) -> bytes:
+  block = channels * 2
+  return struct.pack(
+    "<4sI4s4sIHHIIHH4sI",
+    b"RIFF",
+    36 + data_bytes,
+    b"WAVE",
+    b"fmt ",
+    16,
+    1,
+    channels,
+    sample_rate,
+    sample_rate * block,
+    block,
+    16,
+    b"data",
+    data_bytes,
+  )
+
+
+class CallArchive:
+  """Loop-side tee for one call. All buffers are guarded by the archiver's lock."""
+
+  __slots__ = (
+    "archiver",
+    "call_id",
+    "base_path",
+    "sample_rate",
+    "fmt",
+    "max_pending",
+    "paths",
+    "caller_bytes",
+    "assistant_bytes",
+    "dropped_bytes",
+    "written_bytes",
+    "write_ns",
+    "_caller",
+    "_caller_end",
+    "_segments",
+    "_assistant_end",
+    "_pending",
+    "_closed",
+    "_files",
+    "_data_bytes",
+    "_assistant_written",
+    "_error",
+  )
+
+  def __init__(self, archiver: "WavArchiver", call_id: str | None, base_path: str, sample_rate: int, fmt: str, max_pending: int):
+    self.archiver = archiver
+    self.call_id = call_id
+    self.base_path = base_path
+    self.sample_rate = int(sample_rate)
+    self.fmt = fmt
+    self.max_pending = max_pending
+    if fmt == FORMAT_STEREO:
+      self.paths = [base_path + ".wav"]
+    else:
+      self.paths = [base_path + "-caller.wav", base_path + "-assistant.wav"]
+    self.caller_bytes = 0
+    self.assistant_bytes = 0
+    self.dropped_bytes = 0
+    self.written_bytes = 0
+    self.write_ns = 0
+    # Caller chunks not yet written; byte position (mono) of the end of the caller track.
+    self._caller: list[bytes] = []
+    self._caller_end = 0
+    # Assistant audio not yet written: [(start position, pcm)], ordered, non-overlapping.
+    self._segments: list[tuple[int, bytes]] = []
+    self._assistant_end = 0
+    self._pending = 0
+    self._closed = False
+    # Writer-thread state.
+    self._files: list = []
+    self._data_bytes = 0
+    self._assistant_written = 0
+    self._error: str | None = None
+
+  def _admit(self, n: int) -> bool:
+    a = self.archiver
+    if self._closed:
+      return False
+    if self._pending + n > self.max_pending:
+      a.dropped_call_backlog_bytes += n
+    elif a.backlog_bytes + n > a.max_backlog_bytes:
+      a.dropped_backlog_bytes += n
+    else:
+      self._pending += n
+      a.backlog_bytes += n
+      return True
+    self.dropped_bytes += n
+    return False
+
+  def caller(self, pcm) -> None:
+    """Inbound PCM16 mono at `sample_rate` (copied)."""
+    data = bytes(pcm)
+    with self.archiver.lock:
+      if self._admit(len(data)):
+        self._caller.append(data)
+        self._caller_end += len(data)
+        self.caller_bytes += len(data)
+
+  def assistant(self, pcm) -> None:
+    """Outbound PCM16 mono at `sample_rate` (copied), in the order it is queued for playout."""
+    data = bytes(pcm)
+    if not data:
+      return
+    with self.archiver.lock:
+      if self._admit(len(data)):
+        start = max(self._caller_end, self._assistant_end)
+        self._segments.append((start, data))
+        self._assistant_end = start + len(data)
+        self.assistant_bytes += len(data)
+
+  def interrupt(self) -> None:
+    """Barge-in: assistant audio not yet played (ahead of the caller track) is dropped."""
+    with self.archiver.lock:
+      self._trim_segments(self._caller_end)
+
+  def close(self) -> None:
+    """Call ended: the writer thread writes what is buffered and finalizes the file(s)."""
+    with self.archiver.lock:
+      self._trim_segments(self._caller_end)
+      self._closed = True
+    self.archiver.wake()
+
+  def _trim_segments(self, pos: int) -> None:
+    # Lock held.
+    keep = []
+    freed = 0
+    for start, data in self._segments:
+      if start + len(data) <= pos:
+        keep.append((start, data))
+      elif start < pos:
+        keep.append((start, data[: pos - start]))
+        freed += start + len(data) - pos
+      else:
+        freed += len(data)
+    self._segments = keep
+    self._assistant_end = min(self._assistant_end, pos)
+    self._release(freed)
+
+  def _release(self, n: int) -> None:
+    # Lock held.
+    if n:
+      self._pending -= n
+      self.archiver.backlog_bytes -= n
+
+  def _take(self) -> tuple[list[bytes], list[tuple[int, bytes]], int, bool]:
+    """Writer thread, lock held: everything up to the caller position."""
+    caller = self._caller
+    self._caller = []
+    end = self._caller_end
+    ready = []
+    keep = []
+    for start, data in self._segments:
+      if start + len(data) <= end:
+        ready.append((start, data))
+      elif start < end:
+        ready.append((start, data[: end - start]))
+        keep.append((end, data[end - start :]))
+      else:
+        keep.append((start, data))
+    self._segments = keep
+    self._release(sum(len(c) for c in caller) + sum(len(d) for _, d in ready))
+    return caller, ready, end, self._closed
+
+  # --- writer thread ---
+
+  def _open(self) -> None:
+    os.makedirs(os.path.dirname(self.base_path) or ".", exist_ok=True)
+    channels = 2 if self.fmt == FORMAT_STEREO else 1
+    for path in self.paths:
+      f = open(path, "wb", buffering=_WRITE_BUFFER)
+      f.write(wav_header(self.sample_rate, channels, 0))
+      self._files.append(f)
+
+  def _write(self, caller: list[bytes], ready: list[tuple[int, bytes]], end: int) -> None:
+    caller_pcm = b"".join(caller)
+    if not caller_pcm:
+      return
+    # Assistant track for [written, end): silence where nothing was playing.
+    parts = []
+    pos = self._assistant_written
+    for start, data in ready:
+      if start > pos:
+        parts.append(bytes(start - pos))
+      parts.append(data)
+      pos = start + len(data)
+    if end > pos:
+      parts.append(bytes(end - pos))
+    assistant_pcm = b"".join(parts)
+    self._assistant_written = end
+
+    t0 = time.perf_counter_ns()
+    if not self._files:
+      self._open()
+    if self.fmt == FORMAT_STEREO:
+      left = array.array("h", caller_pcm)
+      frames = array.array("h", bytes(2 * len(caller_pcm)))
+      frames[0::2] = left
+      frames[1::2] = array.array("h", assistant_pcm[: len(caller_pcm)])
+      out = frames.tobytes()
+      self._files[0].write(out)
+      n = len(out)
+      self._data_bytes += n
+    else:
+      self._files[0].write(caller_pcm)
+      self._files[1].write(assistant_pcm)
+      n = len(caller_pcm) + len(assistant_pcm)
+      self._data_bytes += len(caller_pcm)
+    dt = time.perf_counter_ns() - t0
+    self.written_bytes += n
+    self.write_ns += dt
+    self.archiver.written_bytes += n
+    self.archiver.write_ns += dt
+
+  def _finalize(self) -> None:
+    channels = 2 if self.fmt == FORMAT_STEREO else 1
+    for f in self._files:
+      try:
+        f.flush()
+        f.seek(0)
+        f.write(wav_header(self.sample_rate, channels, self._data_bytes))
+        f.close()
+      except Exception as e:
+        self._error = repr(e)
+    self._files = []
+
+  def stats(self) -> dict:
+    rate = self.sample_rate * 2
+    return {
+      "format": self.fmt,
+      "paths": self.paths if self.written_bytes else [],
+      "callerMs": self.caller_bytes * 1000 // rate,
+      "assistantMs": self.assistant_bytes * 1000 // rate,
+      "droppedMs": self.dropped_bytes * 1000 // rate,
+      "writtenBytes": self.written_bytes,
+      "writeMs": round(self.write_ns / 1e6, 1),
+      "error": self._error,
+    }
+
+
+class WavArchiver:
+  """Process-wide writer thread for all call archives.
+
+  `on_closed(archive)` is called on the writer thread once a call's files are final.
+  """
+
+  def __init__(
+    self,
+    directory: str,
+    *,
+    fmt: str = FORMAT_WAV,
+    flush_ms: int = 1000,
+    call_backlog_ms: int = 30000,
+    max_backlog_bytes: int = 64 << 20,
+    on_closed=None,
+  ):
+    self.directory = directory
+    self.fmt = normalize_format(fmt)
+    self.flush_s = max(50, int(flush_ms)) / 1000.0
+    self.call_backlog_ms = max(1000, int(call_backlog_ms))
+    self.max_backlog_bytes = max(1 << 20, int(max_backlog_bytes))
+    self.on_closed = on_closed
+    self.lock = threading.Lock()
+    # Totals (all calls).
+    self.backlog_bytes = 0
+    self.written_bytes = 0
+    self.write_ns = 0
+    self.dropped_call_backlog_bytes = 0
+    self.dropped_backlog_bytes = 0
+    self._calls: list[CallArchive] = []
+    self._wakeup = threading.Event()
+    self._thread: threading.Thread | None = None
+
+  def open_call(self, call_id: str | None, sample_rate: int) -> CallArchive:
+    name = _SAFE_NAME.sub("_", call_id or "call")[:80] or "call"
+    base = os.path.join(self.directory, f"{name}-{int(time.time() * 1000)}")
+    # Both tracks can be pending: caller (real time) + assistant (ahead of real time).
+    max_pending = 2 * int(sample_rate) * 2 * self.call_backlog_ms // 1000
+    arc = CallArchive(self, call_id, base, sample_rate, self.fmt, max_pending)
+    with self.lock:
+      self._calls.append(arc)
+    if self._thread is None:
+      self._thread = threading.Thread(target=self._run, name="wav-archiver", daemon=True)
+      self._thread.start()
+    return arc
+
+  def wake(self) -> None:
+    self._wakeup.set()
+
+  def _run(self) -> None:
+    while True:
+      self._wakeup.wait(self.flush_s)
+      self._wakeup.clear()
+      with self.lock:
+        calls = list(self._calls)
+      for arc in calls:
+        with self.lock:
+          caller, ready, end, closed = arc._take()
+        try:
+          if arc._error is None:
+            arc._write(caller, ready, end)
+        except Exception as e:
+          # Disk full / permissions: stop archiving this call, keep the call running.
+          arc._error = repr(e)
+        if closed:
+          arc._finalize()
+          with self.lock:
+            self._calls.remove(arc)
+          if self.on_closed is not None:
+            try:
+              self.on_closed(arc)
+            except Exception:
+              pass
+
+  def stats(self) -> dict:
+    return {
+      "calls": len(self._calls),
+      "backlogBytes": self.backlog_bytes,
+      "writtenBytes": self.written_bytes,
+      "writeSeconds": round(self.write_ns / 1e9, 3),
+      "droppedBytes": {"callBacklog": self.dropped_call_backlog_bytes, "backlog": self.dropped_backlog_bytes},
+    }
@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+from .vad import pcm16_level
+
+# Local barge-in detection on the caller's inbound audio.
+#
+# Waiting for AOAI's `input_audio_buffer.speech_started` costs a network round
+# trip plus the server VAD's own decision time. This detector sees the same audio
+# first and fires when the caller has been speaking continuously for
+# `min_speech_ms` while the assistant is talking.
+#
+# Echo robustness: residual echo of our own playout comes back on the inbound
+# leg. `EchoReference` tracks the level of frames recently handed to ACS; for
+# `tail_ms` after each one the detector requires the caller to be no more than
+# `echo_margin_db` below that level (echo is attenuated by far more than that).
+# Triggers are also spaced by `cooldown_ms`.
+#
+# The two halves live on different threads when DSP is offloaded: playout is noted
+# on the event loop, detection may run on a DSP pool thread. The loop reads
+# `EchoReference.level(now)` and passes the value to `process()`, so neither side
+# touches the other's state.
+
+
+class EchoReference:
+  """Level of recent playout toward ACS (the sending side, i.e. the event loop)."""
+
+  __slots__ = ("tail_ms", "db", "until_ms")
+
+  def __init__(self, *, tail_ms: int = 250):
+    self.tail_ms = int(tail_ms)
+    self.db = -120.0
+    self.until_ms = 0
+
+  def note_playout(self, pcm, now_ms: int) -> None:
+    """Record the level of a frame just sent to ACS."""
+    db, _ = pcm16_level(pcm)
+    if db >= self.db or now_ms > self.until_ms:
+      self.db = db
+    self.until_ms = now_ms + self.tail_ms
+
+  def level(self, now_ms: int) -> float | None:
+    """Echo reference level for inbound audio arriving at `now_ms` (None = no recent playout)."""
+    return self.db if now_ms <= self.until_ms else None
+
+
+class BargeInDetector:
+  """Debounced speech-onset detector over PCM16 mono; timestamps are caller-supplied ms."""
+
+  __slots__ = (
+    "bytes_per_ms",
+    "threshold_db",
+    "zcr_max",
+    "min_speech_bytes",
+    "echo_margin_db",
+    "cooldown_ms",
+    "onset_ms",
+    "last_onset_ms",
+    "_voiced",
+    "_last_trigger_ms",
+    "triggers",
+    "echo_rejects",
+  )
+
+  def __init__(
+    self,
+    sample_rate: int,
+    *,
+    threshold_db: float = -35.0,
+    zcr_max: float = 0.35,
+    min_speech_ms: int = 150,
+    echo_margin_db: float = 12.0,
+    cooldown_ms: int = 1000,
+  ):
+    self.bytes_per_ms = int(sample_rate) * 2 / 1000.0
+    self.threshold_db = float(threshold_db)
+    self.zcr_max = float(zcr_max)
+    self.min_speech_bytes = int(max(0, min_speech_ms) * self.bytes_per_ms)
+    self.echo_margin_db = float(echo_margin_db)
+    self.cooldown_ms = int(cooldown_ms)
+    # Arrival time of the first voiced chunk of the current run (None when not voiced).
+    self.onset_ms: int | None = None
+    self.last_onset_ms: int | None = None
+    self._voiced = 0
+    self._last_trigger_ms = 0
+    # Counters
+    self.triggers = 0
+    self.echo_rejects = 0
+
+  def process(self, pcm, now_ms: int, *, armed: bool, echo_db: float | None = None) -> bool:
+    """Feed one inbound chunk; True when a barge-in should fire now.
+
+    `echo_db` is `EchoReference.level(now_ms)`, read by the caller on the sending side.
+    """
+    if not pcm:
+      return False
+    db, zcr = pcm16_level(pcm)
+    voiced = db >= self.threshold_db and zcr <= self.zcr_max
+    if voiced and echo_db is not None and db < echo_db - self.echo_margin_db:
+      # Quiet enough relative to our own playout to be residual echo.
+      voiced = False
+      self.echo_rejects += 1
+    if not voiced:
+      self._voiced = 0
+      self.onset_ms = None
+      return False
+
+    if self.onset_ms is None:
+      self.onset_ms = self.last_onset_ms = now_ms
+    self._voiced += len(pcm)
+    if not armed or self._voiced < self.min_speech_bytes:
+      return False
+    if self._last_trigger_ms and now_ms - self._last_trigger_ms < self.cooldown_ms:
+      return False
+    self._last_trigger_ms = now_ms
+    self.triggers += 1
+    return True
@@ -0,0 +1,190 @@
+from __future__ import annotations
+
+try:
+  import numpy as np  # type: ignore
+except Exception:  # pragma: no cover
+  np = None  # type: ignore
+
+# Inbound channel handling (replaces audioop.tomono, which is gone in Python 3.13).
+#
+# ACS delivers either
+# - interleaved PCM16 with `channels` > 1 in AudioMetadata, or
+# - mono frames tagged with `audioData.participantRawID` (unmixed audio channel type),
+#   one AudioData message per participant.
+#
+# Modes:
+# - mix:             interleaved channels are averaged before resampling; participant
+#                    streams are resampled separately and summed.
+# - pick:            forward a single channel (MEDIA_WS_PICK_CHANNEL) or a single
+#                    participant (MEDIA_WS_PICK_PARTICIPANT, else the first one heard).
+# - per_participant: every channel/participant is its own stream (own resampler, own
+#                    gate) and streams are summed after per-stream processing.
+MODE_MIX = "mix"
+MODE_PICK = "pick"
+MODE_PER_PARTICIPANT = "per_participant"
+MODES = (MODE_MIX, MODE_PICK, MODE_PER_PARTICIPANT)
+
+MAIN_STREAM = "main"
+
+
+def _frames(pcm, channels: int):
+  n = len(pcm) // (2 * channels)
+  return np.frombuffer(pcm, dtype=np.int16, count=n * channels).reshape(n, channels)
+
+
+def downmix_pcm16(pcm, channels: int) -> bytes:
+  """Average N interleaved PCM16 channels into mono."""
+  if channels <= 1:
+    return bytes(pcm)
+  if np is None:
+    return b""
+  x = _frames(pcm, channels)
+  # int32 accumulation cannot overflow for any realistic channel count.
+  return (x.sum(axis=1, dtype=np.int32) // channels).astype(np.int16).tobytes()
+
+
+def pick_pcm16_channel(pcm, channels: int, index: int) -> bytes:
+  """Extract one channel from interleaved PCM16."""
+  if channels <= 1:
+    return bytes(pcm)
+  if np is None:
+    return b""
+  return _frames(pcm, channels)[:, min(max(0, index), channels - 1)].tobytes()
+
+
+def split_pcm16_channels(pcm, channels: int) -> list[bytes]:
+  """Demux interleaved PCM16 into one mono buffer per channel."""
+  if channels <= 1:
+    return [bytes(pcm)]
+  if np is None:
+    return []
+  x = _frames(pcm, channels)
+  return [x[:, c].tobytes() for c in range(channels)]
+
+
+class ChannelRouter:
+  """Turns one inbound ACS audio frame into `(stream_key, mono_pcm)` parts."""
+
+  __slots__ = ("mode", "pick_index", "pick_participant")
+
+  def __init__(self, mode: str = MODE_MIX, *, pick_index: int = 0, pick_participant: str | None = None):
+    self.mode = mode if mode in MODES else MODE_MIX
+    self.pick_index = int(pick_index)
+    self.pick_participant = pick_participant or None
+
+  def route(self, pcm, channels: int, participant_id: str | None = None) -> list[tuple[str, bytes]]:
+    channels = max(1, int(channels or 1))
+    if channels > 1:
+      if self.mode == MODE_PER_PARTICIPANT:
+        return [(f"ch{i}", mono) for i, mono in enumerate(split_pcm16_channels(pcm, channels))]
+      if self.mode == MODE_PICK:
+        return [(MAIN_STREAM, pick_pcm16_channel(pcm, channels, self.pick_index))]
+      return [(MAIN_STREAM, downmix_pcm16(pcm, channels))]
+
+    if not participant_id:
+      return [(MAIN_STREAM, pcm)]
+    if self.mode == MODE_PICK:
+      if self.pick_participant is None:
+        # Pin the first participant we hear.
+        self.pick_participant = participant_id
+      if participant_id != self.pick_participant:
+        return []
+      return [(MAIN_STREAM, pcm)]
+    # Separate per-participant frames must never share one resampler.
+    return [(participant_id, pcm)]
+
+
+class InboundStream:
+  """Per-channel / per-participant ingress state."""
+
+  __slots__ = ("key", "resampler", "gate", "bytes_in", "last_seen_ms")
+
+  def __init__(self, key: str, resampler, *, gate=None):
+    self.key = key
+    self.resampler = resampler
+    # Optional per-stream gate with a `process(pcm) -> bytes` method (e.g. media.vad.VadGate),
+    # applied after resampling and before mixing; None means pass everything through.
+    self.gate = gate
+    self.bytes_in = 0
+    self.last_seen_ms = 0
+
+  def stats(self, now_ms: int) -> dict:
+    return {
+      "bytesIn": self.bytes_in,
+      "lastSeenAgeMs": now_ms - self.last_seen_ms if self.last_seen_ms else None,
+      "gate": self.gate.stats() if self.gate is not None else None,
+    }
+
+
+class _MixBuf:
+  __slots__ = ("data", "last_ms")
+
+  def __init__(self):
+    self.data = bytearray()
+    self.last_ms = 0
+
+
+class StreamMixer:
+  """Time-aligns and sums several mono PCM16 streams (after resampling).
+
+  Output only advances as far as every *live* stream has data; a stream that has
+  not pushed for `stale_ms` stops holding the others back (its leftover audio is
+  still mixed in).
+  """
+
+  __slots__ = ("_bufs", "stale_ms")
+
+  def __init__(self, *, stale_ms: int = 100):
+    self._bufs: dict[str, _MixBuf] = {}
+    self.stale_ms = int(stale_ms)
+
+  def __len__(self) -> int:
+    return len(self._bufs)
+
+  def push(self, key: str, pcm, now_ms: int) -> None:
+    buf = self._bufs.get(key)
+    if buf is None:
+      buf = self._bufs[key] = _MixBuf()
+    if pcm:
+      buf.data.extend(pcm)
+    buf.last_ms = now_ms
+
+  def idle(self, key: str) -> None:
+    """`key` has nothing to add for now (e.g. gated silence): stop holding the others back.
+
+    Audio it already pushed is still mixed in; the next `push` makes it live again.
+    """
+    buf = self._bufs.get(key)
+    if buf is not None:
+      buf.last_ms = float("-inf")
+
+  def remove(self, key: str) -> None:
+    self._bufs.pop(key, None)
+
+  def pop(self, now_ms: int) -> bytes:
+    n = None
+    for buf in self._bufs.values():
+      if now_ms - buf.last_ms <= self.stale_ms:
+        size = len(buf.data)
+        n = size if n is None or size < n else n
+    if n is None:
+      # Nobody is live: drain whatever is left.
+      n = max((len(b.data) for b in self._bufs.values()), default=0)
+    n -= n & 1
+    if n <= 0:
+      return b""
+
+    with_data = [b for b in self._bufs.values() if b.data]
+    if len(with_data) == 1:
+      buf = with_data[0]
+      k = min(n, len(buf.data))
+      out = bytes(buf.data[:k])
+      del buf.data[:k]
+      return out
+
+    acc = np.zeros(n // 2, dtype=np.int32)
+    for buf in with_data:
+      k = min(n, len(buf.data) - (len(buf.data) & 1))
+      acc[: k // 2] += np.frombuffer(buf.data, dtype=np.int16, count=k // 2)
+      del buf.data[:k]
+    return np.clip(acc, -32768, 32767).astype(np.int16).tobytes()
@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+import time
+
+from . import codec
+
+# Ingress coalescing for `input_audio_buffer.append`.
+#
+# ACS delivers 20 ms frames; sending each as its own append event costs one
+# base64 + JSON + WebSocket frame per 20 ms. The coalescer batches resampled
+# audio into `window_ms` windows. Callers flush early on VAD edges / barge-in so
+# the added latency never exceeds one window.
+
+# Per-message overhead on the AOAI link besides the base64 payload: the JSON
+# envelope plus a masked client WebSocket header (2 + 2 length + 4 mask bytes).
+APPEND_OVERHEAD_BYTES = len(codec.encode_aoai_append(b"")) + 8
+
+
+class IngressCoalescer:
+  """Batches PCM16 mono into windows of `window_ms` (0 = pass every frame through)."""
+
+  __slots__ = (
+    "window_bytes",
+    "window_ms",
+    "_buf",
+    "_t0",
+    "frames_in",
+    "messages_out",
+    "bytes_out",
+    "early_flushes",
+  )
+
+  def __init__(self, sample_rate: int, *, window_ms: int = 60):
+    self.window_ms = max(0, int(window_ms))
+    self.window_bytes = int(sample_rate) * 2 * self.window_ms // 1000
+    self.window_bytes -= self.window_bytes & 1
+    self._buf = bytearray()
+    self._t0: float | None = None
+    # Counters
+    self.frames_in = 0
+    self.messages_out = 0
+    self.bytes_out = 0
+    self.early_flushes = 0
+
+  def __len__(self) -> int:
+    return len(self._buf)
+
+  def push(self, pcm) -> bytes | None:
+    """Add one frame; returns a batch once a full window is buffered."""
+    if not pcm:
+      return None
+    if self._t0 is None:
+      self._t0 = time.monotonic()
+    self.frames_in += 1
+    buf = self._buf
+    if not buf and len(pcm) >= self.window_bytes:
+      return self._emit(bytes(pcm))
+    buf.extend(pcm)
+    if len(buf) < self.window_bytes:
+      return None
+    out = bytes(buf)
+    buf.clear()
+    return self._emit(out)
+
+  def flush(self) -> bytes | None:
+    """Early flush (VAD edge, barge-in, end of call): whatever is buffered, or None."""
+    if not self._buf:
+      return None
+    out = bytes(self._buf)
+    self._buf.clear()
+    self.early_flushes += 1
+    return self._emit(out)
+
+  def _emit(self, out: bytes) -> bytes:
+    self.messages_out += 1
+    self.bytes_out += len(out)
+    return out
+
+  def stats(self) -> dict:
+    saved = max(0, self.frames_in - self.messages_out)
+    elapsed = time.monotonic() - self._t0 if self._t0 is not None else 0.0
+    return {
+      "windowMs": self.window_ms,
+      "framesIn": self.frames_in,
+      "messagesOut": self.messages_out,
+      "messagesSaved": saved,
+      "earlyFlushes": self.early_flushes,
+      "savedMsgsPerS": round(saved / elapsed, 1) if elapsed > 0 else None,
+      "savedBytesPerS": round(saved * APPEND_OVERHEAD_BYTES / elapsed) if elapsed > 0 else None,
+    }
@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+import json
+import os
+from binascii import a2b_base64, b2a_base64
+
+try:
+  import orjson  # type: ignore
+except Exception:  # pragma: no cover
+  orjson = None  # type: ignore
+
+# Hot-path codec for the 20 ms audio frames exchanged with ACS and AOAI.
+#
+# - Outbound audio frames use prebuilt envelope strings around the base64 payload
+#   (no dict construction, no json.dumps over a large string).
+# - Inbound ACS AudioData and AOAI audio deltas are recognized and their base64
+#   payload sliced out without a full JSON parse; anything unusual falls back to
+#   the regular parser, so the fast path never changes semantics. Only with the
+#   stdlib json backend (SLICE_FAST_PATH): orjson parses a whole frame faster than
+#   the slicing does (bench/media_codec.py).
+# - JSON backend: orjson when installed (MEDIA_WS_JSON_BACKEND=auto|json|orjson).
+
+_BACKEND_ENV = os.getenv("MEDIA_WS_JSON_BACKEND", "auto").strip().lower()
+JSON_BACKEND = "orjson" if orjson is not None and _BACKEND_ENV in ("auto", "orjson") else "json"
+
+if JSON_BACKEND == "orjson":
+  loads = orjson.loads
+
+  def dumps(obj) -> str:
+    return orjson.dumps(obj).decode("utf-8")
+else:
+  loads = json.loads
+
+  def dumps(obj) -> str:
+    return json.dumps(obj)
+
+# Use extract_acs_audio / extract_aoai_audio_delta instead of `loads` for audio frames.
+SLICE_FAST_PATH = JSON_BACKEND == "json"
+
+
+_ACS_AUDIO_HEAD = '{"kind":"AudioData","audioData":{"data":"'
+_ACS_AUDIO_TAIL = '"}}'
+_AOAI_APPEND_HEAD = '{"type":"input_audio_buffer.append","audio":"'
+_AOAI_APPEND_TAIL = '"}'
+
+# Bidirectional streaming control message: ACS drops the audio it has buffered.
+ACS_STOP_AUDIO = '{"kind":"StopAudio","audioData":null,"stopAudio":{}}'
+
+AOAI_AUDIO_DELTA_TYPES = ("response.output_audio.delta", "response.audio.delta")
+
+
+def b64encode_str(pcm) -> str:
+  return b2a_base64(pcm, newline=False).decode("ascii")
+
+
+def b64decode(data) -> bytes:
+  return a2b_base64(data)
+
+
+def encode_acs_audio(pcm) -> str:
+  """ACS bidirectional `AudioData` frame for raw PCM16 bytes."""
+  return _ACS_AUDIO_HEAD + b64encode_str(pcm) + _ACS_AUDIO_TAIL
+
+
+def encode_aoai_append(pcm) -> str:
+  """AOAI `input_audio_buffer.append` event for raw PCM16 bytes."""
+  return _AOAI_APPEND_HEAD + b64encode_str(pcm) + _AOAI_APPEND_TAIL
+
+
+def _string_value(text: str, key: str, start: int = 0) -> str | None:
+  """Value of `"key": "..."` at or after `start`, or None if absent/escaped/not a string."""
+  i = text.find(key, start)
+  if i < 0:
+    return None
+  i += len(key)
+  n = len(text)
+  while i < n and text[i] in " \t\r\n":
+    i += 1
+  if i >= n or text[i] != ":":
+    return None
+  i += 1
+  while i < n and text[i] in " \t\r\n":
+    i += 1
+  if i >= n or text[i] != '"':
+    return None
+  j = text.find('"', i + 1)
+  if j < 0:
+    return None
+  value = text[i + 1 : j]
+  if "\\" in value:
+    # Escaped content (e.g. "\/" in base64): let the real parser handle it.
+    return None
+  return value
+
+
+def extract_acs_audio(text: str) -> tuple[str, str | None] | None:
+  """Fast path for inbound ACS `AudioData`.
+
+  Returns `(base64_data, participantRawID)` or None when the message is not a plain
+  AudioData frame (callers then fall back to a full parse).
+  """
+  if _string_value(text, '"kind"') != "AudioData":
+    return None
+  start = text.find('"audioData"')
+  if start < 0:
+    return None
+  data = _string_value(text, '"data"', start)
+  if data is None:
+    return None
+  return data, _string_value(text, '"participantRawID"', start)
+
+
+def extract_aoai_audio_delta(text: str) -> tuple[str, str] | None:
+  """Fast path for AOAI audio delta events: `(event_type, base64_delta)` or None."""
+  t = _string_value(text, '"type"')
+  if t not in AOAI_AUDIO_DELTA_TYPES:
+    return None
+  delta = _string_value(text, '"delta"')
+  if delta is None:
+    return None
+  return t, delta
@@ -0,0 +1,150 @@
+from __future__ import annotations
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+# Optional offload of per-call DSP (resample, downmix, VAD) to a small thread pool.
+#
+# soxr and NumPy release the GIL, so with several cores the audio math of many calls
+# can run in parallel instead of delaying WebSocket I/O on the event loop.
+#
+# - Ordering: every call direction has a `DspLane`. A lane has at most one batch in
+#   the pool at a time and its jobs run in submission order, so the (stateful)
+#   resamplers / gates of one call are never touched by two threads at once.
+# - Batching: jobs submitted during one loop iteration are dispatched together on the
+#   next tick (`call_soon`), up to `max_batch` per pool task, and completed with a
+#   single `call_soon_threadsafe`. With 50+ calls this is one handoff per tick instead
+#   of one per 20 ms frame.
+# - Saturation: when `max_inflight` batches are already queued/running, a job for an
+#   idle lane runs inline instead of waiting behind them (same cost as no executor).
+
+_BATCHES_PER_THREAD = 2
+
+
+class DspLane:
+  """Ordered job queue for one call direction."""
+
+  __slots__ = ("name", "pending", "busy", "queued")
+
+  def __init__(self, name: str = ""):
+    self.name = name
+    self.pending: list = []
+    # A batch containing this lane's jobs is in the pool.
+    self.busy = False
+    # Lane is in the executor's ready list for the next tick.
+    self.queued = False
+
+
+def _run_batch(batch: list) -> list:
+  # Runs on a pool thread. Each item: (fn, args, future) -> (future, result, exc).
+  out = []
+  for fn, args, fut in batch:
+    try:
+      out.append((fut, fn(*args), None))
+    except BaseException as e:  # delivered to the awaiting coroutine
+      out.append((fut, None, e))
+  return out
+
+
+class DspExecutor:
+  """Bounded, lane-ordered, tick-batched thread pool for small CPU jobs."""
+
+  def __init__(self, *, threads: int = 2, max_inflight: int | None = None, max_batch: int = 64):
+    self.threads = max(1, int(threads))
+    self.max_inflight = max(1, int(max_inflight or self.threads * _BATCHES_PER_THREAD))
+    self.max_batch = max(1, int(max_batch))
+    self._pool = ThreadPoolExecutor(max_workers=self.threads, thread_name_prefix="dsp")
+    self._loop: asyncio.AbstractEventLoop | None = None
+    self._ready: list[DspLane] = []
+    self._flush_scheduled = False
+    self.inflight = 0
+    # Counters
+    self.jobs_pool = 0
+    self.jobs_inline = 0
+    self.batches = 0
+
+  def lane(self, name: str = "") -> DspLane:
+    return DspLane(name)
+
+  async def run(self, lane: DspLane, fn, *args):
+    """Run `fn(*args)` after all earlier jobs of `lane`; returns its result."""
+    if self.inflight >= self.max_inflight and not lane.busy and not lane.pending:
+      self.jobs_inline += 1
+      return fn(*args)
+    loop = self._loop
+    if loop is None:
+      loop = self._loop = asyncio.get_running_loop()
+    fut = loop.create_future()
+    lane.pending.append((fn, args, fut))
+    if not lane.busy and not lane.queued:
+      self._enqueue(lane)
+    return await fut
+
+  def _enqueue(self, lane: DspLane) -> None:
+    lane.queued = True
+    self._ready.append(lane)
+    if not self._flush_scheduled:
+      self._flush_scheduled = True
+      self._loop.call_soon(self._flush)
+
+  def _flush(self) -> None:
+    self._flush_scheduled = False
+    ready = self._ready
+    self._ready = []
+    batch: list = []
+    lanes: list[DspLane] = []
+    for lane in ready:
+      lane.queued = False
+      if lane.busy or not lane.pending:
+        continue
+      # A lane's jobs always go to one batch (never split across threads).
+      lane.busy = True
+      batch.extend(lane.pending)
+      lane.pending = []
+      lanes.append(lane)
+      if len(batch) >= self.max_batch:
+        self._submit(batch, lanes)
+        batch, lanes = [], []
+    if batch:
+      self._submit(batch, lanes)
+
+  def _submit(self, batch: list, lanes: list[DspLane]) -> None:
+    self.inflight += 1
+    self.batches += 1
+    self.jobs_pool += len(batch)
+    loop = self._loop
+    cf = self._pool.submit(_run_batch, batch)
+    cf.add_done_callback(lambda f: loop.call_soon_threadsafe(self._complete, f, batch, lanes))
+
+  def _complete(self, cf, batch: list, lanes: list[DspLane]) -> None:
+    self.inflight -= 1
+    try:
+      results = cf.result()
+    except BaseException as e:  # pool shut down / batch cancelled
+      results = [(fut, None, e) for _, _, fut in batch]
+    for fut, result, exc in results:
+      if fut.done():  # awaiting coroutine was cancelled
+        continue
+      if exc is not None:
+        fut.set_exception(exc)
+      else:
+        fut.set_result(result)
+    for lane in lanes:
+      lane.busy = False
+      if lane.pending and not lane.queued:
+        self._enqueue(lane)
+
+  def stats(self) -> dict:
+    total = self.jobs_pool + self.jobs_inline
+    return {
+      "threads": self.threads,
+      "inflight": self.inflight,
+      "jobsPool": self.jobs_pool,
+      "jobsInline": self.jobs_inline,
+      "batches": self.batches,
+      "jobsPerBatch": round(self.jobs_pool / self.batches, 2) if self.batches else None,
+      "inlinePct": round(100.0 * self.jobs_inline / total, 1) if total else 0.0,
+    }
+
+  def shutdown(self) -> None:
+    self._pool.shutdown(wait=False, cancel_futures=True)
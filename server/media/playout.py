@@ -0,0 +1,308 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import deque
+from contextlib import suppress
+
+from .send_queue import POLICY_DISCONNECT, normalize_policy
+
+# Real-time paced outbound audio toward ACS.
+#
+# AOAI delivers audio faster than real time. Instead of forwarding bursts of
+# variable-size chunks, the scheduler slices audio into fixed frames and sends each
+# frame shortly (`lead_ms`) before it is due to play. Everything not yet sent stays
+# in our queue, where barge-in can drop it instantly.
+#
+# Playout model: ACS starts playing a frame as soon as it arrives with an empty
+# buffer, and plays back-to-back otherwise. `_play_at` is the predicted start time
+# of the next frame on ACS's side.
+#
+# The queue is bounded (`max_queue_ms`). Frames have a fixed size, so the coalesce
+# policy cannot merge them and behaves like drop_oldest here; disconnect reports
+# overload through `on_overload(reason)`.
+#
+# Barge-in: `interrupt()` drops the queue and, when `send_stop` is given, has the
+# scheduler task send it next (ACS StopAudio flushes what ACS already buffered).
+# Going through the same task guarantees no frame is written after the stop.
+#
+# Tentative barge-in: `pause()` holds queued (and newly pushed) frames without
+# dropping anything; `resume()` continues from where playout stopped, `interrupt()`
+# discards it. Only what ACS already buffered (about `lead_ms`) keeps playing.
+
+FRAME_MS_CHOICES = (20, 40, 100)
+
+
+class PacedSender:
+  """Per-call outbound audio scheduler.
+
+  `send` is an async callable taking one frame of raw PCM16 mono bytes.
+  """
+
+  __slots__ = (
+    "sample_rate",
+    "frame_ms",
+    "frame_bytes",
+    "lead_s",
+    "paced",
+    "max_frames",
+    "policy",
+    "_send",
+    "_send_stop",
+    "_stop_pending",
+    "_on_overload",
+    "_partial",
+    "_frames",
+    "_wakeup",
+    "_task",
+    "_play_at",
+    "_in_run",
+    "_draining",
+    "_paused",
+    "frames_sent",
+    "bytes_sent",
+    "bytes_dropped",
+    "bytes_shed",
+    "overloaded",
+    "underruns",
+    "max_depth_frames",
+    "lead_ms_last",
+    "lead_ms_min",
+    "send_errors",
+    "stops_sent",
+    "pauses",
+  )
+
+  def __init__(
+    self,
+    send,
+    *,
+    sample_rate: int,
+    frame_ms: int = 20,
+    lead_ms: int = 80,
+    paced: bool = True,
+    max_queue_ms: int = 0,
+    policy: str | None = None,
+    on_overload=None,
+    send_stop=None,
+  ):
+    if frame_ms not in FRAME_MS_CHOICES:
+      frame_ms = 20
+    self.sample_rate = int(sample_rate)
+    self.frame_ms = frame_ms
+    self.frame_bytes = self.sample_rate * 2 * frame_ms // 1000
+    self.lead_s = max(0, int(lead_ms)) / 1000.0
+    self.paced = bool(paced)
+    # 0 = unbounded
+    self.max_frames = max(0, int(max_queue_ms)) // frame_ms
+    self.policy = normalize_policy(policy)
+    self._send = send
+    self._on_overload = on_overload
+    self._send_stop = send_stop
+    self._stop_pending = False
+    self._partial = bytearray()
+    self._frames: deque[bytes] = deque()
+    self._wakeup = asyncio.Event()
+    self._task: asyncio.Task | None = None
+    self._play_at: float | None = None
+    self._in_run = False
+    self._draining = False
+    self._paused = False
+    # Metrics
+    self.frames_sent = 0
+    self.bytes_sent = 0
+    self.bytes_dropped = 0
+    self.bytes_shed = 0
+    self.overloaded = False
+    self.underruns = 0
+    self.max_depth_frames = 0
+    self.lead_ms_last = 0.0
+    self.lead_ms_min: float | None = None
+    self.send_errors = 0
+    self.stops_sent = 0
+    self.pauses = 0
+
+  # --- producer side (never blocks) ---
+
+  def push(self, pcm) -> None:
+    """Queue PCM (any size); whole frames become sendable immediately."""
+    if not pcm or self.overloaded:
+      return
+    buf = self._partial
+    buf.extend(pcm)
+    fb = self.frame_bytes
+    if len(buf) < fb:
+      return
+    n = len(buf) - len(buf) % fb
+    mv = memoryview(buf)
+    try:
+      for i in range(0, n, fb):
+        self._frames.append(bytes(mv[i : i + fb]))
+    finally:
+      mv.release()
+    del buf[:n]
+    if self.max_frames and len(self._frames) > self.max_frames:
+      self._shed()
+      if self.overloaded:
+        return
+    if len(self._frames) > self.max_depth_frames:
+      self.max_depth_frames = len(self._frames)
+    self._start()
+    self._wakeup.set()
+
+  def flush(self) -> None:
+    """End of a response: queue the trailing partial frame as-is."""
+    if self._partial:
+      self._frames.append(bytes(self._partial))
+      self._partial.clear()
+      self._start()
+      self._wakeup.set()
+    # Once the queue drains, the next frame starts a new run (not an underrun).
+    self._draining = True
+
+  def clear(self) -> int:
+    """Drop everything not yet sent (barge-in). Returns the number of bytes dropped."""
+    dropped = len(self._partial) + sum(len(f) for f in self._frames)
+    self._partial.clear()
+    self._frames.clear()
+    self._play_at = None
+    self._in_run = False
+    self._draining = False
+    self._paused = False
+    self.bytes_dropped += dropped
+    self._wakeup.set()
+    return dropped
+
+  def interrupt(self) -> int:
+    """Barge-in: drop unsent audio and flush the peer's buffer. Returns bytes dropped."""
+    dropped = self.clear()
+    if self._send_stop is not None:
+      self._stop_pending = True
+      self._start()
+      self._wakeup.set()
+    return dropped
+
+  def pause(self) -> None:
+    """Stop sending (queued audio is kept) until `resume()` or `interrupt()`."""
+    if not self._paused:
+      self._paused = True
+      self.pauses += 1
+      self._wakeup.set()
+
+  def resume(self) -> None:
+    if self._paused:
+      self._paused = False
+      # ACS drained its buffer meanwhile: the next frame starts a new run.
+      self._play_at = None
+      self._in_run = False
+      self._wakeup.set()
+
+  @property
+  def paused(self) -> bool:
+    return self._paused
+
+  def _shed(self) -> None:
+    frames = self._frames
+    if self.policy == POLICY_DISCONNECT:
+      self.bytes_shed += len(self._partial) + sum(len(f) for f in frames)
+      self._partial.clear()
+      frames.clear()
+      self.overloaded = True
+      if self._on_overload is not None:
+        self._on_overload(f"ACS playout queue over {self.max_frames * self.frame_ms} ms")
+      return
+    while len(frames) > self.max_frames:
+      self.bytes_shed += len(frames.popleft())
+
+  @property
+  def depth_ms(self) -> int:
+    queued = len(self._partial) + len(self._frames) * self.frame_bytes
+    return queued * 1000 // (self.sample_rate * 2)
+
+  def stats(self) -> dict:
+    return {
+      "frameMs": self.frame_ms,
+      "leadMs": int(self.lead_s * 1000),
+      "paced": self.paced,
+      "queueDepthMs": self.depth_ms,
+      "maxQueueDepthMs": self.max_depth_frames * self.frame_ms,
+      "framesSent": self.frames_sent,
+      "bytesSent": self.bytes_sent,
+      "bytesDropped": self.bytes_dropped,
+      "maxQueueMs": self.max_frames * self.frame_ms,
+      "policy": self.policy,
+      "bytesShed": self.bytes_shed,
+      "overloaded": self.overloaded,
+      "underruns": self.underruns,
+      "leadMsLast": round(self.lead_ms_last, 1),
+      "leadMsMin": round(self.lead_ms_min, 1) if self.lead_ms_min is not None else None,
+      "sendErrors": self.send_errors,
+      "stopsSent": self.stops_sent,
+      "paused": self._paused,
+      "pauses": self.pauses,
+    }
+
+  # --- scheduler task ---
+
+  def _start(self) -> None:
+    if self._task is None:
+      self._task = asyncio.create_task(self._run())
+
+  async def close(self) -> None:
+    if self._task is not None:
+      self._task.cancel()
+      with suppress(BaseException):
+        await self._task
+      self._task = None
+
+  async def _run(self) -> None:
+    frames = self._frames
+    while True:
+      if self._stop_pending:
+        self._stop_pending = False
+        try:
+          await self._send_stop()
+          self.stops_sent += 1
+        except Exception:
+          self.send_errors += 1
+        continue
+
+      if not frames or self._paused:
+        self._wakeup.clear()
+        await self._wakeup.wait()
+        continue
+
+      now = time.monotonic()
+      play_at = self._play_at
+      if play_at is None or play_at < now:
+        # ACS buffer is (predicted) empty: the next frame plays on arrival.
+        if play_at is not None and self._in_run:
+          self.underruns += 1
+        play_at = self._play_at = now
+
+      if self.paced:
+        wait = play_at - self.lead_s - now
+        if wait > 0:
+          # Wake early on clear()/push so barge-in takes effect immediately.
+          self._wakeup.clear()
+          with suppress(asyncio.TimeoutError):
+            await asyncio.wait_for(self._wakeup.wait(), timeout=wait)
+          continue
+
+      frame = frames.popleft()
+      if frames or not self._draining:
+        self._in_run = True
+      else:
+        self._in_run = self._draining = False
+      lead_ms = (play_at - now) * 1000.0
+      self.lead_ms_last = lead_ms
+      if self.lead_ms_min is None or lead_ms < self.lead_ms_min:
+        self.lead_ms_min = lead_ms
+      self._play_at = play_at + len(frame) / (self.sample_rate * 2)
+      try:
+        await self._send(frame)
+      except Exception:
+        self.send_errors += 1
+        continue
+      self.frames_sent += 1
+      self.bytes_sent += len(frame)
@@ -0,0 +1,229 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import re
+import struct
+import time
+
+from . import codec
+
+# Binary per-call session recordings (MEDIA_WS_RECORD_DIR), for offline replay.
+#
+# File layout:
+#   MAGIC, u32 header length, header JSON (call id, start time, formats)
+#   records: u8 kind, i64 microseconds since the call started (monotonic), u32 payload
+#            length, payload
+# Audio payloads are raw PCM16 (no base64); events are the JSON text as sent/received.
+# ACS inbound audio is prefixed with u8 length + participant id (0 when absent).
+#
+# The media handler only appends to an in-memory buffer; a per-call writer task hands
+# it to a worker thread in large writes every `flush_ms`. The buffer is bounded
+# (`max_buffer_bytes`): when the disk can't keep up, records are dropped (counted, and
+# a GAP record marks where) instead of growing memory or blocking the call.
+MAGIC = b"ACSREC\x00\x01"
+VERSION = 1
+
+ACS_IN_AUDIO = 1  # ACS -> gateway AudioData PCM (ACS format, as received)
+ACS_IN_EVENT = 2  # ACS -> gateway non-audio message (AudioMetadata, DtmfData, ...)
+ACS_OUT_AUDIO = 3  # gateway -> ACS AudioData PCM (ACS rate, when it was sent)
+ACS_OUT_EVENT = 4  # gateway -> ACS control message (StopAudio)
+AOAI_IN_AUDIO = 5  # AOAI -> gateway audio delta PCM (24 kHz)
+AOAI_IN_EVENT = 6  # AOAI -> gateway event other than audio deltas
+AOAI_OUT_EVENT = 7  # gateway -> AOAI control event (response.create / response.cancel)
+GAP = 8  # records dropped before this one: {"records": n, "bytes": n}
+
+KIND_NAMES = {
+  ACS_IN_AUDIO: "acs_in_audio",
+  ACS_IN_EVENT: "acs_in_event",
+  ACS_OUT_AUDIO: "acs_out_audio",
+  ACS_OUT_EVENT: "acs_out_event",
+  AOAI_IN_AUDIO: "aoai_in_audio",
+  AOAI_IN_EVENT: "aoai_in_event",
+  AOAI_OUT_EVENT: "aoai_out_event",
+  GAP: "gap",
+}
+
+_RECORD = struct.Struct("<BqI")
+_U32 = struct.Struct("<I")
+_SAFE_NAME = re.compile(r"[^A-Za-z0-9_.-]+")
+
+
+def recording_path(directory: str, call_id: str | None, now_ms: int | None = None) -> str:
+  name = _SAFE_NAME.sub("_", call_id or "call")[:80] or "call"
+  return os.path.join(directory, f"{name}-{now_ms or int(time.time() * 1000)}.acsrec")
+
+
+class CallRecorder:
+  """Append-only recorder for one call; `start()` on the loop, `await close()` at the end."""
+
+  __slots__ = (
+    "path",
+    "header",
+    "max_buffer_bytes",
+    "flush_s",
+    "records",
+    "bytes_written",
+    "dropped_records",
+    "dropped_bytes",
+    "_t0_ns",
+    "_buf",
+    "_buffered",
+    "_gap_records",
+    "_gap_bytes",
+    "_wake",
+    "_task",
+    "_closed",
+    "_error",
+  )
+
+  def __init__(self, path: str, header: dict, *, max_buffer_bytes: int = 4 << 20, flush_ms: int = 500):
+    self.path = path
+    self.header = dict(header)
+    self.max_buffer_bytes = max(64 << 10, int(max_buffer_bytes))
+    self.flush_s = max(10, int(flush_ms)) / 1000.0
+    self.records = 0
+    self.bytes_written = 0
+    self.dropped_records = 0
+    self.dropped_bytes = 0
+    self._t0_ns = time.perf_counter_ns()
+    self._buf: list[bytes] = []
+    self._buffered = 0
+    self._gap_records = 0
+    self._gap_bytes = 0
+    self._wake: asyncio.Event | None = None
+    self._task: asyncio.Task | None = None
+    self._closed = False
+    self._error: str | None = None
+
+  def start(self) -> None:
+    if self._task is None:
+      self._wake = asyncio.Event()
+      self._task = asyncio.get_running_loop().create_task(self._run())
+
+  # --- producers (event loop, never block) ---
+
+  def _add(self, kind: int, payload: bytes) -> None:
+    if self._closed:
+      return
+    size = _RECORD.size + len(payload)
+    if self._buffered + size > self.max_buffer_bytes:
+      self.dropped_records += 1
+      self.dropped_bytes += size
+      self._gap_records += 1
+      self._gap_bytes += size
+      return
+    t_us = (time.perf_counter_ns() - self._t0_ns) // 1000
+    if self._gap_records:
+      gap = json.dumps({"records": self._gap_records, "bytes": self._gap_bytes}).encode("utf-8")
+      self._buf.append(_RECORD.pack(GAP, t_us, len(gap)) + gap)
+      self._buffered += _RECORD.size + len(gap)
+      self._gap_records = self._gap_bytes = 0
+    self._buf.append(_RECORD.pack(kind, t_us, len(payload)))
+    self._buf.append(payload)
+    self._buffered += size
+    self.records += 1
+    if self._buffered >= self.max_buffer_bytes // 2 and self._wake is not None:
+      self._wake.set()
+
+  def audio(self, kind: int, pcm, participant_id: str | None = None) -> None:
+    if kind == ACS_IN_AUDIO:
+      pid = (participant_id or "").encode("utf-8")[:255]
+      self._add(kind, bytes((len(pid),)) + pid + bytes(pcm))
+    else:
+      self._add(kind, bytes(pcm))
+
+  def event(self, kind: int, message) -> None:
+    if isinstance(message, dict):
+      message = codec.dumps(message)
+    if isinstance(message, str):
+      message = message.encode("utf-8")
+    self._add(kind, message)
+
+  # --- writer ---
+
+  def _take(self) -> bytes:
+    data = b"".join(self._buf)
+    self._buf.clear()
+    self._buffered = 0
+    return data
+
+  async def _run(self) -> None:
+    f = None
+    try:
+      os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+      f = await asyncio.to_thread(open, self.path, "wb")
+      head = json.dumps({"version": VERSION, **self.header}, ensure_ascii=False).encode("utf-8")
+      await asyncio.to_thread(f.write, MAGIC + _U32.pack(len(head)) + head)
+      while True:
+        try:
+          await asyncio.wait_for(self._wake.wait(), timeout=self.flush_s)
+        except asyncio.TimeoutError:
+          pass
+        self._wake.clear()
+        data = self._take()
+        if data:
+          await asyncio.to_thread(f.write, data)
+          self.bytes_written += len(data)
+        if self._closed and not self._buf:
+          break
+    except Exception as e:
+      # Recording must never take the call down: stop recording, keep the error.
+      self._error = repr(e)
+      self._closed = True
+      self._buf.clear()
+      self._buffered = 0
+    finally:
+      if f is not None:
+        await asyncio.to_thread(f.close)
+
+  async def close(self) -> dict:
+    self._closed = True
+    if self._task is not None:
+      self._wake.set()
+      try:
+        await self._task
+      except Exception:
+        pass
+    return self.stats()
+
+  def stats(self) -> dict:
+    return {
+      "path": self.path,
+      "records": self.records,
+      "bytesWritten": self.bytes_written,
+      "droppedRecords": self.dropped_records,
+      "droppedBytes": self.dropped_bytes,
+      "error": self._error,
+    }
+
+
+def read_recording(path: str) -> tuple[dict, list[tuple[int, int, bytes]]]:
+  """Parse a recording: (header, [(kind, t_us, payload), ...]). A truncated tail is ignored."""
+  with open(path, "rb") as f:
+    data = f.read()
+  if data[: len(MAGIC)] != MAGIC:
+    raise ValueError(f"{path}: not a call recording")
+  off = len(MAGIC)
+  (hlen,) = _U32.unpack_from(data, off)
+  off += _U32.size
+  header = json.loads(data[off : off + hlen].decode("utf-8"))
+  off += hlen
+  records = []
+  end = len(data)
+  while off + _RECORD.size <= end:
+    kind, t_us, n = _RECORD.unpack_from(data, off)
+    off += _RECORD.size
+    if off + n > end:
+      break
+    records.append((kind, t_us, data[off : off + n]))
+    off += n
+  return header, records
+
+
+def split_acs_audio(payload: bytes) -> tuple[str | None, bytes]:
+  """ACS_IN_AUDIO payload -> (participant id, pcm)."""
+  n = payload[0] if payload else 0
+  pid = payload[1 : 1 + n].decode("utf-8", "replace") if n else None
+  return pid, payload[1 + n :]
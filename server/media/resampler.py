@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+try:
+  import numpy as np  # type: ignore
+except Exception:  # pragma: no cover
+  np = None  # type: ignore
+
+try:
+  import soxr  # type: ignore
+except Exception:  # pragma: no cover
+  soxr = None  # type: ignore
+
+try:
+  import audioop  # stdlib (deprecated in newer Python, still present in 3.12)
+except Exception:  # pragma: no cover
+  audioop = None  # type: ignore
+
+SOXR_AVAILABLE = soxr is not None and np is not None
+AUDIOOP_AVAILABLE = audioop is not None
+
+_EMPTY = memoryview(b"")
+
+
+class Resampler:
+  """Streaming PCM16 mono resampler for one direction of one call.
+
+  - soxr runs directly in the int16 domain (no float conversion / scaling / clipping passes).
+  - `process()` returns a read-only view of the resampler output; it is only valid until
+    the next call, so copy it (e.g. `bytearray.extend`) if it must outlive that.
+  - `flush()` drains the filter tail at end-of-stream; `reset()` drops all history
+    (e.g. on barge-in).
+
+  method: "auto" (soxr, else audioop), "soxr" (soxr only) or "audioop" (audioop only).
+  When no usable backend exists the resampler outputs nothing (audio is dropped).
+  """
+
+  __slots__ = ("src_rate", "dst_rate", "method", "quality", "kind", "_stream", "_ratecv_state", "_carry")
+
+  def __init__(self, src_rate: int, dst_rate: int, *, method: str = "auto", quality: str = "HQ"):
+    self.src_rate = int(src_rate)
+    self.dst_rate = int(dst_rate)
+    self.method = method
+    self.quality = quality
+    self._stream = None
+    self._ratecv_state = None
+    self._carry = b""
+    if self.src_rate == self.dst_rate:
+      self.kind = "passthrough"
+    elif method in ("auto", "soxr") and SOXR_AVAILABLE:
+      self.kind = "soxr"
+      self._stream = soxr.ResampleStream(self.src_rate, self.dst_rate, 1, dtype="int16", quality=quality)
+    elif method in ("auto", "audioop") and AUDIOOP_AVAILABLE:
+      self.kind = "audioop"
+    else:
+      self.kind = "none"
+
+  def process(self, pcm) -> memoryview:
+    """Resample one chunk of PCM16 mono (any bytes-like object)."""
+    if self._carry:
+      pcm = self._carry + bytes(pcm)
+      self._carry = b""
+    n = len(pcm)
+    if n & 1:
+      # Keep the dangling byte for the next chunk instead of dropping it.
+      self._carry = bytes(pcm[-1:])
+      pcm = memoryview(pcm)[:-1]
+      n -= 1
+    if not n:
+      return _EMPTY
+
+    kind = self.kind
+    if kind == "soxr":
+      # Byte-oriented view (len() in bytes, like the other paths).
+      return self._stream.resample_chunk(np.frombuffer(pcm, dtype=np.int16)).data.cast("B")
+    if kind == "passthrough":
+      return memoryview(pcm)
+    if kind == "audioop":
+      out, self._ratecv_state = audioop.ratecv(pcm, 2, 1, self.src_rate, self.dst_rate, self._ratecv_state)
+      return memoryview(out)
+    return _EMPTY
+
+  def flush(self) -> memoryview:
+    """Drain buffered samples at end-of-stream and make the resampler reusable."""
+    self._carry = b""
+    if self.kind == "soxr":
+      tail = self._stream.resample_chunk(np.zeros((0,), dtype=np.int16), last=True)
+      self._stream.clear()
+      return tail.data.cast("B")
+    # audioop.ratecv has no explicit flush; just restart its state.
+    self._ratecv_state = None
+    return _EMPTY
+
+  def reset(self) -> None:
+    """Discard all buffered history without emitting it."""
+    self._carry = b""
+    self._ratecv_state = None
+    if self._stream is not None:
+      self._stream.clear()
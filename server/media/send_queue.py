@@ -0,0 +1,178 @@
+from __future__ import annotations
+
+import asyncio
+from collections import deque
+from contextlib import suppress
+
+# Bounded, per-direction send queues.
+#
+# Producers never await the peer socket: they `put()` and return. A dedicated
+# writer task drains the queue. When the bound is exceeded the configured
+# overload policy applies:
+# - coalesce:    merge new data into the newest queued item (fewer, larger messages);
+#                if the byte bound is still exceeded, drop the oldest data.
+# - drop_oldest: drop the oldest queued items until back under the bound.
+# - disconnect:  drop the queue and report overload (the call is torn down).
+POLICY_COALESCE = "coalesce"
+POLICY_DROP_OLDEST = "drop_oldest"
+POLICY_DISCONNECT = "disconnect"
+POLICIES = (POLICY_COALESCE, POLICY_DROP_OLDEST, POLICY_DISCONNECT)
+
+
+def normalize_policy(value: str | None, default: str = POLICY_COALESCE) -> str:
+  v = (value or "").strip().lower().replace("-", "_")
+  return v if v in POLICIES else default
+
+
+class BoundedSendQueue:
+  """Bounded byte-chunk queue with its own writer task.
+
+  `send` is an async callable receiving one queued chunk (bytes-like).
+  `on_overload(reason)` is called once when the disconnect policy trips.
+  """
+
+  __slots__ = (
+    "name",
+    "max_items",
+    "max_bytes",
+    "policy",
+    "_send",
+    "_on_overload",
+    "_items",
+    "_bytes",
+    "_wakeup",
+    "_task",
+    "overloaded",
+    "high_water_items",
+    "high_water_bytes",
+    "dropped_items",
+    "dropped_bytes",
+    "coalesced",
+    "sent_items",
+    "sent_bytes",
+    "send_errors",
+  )
+
+  def __init__(
+    self,
+    send,
+    *,
+    name: str,
+    max_items: int,
+    max_bytes: int,
+    policy: str = POLICY_COALESCE,
+    on_overload=None,
+  ):
+    self.name = name
+    self.max_items = max(1, int(max_items))
+    self.max_bytes = max(1, int(max_bytes))
+    self.policy = normalize_policy(policy)
+    self._send = send
+    self._on_overload = on_overload
+    self._items: deque[bytearray] = deque()
+    self._bytes = 0
+    self._wakeup = asyncio.Event()
+    self._task: asyncio.Task | None = None
+    self.overloaded = False
+    # Counters
+    self.high_water_items = 0
+    self.high_water_bytes = 0
+    self.dropped_items = 0
+    self.dropped_bytes = 0
+    self.coalesced = 0
+    self.sent_items = 0
+    self.sent_bytes = 0
+    self.send_errors = 0
+
+  def __len__(self) -> int:
+    return len(self._items)
+
+  @property
+  def queued_bytes(self) -> int:
+    return self._bytes
+
+  def put(self, data) -> bool:
+    """Queue a copy of `data`. Returns False if it was rejected (overloaded)."""
+    n = len(data)
+    if not n or self.overloaded:
+      return not self.overloaded
+    items = self._items
+    if self.policy == POLICY_COALESCE and items and len(items) >= self.max_items:
+      items[-1].extend(data)
+      self.coalesced += 1
+    else:
+      items.append(bytearray(data))
+    self._bytes += n
+
+    if len(items) > self.max_items or self._bytes > self.max_bytes:
+      if self.policy == POLICY_DISCONNECT:
+        self._trip(f"{self.name} queue over bound ({len(items)} items / {self._bytes} bytes)")
+        return False
+      while items and (len(items) > self.max_items or self._bytes > self.max_bytes):
+        old = items.popleft()
+        self._bytes -= len(old)
+        self.dropped_items += 1
+        self.dropped_bytes += len(old)
+
+    if len(items) > self.high_water_items:
+      self.high_water_items = len(items)
+    if self._bytes > self.high_water_bytes:
+      self.high_water_bytes = self._bytes
+    if self._task is None:
+      self._task = asyncio.create_task(self._run())
+    self._wakeup.set()
+    return True
+
+  def clear(self) -> int:
+    dropped = self._bytes
+    self._items.clear()
+    self._bytes = 0
+    return dropped
+
+  def _trip(self, reason: str) -> None:
+    self.dropped_items += len(self._items)
+    self.dropped_bytes += self._bytes
+    self.clear()
+    self.overloaded = True
+    if self._on_overload is not None:
+      self._on_overload(reason)
+
+  def stats(self) -> dict:
+    return {
+      "policy": self.policy,
+      "queued": len(self._items),
+      "queuedBytes": self._bytes,
+      "highWaterItems": self.high_water_items,
+      "highWaterBytes": self.high_water_bytes,
+      "droppedItems": self.dropped_items,
+      "droppedBytes": self.dropped_bytes,
+      "coalesced": self.coalesced,
+      "sentItems": self.sent_items,
+      "sentBytes": self.sent_bytes,
+      "sendErrors": self.send_errors,
+      "overloaded": self.overloaded,
+    }
+
+  async def _run(self) -> None:
+    items = self._items
+    while True:
+      if not items:
+        self._wakeup.clear()
+        await self._wakeup.wait()
+        continue
+      data = items.popleft()
+      self._bytes -= len(data)
+      try:
+        await self._send(data)
+      except Exception:
+        self.send_errors += 1
+        continue
+      self.sent_items += 1
+      self.sent_bytes += len(data)
+
+  async def close(self) -> None:
+    if self._task is not None:
+      self._task.cancel()
+      with suppress(BaseException):
+        await self._task
+      self._task = None
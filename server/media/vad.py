@@ -0,0 +1,152 @@
+from __future__ import annotations
+
+import math
+
+try:
+  import numpy as np  # type: ignore
+except Exception:  # pragma: no cover
+  np = None  # type: ignore
+
+# Local energy VAD gate in front of input_audio_buffer.append.
+#
+# Silence (and low-level line noise) is not forwarded to AOAI. Server VAD still
+# makes the turn decisions, so the gate must never hide what it relies on:
+# - pre-roll:  when speech starts, the last `preroll_ms` of suppressed audio is sent
+#              first (>= server `prefix_padding_ms`, 300 ms by default);
+# - hangover:  after speech, audio keeps flowing for `hangover_ms` (> server
+#              `silence_duration_ms`, 1000 ms by default) so the server sees the
+#              trailing silence and commits the turn.
+#
+# A chunk is voiced when its RMS level is above the threshold and its zero-crossing
+# rate is below `zcr_max` (broadband hiss has a high ZCR). Hysteresis: `start_db`
+# must hold for `attack_ms` to open the gate; it closes after `hangover_ms` below
+# `stop_db`.
+
+
+def pcm16_level(pcm) -> tuple[float, float]:
+  """(RMS level in dBFS, zero-crossing rate) of a PCM16 mono chunk."""
+  n = len(pcm) // 2
+  if n == 0 or np is None:
+    return -120.0, 0.0
+  x = np.frombuffer(pcm, dtype=np.int16, count=n).astype(np.float32)
+  ms = float(np.dot(x, x)) / n
+  db = 10.0 * math.log10(ms / (32768.0 * 32768.0)) if ms > 0 else -120.0
+  zcr = float(np.count_nonzero(np.signbit(x[1:]) != np.signbit(x[:-1]))) / max(1, n - 1)
+  return db, zcr
+
+
+class VadGate:
+  """Per-call gate over resampled PCM16 mono; `process()` returns what to forward."""
+
+  __slots__ = (
+    "bytes_per_ms",
+    "start_db",
+    "stop_db",
+    "zcr_max",
+    "attack_bytes",
+    "hangover_bytes",
+    "preroll_bytes",
+    "speaking",
+    "_attack",
+    "_quiet",
+    "_preroll",
+    "bytes_in",
+    "bytes_out",
+    "onsets",
+    "last_db",
+  )
+
+  def __init__(
+    self,
+    sample_rate: int,
+    *,
+    start_db: float = -45.0,
+    stop_db: float = -50.0,
+    zcr_max: float = 0.35,
+    attack_ms: int = 60,
+    hangover_ms: int = 1300,
+    preroll_ms: int = 300,
+  ):
+    self.bytes_per_ms = int(sample_rate) * 2 / 1000.0
+    self.start_db = float(start_db)
+    self.stop_db = min(float(stop_db), self.start_db)
+    self.zcr_max = float(zcr_max)
+    self.attack_bytes = int(max(0, attack_ms) * self.bytes_per_ms)
+    self.hangover_bytes = int(max(0, hangover_ms) * self.bytes_per_ms)
+    self.preroll_bytes = int(max(0, preroll_ms) * self.bytes_per_ms)
+    self.preroll_bytes -= self.preroll_bytes & 1
+    self.speaking = False
+    self._attack = 0
+    self._quiet = 0
+    self._preroll = bytearray()
+    # Counters
+    self.bytes_in = 0
+    self.bytes_out = 0
+    self.onsets = 0
+    self.last_db = -120.0
+
+  def process(self, pcm) -> bytes:
+    if not pcm:
+      return b""
+    n = len(pcm)
+    self.bytes_in += n
+    if np is None:
+      # No numpy: gate disabled, forward everything.
+      self.bytes_out += n
+      return bytes(pcm)
+
+    db, zcr = pcm16_level(pcm)
+    self.last_db = db
+
+    if self.speaking:
+      if db < self.stop_db:
+        self._quiet += n
+        if self._quiet > self.hangover_bytes:
+          self.speaking = False
+          self._quiet = 0
+          self._attack = 0
+          self._keep_preroll(pcm)
+          return b""
+      else:
+        self._quiet = 0
+      self.bytes_out += n
+      return bytes(pcm)
+
+    voiced = db >= self.start_db and zcr <= self.zcr_max
+    self._attack = self._attack + n if voiced else 0
+    if not voiced or self._attack < self.attack_bytes:
+      self._keep_preroll(pcm)
+      return b""
+
+    # Onset: release the pre-roll ahead of the current chunk.
+    self.speaking = True
+    self.onsets += 1
+    self._quiet = 0
+    out = bytes(self._preroll) + bytes(pcm)
+    self._preroll.clear()
+    self.bytes_out += len(out)
+    return out
+
+  def _keep_preroll(self, pcm) -> None:
+    buf = self._preroll
+    buf.extend(pcm)
+    extra = len(buf) - self.preroll_bytes
+    if extra > 0:
+      del buf[: extra + (extra & 1)]
+
+  def reset(self) -> None:
+    self.speaking = False
+    self._attack = 0
+    self._quiet = 0
+    self._preroll.clear()
+
+  def stats(self) -> dict:
+    # Pre-roll audio is counted once when suppressed and again when released.
+    suppressed = max(0, self.bytes_in - self.bytes_out)
+    return {
+      "speaking": self.speaking,
+      "onsets": self.onsets,
+      "inMs": int(self.bytes_in / self.bytes_per_ms),
+      "forwardedMs": int(self.bytes_out / self.bytes_per_ms),
+      "suppressedPct": round(100.0 * suppressed / self.bytes_in, 1) if self.bytes_in else 0.0,
+    }
@@ -0,0 +1,259 @@
+from __future__ import annotations
+
+from bisect import bisect_left
+
+# Minimal in-process metrics with Prometheus text exposition (served by the gateway
+# at /metrics).
+#
+# Everything is created up front: label values are fixed at registration and
+# histogram buckets are preallocated lists, so recording on the audio path is an
+# attribute update / bisect with no dicts, lists or label lookups per frame.
+
+_LATENCY_BUCKETS_S = (0.025, 0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1.0, 1.5, 2.0, 3.0, 5.0, 10.0)
+_LAG_BUCKETS_S = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+
+def _fmt(v: float) -> str:
+  if v == float("inf"):
+    return "+Inf"
+  if isinstance(v, int) or float(v).is_integer():
+    return str(int(v))
+  return repr(float(v))
+
+
+def _labels(labels: dict[str, str] | None, extra: str = "") -> str:
+  parts = [f'{k}="{v}"' for k, v in (labels or {}).items()]
+  if extra:
+    parts.append(extra)
+  return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Counter:
+  """Monotonic counter. `scale` converts the stored integer unit on export (e.g. ns -> s)."""
+
+  __slots__ = ("labels", "value", "scale")
+
+  def __init__(self, labels: dict[str, str] | None = None, *, scale: float = 1.0):
+    self.labels = labels
+    self.value = 0
+    self.scale = scale
+
+  def inc(self, n: int = 1) -> None:
+    self.value += n
+
+  def samples(self, name: str) -> list[str]:
+    v = self.value * self.scale if self.scale != 1.0 else self.value
+    return [f"{name}{_labels(self.labels)} {_fmt(v)}"]
+
+
+class Gauge:
+  __slots__ = ("labels", "value")
+
+  def __init__(self, labels: dict[str, str] | None = None):
+    self.labels = labels
+    self.value = 0
+
+  def set(self, v) -> None:
+    self.value = v
+
+  def inc(self, n: int = 1) -> None:
+    self.value += n
+
+  def dec(self, n: int = 1) -> None:
+    self.value -= n
+
+  def samples(self, name: str) -> list[str]:
+    return [f"{name}{_labels(self.labels)} {_fmt(self.value)}"]
+
+
+class Histogram:
+  """Fixed-bucket histogram (non-cumulative counts internally, cumulative on export)."""
+
+  __slots__ = ("labels", "bounds", "counts", "sum", "count")
+
+  def __init__(self, labels: dict[str, str] | None = None, *, buckets=_LATENCY_BUCKETS_S):
+    self.labels = labels
+    self.bounds = tuple(sorted(buckets))
+    # One slot per bound plus +Inf.
+    self.counts = [0] * (len(self.bounds) + 1)
+    self.sum = 0.0
+    self.count = 0
+
+  def observe(self, v: float) -> None:
+    self.counts[bisect_left(self.bounds, v)] += 1
+    self.sum += v
+    self.count += 1
+
+  def samples(self, name: str) -> list[str]:
+    out = []
+    acc = 0
+    for bound, n in zip(self.bounds + (float("inf"),), self.counts):
+      acc += n
+      le = 'le="' + _fmt(bound) + '"'
+      out.append(f"{name}_bucket{_labels(self.labels, le)} {acc}")
+    out.append(f"{name}_sum{_labels(self.labels)} {_fmt(self.sum)}")
+    out.append(f"{name}_count{_labels(self.labels)} {self.count}")
+    return out
+
+
+class Registry:
+  def __init__(self):
+    self._families: list[tuple[str, str, str, list]] = []
+    self._collectors: list = []
+
+  def collector(self, fn) -> None:
+    """Call `fn()` before each render (for values sampled on scrape, e.g. process RSS)."""
+    self._collectors.append(fn)
+
+  def register(self, name: str, kind: str, help_text: str, children: list) -> None:
+    self._families.append((name, kind, help_text, children))
+
+  def counter(self, name: str, help_text: str, *, label: str | None = None, values=(), **kw):
+    """One counter, or a dict of pre-created children keyed by `label` value."""
+    if label is None:
+      c = Counter(**kw)
+      self.register(name, "counter", help_text, [c])
+      return c
+    children = {v: Counter({label: v}, **kw) for v in values}
+    self.register(name, "counter", help_text, list(children.values()))
+    return children
+
+  def gauge(self, name: str, help_text: str) -> Gauge:
+    g = Gauge()
+    self.register(name, "gauge", help_text, [g])
+    return g
+
+  def histogram(self, name: str, help_text: str, *, label: str | None = None, values=(), **kw):
+    """One histogram, or a dict of pre-created children keyed by `label` value."""
+    if label is None:
+      h = Histogram(**kw)
+      self.register(name, "histogram", help_text, [h])
+      return h
+    children = {v: Histogram({label: v}, **kw) for v in values}
+    self.register(name, "histogram", help_text, list(children.values()))
+    return children
+
+  def render(self) -> str:
+    for fn in self._collectors:
+      try:
+        fn()
+      except Exception:
+        pass
+    lines = []
+    for name, kind, help_text, children in self._families:
+      lines.append(f"# HELP {name} {help_text}")
+      lines.append(f"# TYPE {name} {kind}")
+      for child in children:
+        lines.extend(child.samples(name))
+    return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def render() -> str:
+  return REGISTRY.render()
+
+
+# --- media / AOAI metrics ---
+
+ACTIVE_CALLS = REGISTRY.gauge("acs_media_active_calls", "Media WebSocket calls currently connected.")
+CALLS_TOTAL = REGISTRY.counter("acs_media_calls_total", "Media WebSocket calls accepted.")
+ACS_BYTES_IN = REGISTRY.counter("acs_media_in_bytes_total", "PCM bytes received from ACS.")
+ACS_BYTES_OUT = REGISTRY.counter("acs_media_out_bytes_total", "PCM bytes sent to ACS.")
+AOAI_BYTES_OUT = REGISTRY.counter("aoai_append_bytes_total", "PCM bytes appended to AOAI input buffers.")
+RESAMPLER_CPU_SECONDS = REGISTRY.counter(
+  "media_resampler_seconds_total", "Wall time spent inside resamplers (both directions).", scale=1e-9
+)
+AOAI_CONNECT_SECONDS = REGISTRY.histogram(
+  "aoai_connect_seconds", "AOAI Realtime session acquisition time by source.", label="source", values=("pool", "cold")
+)
+
+# Structured logging (structured_log.py): caller-side cost and records not written.
+LOG_CALL_SECONDS = REGISTRY.counter("log_call_seconds_total", "Time spent inside log() calls.", scale=1e-9)
+LOG_RECORDS = REGISTRY.counter("log_records_total", "Log records queued for the writer thread.")
+LOG_DROPPED = REGISTRY.counter(
+  "log_records_dropped_total", "Log records not written.", label="reason", values=("sampled", "rate_limited", "queue_full")
+)
+
+# Event loop and process (loop_monitor.py).
+LOOP_LAG_SECONDS = REGISTRY.histogram(
+  "event_loop_lag_seconds", "Event-loop scheduling delay (oversleep of a periodic probe).", buckets=_LAG_BUCKETS_S
+)
+LOOP_STALLS = REGISTRY.counter("event_loop_stalls_total", "Event-loop stalls longer than GATEWAY_LOOP_STALL_MS.")
+LOOP_STALL_SECONDS = REGISTRY.counter(
+  "event_loop_stall_seconds_total", "Time the event loop was blocked in those stalls.", scale=1e-9
+)
+PROCESS_CPU_SECONDS = REGISTRY.counter("process_cpu_seconds_total", "User + system CPU time of this process.")
+PROCESS_RSS_BYTES = REGISTRY.gauge("process_resident_memory_bytes", "Resident set size of this process.")
+
+# Admission control for new calls (admission.py).
+ADMISSION_REJECTED = REGISTRY.counter(
+  "gateway_admission_rejected_total", "New calls rejected by admission control.", label="reason", values=("max_calls", "loop_lag")
+)
+ADMISSION_DEFERRED = REGISTRY.counter("gateway_admission_deferred_total", "New calls that waited for capacity.")
+ADMISSION_ACCEPTING = REGISTRY.gauge("gateway_admission_accepting", "1 while new calls are admitted, 0 while shedding.")
+
+# Per-call WAV archive (media/archiver.py); sampled from the archiver on scrape.
+ARCHIVE_WRITTEN_BYTES = REGISTRY.counter("media_archive_written_bytes_total", "Bytes written to call archives.")
+ARCHIVE_WRITE_SECONDS = REGISTRY.counter("media_archive_write_seconds_total", "Writer-thread time spent writing archives.")
+ARCHIVE_BACKLOG_BYTES = REGISTRY.gauge("media_archive_backlog_bytes", "Audio buffered for the archive writer.")
+ARCHIVE_DROPPED_BYTES = REGISTRY.counter(
+  "media_archive_dropped_bytes_total", "Audio not archived (backlog limit).", label="reason", values=("call_backlog", "backlog")
+)
+
+# AOAI Entra ID token cache (aoai_token_provider.py); sampled from the provider on scrape.
+AOAI_TOKEN_REQUESTS = REGISTRY.counter(
+  "aoai_token_requests_total", "AOAI token lookups by cache result.", label="result", values=("hit", "miss", "coalesced")
+)
+AOAI_TOKEN_REFRESHES = REGISTRY.counter(
+  "aoai_token_refreshes_total", "Token fetches from the credential.", label="result", values=("ok", "failed")
+)
+AOAI_TOKEN_REFRESH_SECONDS = REGISTRY.counter(
+  "aoai_token_refresh_seconds_total", "Time spent in successful token fetches.", scale=1e-3
+)
+AOAI_TOKEN_REFRESH_LAST_SECONDS = REGISTRY.gauge("aoai_token_refresh_last_seconds", "Duration of the last token fetch.")
+AOAI_TOKEN_EXPIRES_IN_SECONDS = REGISTRY.gauge("aoai_token_expires_in_seconds", "Validity left on the cached token.")
+
+# Per-turn timeline, measured from server VAD speech_stopped.
+TURN_STAGES = (
+  "committed",
+  "transcription_completed",
+  "response_create_sent",
+  "response_created",
+  "first_audio_delta",
+  "first_acs_send",
+)
+TURN_STAGE_SECONDS = REGISTRY.histogram(
+  "aoai_turn_stage_seconds", "Time from speech_stopped to each turn stage.", label="stage", values=TURN_STAGES
+)
+_STAGE_HISTOGRAMS = tuple(TURN_STAGE_SECONDS[s] for s in TURN_STAGES)
+STAGE_COMMITTED, STAGE_TRANSCRIPTION, STAGE_CREATE_SENT, STAGE_CREATED, STAGE_FIRST_DELTA, STAGE_FIRST_SEND = range(
+  len(TURN_STAGES)
+)
+
+
+class TurnTimer:
+  """Per-call turn timestamps (ms); each stage is recorded once per turn."""
+
+  __slots__ = ("start_ms", "marks")
+
+  def __init__(self):
+    self.start_ms = 0
+    self.marks = [0] * len(TURN_STAGES)
+
+  def start(self, now_ms: int) -> None:
+    self.start_ms = now_ms
+    marks = self.marks
+    for i in range(len(marks)):
+      marks[i] = 0
+
+  def mark(self, stage: int, now_ms: int) -> None:
+    if not self.start_ms or self.marks[stage]:
+      return
+    self.marks[stage] = now_ms
+    _STAGE_HISTOGRAMS[stage].observe((now_ms - self.start_ms) / 1000.0)
+
+  def summary(self) -> dict:
+    return {name: (m - self.start_ms if m else None) for name, m in zip(TURN_STAGES, self.marks)}
@@ -1,29 +1,13 @@
 import asyncio
-import base64
-import json
 import os
 import sys
 import traceback
 import time
 from dataclasses import dataclass, field
+from urllib.parse import parse_qs, urlsplit
 
 import websockets
 
-try:
-  import numpy as np  # type: ignore
-except Exception:  # pragma: no cover
-  np = None  # type: ignore
-
-try:
-  import soxr  # type: ignore
-except Exception:  # pragma: no cover
-  soxr = None  # type: ignore
-
-try:
-  import audioop  # stdlib (deprecated in newer Python, still present in 3.12)
-except Exception:  # pragma: no cover
-  audioop = None  # type: ignore
-
 try:
 # Ensure `server/` is importable when running as `python scripts/xxx.py`.
 # (sys.path[0] becomes `server/scripts`, so sibling modules like `aoai_realtime.py`
@@ -32,12 +16,33 @@ try:
   if SERVER_ROOT not in sys.path:
     sys.path.insert(0, SERVER_ROOT)
 
-  from aoai_realtime import AOAIRealtime
+  from aoai_realtime import AOAIRealtime, TURN_DETECTION
+  import aoai_session_pool
   _AOAI_IMPORT_ERROR = None
 except Exception as e:
   AOAIRealtime = None  # type: ignore
+  TURN_DETECTION = {"prefix_padding_ms": 300, "silence_duration_ms": 1000}
+  aoai_session_pool = None  # type: ignore
   _AOAI_IMPORT_ERROR = {"error": repr(e), "trace": traceback.format_exc()}
 
+import call_registry
+import metrics
+from structured_log import bind_call, log
+from media import channels as media_channels
+from media import archiver as media_archiver
+from media import codec
+from media import recorder as media_recorder
+from media.archiver import CallArchive, WavArchiver
+from media.barge_in import BargeInDetector, EchoReference
+from media.channels import ChannelRouter, InboundStream, StreamMixer
+from media.coalescer import IngressCoalescer
+from media.dsp_executor import DspExecutor, DspLane
+from media.playout import PacedSender
+from media.recorder import CallRecorder
+from media.resampler import AUDIOOP_AVAILABLE, SOXR_AVAILABLE, Resampler
+from media.send_queue import BoundedSendQueue, normalize_policy
+from media.vad import VadGate
+
 HOST = os.getenv("MEDIA_WS_HOST", "0.0.0.0")
 PORT = int(os.getenv("MEDIA_WS_PORT", "8765"))
 
@@ -67,6 +72,30 @@ AOAI_AUTO_CREATE_RESPONSE = os.getenv("MEDIA_WS_AOAI_AUTO_CREATE_RESPONSE", "1")
   "on",
 )
 AOAI_RESPONSE_FALLBACK_DELAY_MS = int(os.getenv("MEDIA_WS_AOAI_RESPONSE_FALLBACK_DELAY_MS", "600"))
+# Audio that arrives before the AOAI session is ready is buffered (not dropped), up to this much.
+AOAI_PREREADY_BUFFER_MS = int(os.getenv("MEDIA_WS_AOAI_PREREADY_BUFFER_MS", "1000"))
+# Inbound 20 ms frames are batched into windows of this size before input_audio_buffer.append
+# (media/coalescer.py); flushed early on VAD edges / barge-in. 0 = one append per ACS frame.
+AOAI_APPEND_WINDOW_MS = int(os.getenv("MEDIA_WS_AOAI_APPEND_WINDOW_MS", "60"))
+
+# Local energy VAD gate (media/vad.py), one per inbound stream (channel / participant)
+# ahead of the mixer: silence is not streamed to AOAI; server VAD still decides turns.
+# Off by default. PREROLL must cover the server prefix_padding_ms and HANGOVER must
+# exceed its silence_duration_ms (aoai_realtime.TURN_DETECTION), or turns would never be
+# committed: both default from those values and are clamped to them.
+VAD_GATE = _env_bool("MEDIA_WS_VAD_GATE", False)
+VAD_START_DB = float(os.getenv("MEDIA_WS_VAD_START_DB", "-45"))
+VAD_STOP_DB = float(os.getenv("MEDIA_WS_VAD_STOP_DB", "-50"))
+VAD_ZCR_MAX = float(os.getenv("MEDIA_WS_VAD_ZCR_MAX", "0.35"))
+VAD_ATTACK_MS = int(os.getenv("MEDIA_WS_VAD_ATTACK_MS", "60"))
+_SERVER_PREFIX_PADDING_MS = int(TURN_DETECTION.get("prefix_padding_ms") or 0)
+_SERVER_SILENCE_MS = int(TURN_DETECTION.get("silence_duration_ms") or 0)
+VAD_HANGOVER_MS = max(
+  _SERVER_SILENCE_MS + 100, int(os.getenv("MEDIA_WS_VAD_HANGOVER_MS", str(_SERVER_SILENCE_MS + 300)))
+)
+VAD_PREROLL_MS = max(
+  _SERVER_PREFIX_PADDING_MS, int(os.getenv("MEDIA_WS_VAD_PREROLL_MS", str(_SERVER_PREFIX_PADDING_MS)))
+)
 
 # If bidirectional media streaming is enabled in ACS, forward AOAI audio back to the call.
 ACS_SEND_AUDIO = os.getenv("MEDIA_WS_SEND_AUDIO_TO_ACS", "1").strip().lower() in (
@@ -76,7 +105,15 @@ ACS_SEND_AUDIO = os.getenv("MEDIA_WS_SEND_AUDIO_TO_ACS", "1").strip().lower() in
   "y",
   "on",
 )
-ACS_SEND_MIN_CHUNK_BYTES = int(os.getenv("MEDIA_WS_ACS_SEND_MIN_CHUNK_BYTES", "3200"))  # ~100ms @ 16kHz mono PCM16
+# Outbound audio is sliced into fixed frames (20/40/100 ms) and paced against a
+# monotonic clock, keeping only ~LEAD ms buffered on the ACS side (media/playout.py).
+# With pacing off, frames are sent as soon as they are complete.
+ACS_FRAME_MS = int(os.getenv("MEDIA_WS_ACS_FRAME_MS", "20"))
+ACS_PLAYOUT_LEAD_MS = int(os.getenv("MEDIA_WS_ACS_PLAYOUT_LEAD_MS", "80"))
+ACS_PACING = _env_bool("MEDIA_WS_ACS_PACING", True)
+# On barge-in, also send the bidirectional-streaming StopAudio control message so ACS drops
+# the audio it has already buffered (otherwise up to LEAD ms keeps playing).
+ACS_STOP_AUDIO_ON_BARGE_IN = _env_bool("MEDIA_WS_ACS_STOP_AUDIO_ON_BARGE_IN", True)
 ACS_SEND_FLUSH_ON_DONE = os.getenv("MEDIA_WS_ACS_SEND_FLUSH_ON_DONE", "1").strip().lower() in (
   "1",
   "true",
@@ -85,6 +122,16 @@ ACS_SEND_FLUSH_ON_DONE = os.getenv("MEDIA_WS_ACS_SEND_FLUSH_ON_DONE", "1").strip
   "on",
 )
 
+# Each direction has its own writer task fed by a bounded queue (media/send_queue.py),
+# so a slow peer never stalls event handling for the other side.
+# Overload policy when a queue exceeds its bound: coalesce | drop_oldest | disconnect
+SEND_OVERLOAD_POLICY = normalize_policy(os.getenv("MEDIA_WS_SEND_OVERLOAD_POLICY", "coalesce"))
+# ACS -> AOAI (input_audio_buffer.append) queue bound.
+AOAI_SEND_QUEUE_MAX_MS = int(os.getenv("MEDIA_WS_AOAI_SEND_QUEUE_MAX_MS", "2000"))
+AOAI_SEND_QUEUE_MAX_ITEMS = int(os.getenv("MEDIA_WS_AOAI_SEND_QUEUE_MAX_ITEMS", "25"))
+# AOAI -> ACS playout queue bound (audio generated ahead of real time waits here).
+ACS_SEND_QUEUE_MAX_MS = int(os.getenv("MEDIA_WS_ACS_SEND_QUEUE_MAX_MS", "120000"))
+
 # Debug logging
 LOG_AUDIO_STATS = _env_bool("MEDIA_WS_LOG_AUDIO_STATS", False)
 LOG_AUDIO_STATS_INTERVAL_MS = int(os.getenv("MEDIA_WS_LOG_AUDIO_STATS_INTERVAL_MS", "2000"))
@@ -105,6 +152,20 @@ BARGE_IN_DROP_MS = int(os.getenv("MEDIA_WS_BARGE_IN_DROP_MS", "1500"))
 # Default ON to make interruption feel immediate.
 BARGE_IN_ON_SPEECH_STARTED = _env_bool("MEDIA_WS_BARGE_IN_ON_SPEECH_STARTED", True)
 
+# Barge-in (local): detect the caller talking over the assistant on inbound PCM, without
+# waiting for the AOAI round trip (media/barge_in.py). A local trigger only pauses playout
+# (reversible); the response is cancelled (StopAudio + response.cancel) once AOAI confirms
+# with speech_started. The detector always runs to measure reactionMs; this switch
+# decides whether it pauses.
+BARGE_IN_LOCAL = _env_bool("MEDIA_WS_BARGE_IN_LOCAL", True)
+BARGE_IN_LOCAL_THRESHOLD_DB = float(os.getenv("MEDIA_WS_BARGE_IN_LOCAL_THRESHOLD_DB", "-35"))
+BARGE_IN_LOCAL_MIN_SPEECH_MS = int(os.getenv("MEDIA_WS_BARGE_IN_LOCAL_MIN_SPEECH_MS", "150"))
+BARGE_IN_LOCAL_ECHO_MARGIN_DB = float(os.getenv("MEDIA_WS_BARGE_IN_LOCAL_ECHO_MARGIN_DB", "12"))
+BARGE_IN_LOCAL_COOLDOWN_MS = int(os.getenv("MEDIA_WS_BARGE_IN_LOCAL_COOLDOWN_MS", "1000"))
+# A local barge-in not confirmed by AOAI speech_started within this window is dropped as
+# unconfirmed (e.g. a cough or line noise) and playout resumes where it paused.
+BARGE_IN_CONFIRM_MS = int(os.getenv("MEDIA_WS_BARGE_IN_CONFIRM_MS", "1500"))
+
 # Resampling method used when sample rates differ.
 # - auto: prefer soxr (high quality) when installed, else audioop
 # - soxr: require soxr, else drop audio (empty)
@@ -112,31 +173,100 @@ BARGE_IN_ON_SPEECH_STARTED = _env_bool("MEDIA_WS_BARGE_IN_ON_SPEECH_STARTED", Tr
 RESAMPLER = os.getenv("MEDIA_WS_RESAMPLER", "soxr").strip().lower()
 SOXR_QUALITY = os.getenv("MEDIA_WS_SOXR_QUALITY", "HQ").strip()  # e.g. LQ/MQ/HQ/VHQ
 
+# Run resampling / downmix / VAD of every call on a small thread pool instead of the
+# event loop (media/dsp_executor.py). Off by default; pays off with several cores and
+# many concurrent calls (compare with `python -m bench.dsp_offload`).
+DSP_EXECUTOR = _env_bool("MEDIA_WS_DSP_EXECUTOR", False)
+DSP_THREADS = int(os.getenv("MEDIA_WS_DSP_THREADS", str(min(4, os.cpu_count() or 1))))
+# Batches queued/running before new jobs fall back to inline (0 = 2 per thread).
+DSP_MAX_INFLIGHT = int(os.getenv("MEDIA_WS_DSP_MAX_INFLIGHT", "0"))
+DSP_MAX_BATCH = int(os.getenv("MEDIA_WS_DSP_MAX_BATCH", "64"))
+
+# Binary per-call recordings (caller/assistant PCM + ACS/AOAI event timeline) for
+# offline replay with scripts/replay_call.py (media/recorder.py). Empty = off.
+# Recordings contain caller audio; enable only where that is permitted.
+RECORD_DIR = os.getenv("MEDIA_WS_RECORD_DIR", "").strip()
+# In-memory backlog per call before records are dropped (disk slower than the call).
+RECORD_MAX_BUFFER_KB = int(os.getenv("MEDIA_WS_RECORD_MAX_BUFFER_KB", "4096"))
+RECORD_FLUSH_MS = int(os.getenv("MEDIA_WS_RECORD_FLUSH_MS", "500"))
+
+# Per-call WAV archive of the caller / assistant tracks (media/archiver.py). Empty = off.
+# wav: <call>-caller.wav + <call>-assistant.wav | stereo: <call>.wav (L caller, R assistant)
+ARCHIVE_DIR = os.getenv("MEDIA_WS_ARCHIVE_DIR", "").strip()
+ARCHIVE_FORMAT = media_archiver.normalize_format(os.getenv("MEDIA_WS_ARCHIVE_FORMAT", "wav"))
+ARCHIVE_FLUSH_MS = int(os.getenv("MEDIA_WS_ARCHIVE_FLUSH_MS", "1000"))
+# Audio waiting for the writer thread, per call (ms) and for all calls (MiB); beyond
+# either, new audio is dropped instead of blocking the call.
+ARCHIVE_CALL_BACKLOG_MS = int(os.getenv("MEDIA_WS_ARCHIVE_CALL_BACKLOG_MS", "30000"))
+ARCHIVE_MAX_BACKLOG_MB = int(os.getenv("MEDIA_WS_ARCHIVE_MAX_BACKLOG_MB", "64"))
+
+# Multi-channel / unmixed inbound audio (see media/channels.py):
+# mix (default) | pick | per_participant
+CHANNEL_MODE = os.getenv("MEDIA_WS_CHANNEL_MODE", media_channels.MODE_MIX).strip().lower()
+PICK_CHANNEL = int(os.getenv("MEDIA_WS_PICK_CHANNEL", "0"))
+PICK_PARTICIPANT = os.getenv("MEDIA_WS_PICK_PARTICIPANT", "").strip() or None
+
 
 def _log_audio_config():
-  print(
+  log(
     "Audio config",
     {
       "resampler": RESAMPLER,
-      "soxrAvailable": bool(soxr is not None and np is not None),
+      "soxrAvailable": SOXR_AVAILABLE,
       "soxrQuality": SOXR_QUALITY,
-      "audioopAvailable": bool(audioop is not None),
+      "audioopAvailable": AUDIOOP_AVAILABLE,
+      "channelMode": CHANNEL_MODE,
+      "dspExecutor": DSP_EXECUTOR,
+      "dspThreads": DSP_THREADS if DSP_EXECUTOR else None,
+      "recordDir": RECORD_DIR or None,
+      "archiveDir": ARCHIVE_DIR or None,
+      "archiveFormat": ARCHIVE_FORMAT if ARCHIVE_DIR else None,
+      "jsonBackend": codec.JSON_BACKEND,
       "aoaiTargetRate": AOAI_TARGET_RATE,
-      "acsSendMinChunkBytes": ACS_SEND_MIN_CHUNK_BYTES,
+      "acsFrameMs": ACS_FRAME_MS,
+      "acsPlayoutLeadMs": ACS_PLAYOUT_LEAD_MS,
+      "acsPacing": ACS_PACING,
       "acsSendFlushOnDone": ACS_SEND_FLUSH_ON_DONE,
+      "acsStopAudioOnBargeIn": ACS_STOP_AUDIO_ON_BARGE_IN,
+      "sendOverloadPolicy": SEND_OVERLOAD_POLICY,
+      "aoaiSendQueueMaxMs": AOAI_SEND_QUEUE_MAX_MS,
+      "aoaiSendQueueMaxItems": AOAI_SEND_QUEUE_MAX_ITEMS,
+      "acsSendQueueMaxMs": ACS_SEND_QUEUE_MAX_MS,
       "logAudioStats": LOG_AUDIO_STATS,
       "logAudioStatsIntervalMs": LOG_AUDIO_STATS_INTERVAL_MS,
       "logAoaiOutputTranscript": LOG_AOAI_OUTPUT_TRANSCRIPT,
       "bargeInPhrases": BARGE_IN_PHRASES,
       "bargeInDropMs": BARGE_IN_DROP_MS,
       "bargeInOnSpeechStarted": BARGE_IN_ON_SPEECH_STARTED,
+      "bargeInLocal": BARGE_IN_LOCAL,
+      "bargeInLocalThresholdDb": BARGE_IN_LOCAL_THRESHOLD_DB,
+      "bargeInLocalMinSpeechMs": BARGE_IN_LOCAL_MIN_SPEECH_MS,
+      "aoaiPrereadyBufferMs": AOAI_PREREADY_BUFFER_MS,
+      "aoaiAppendWindowMs": AOAI_APPEND_WINDOW_MS,
+      "vadGate": VAD_GATE,
+      "vadStartDb": VAD_START_DB,
+      "vadStopDb": VAD_STOP_DB,
+      "vadHangoverMs": VAD_HANGOVER_MS,
+      "vadPrerollMs": VAD_PREROLL_MS,
     },
   )
 
 
+def _start_aoai_session_pool():
+  """Start the process-wide AOAI session pool when enabled (needs a running loop)."""
+  if not ENABLE_AOAI or aoai_session_pool is None:
+    return None
+  return aoai_session_pool.start_pool()
+
+
+async def _close_aoai_session_pool():
+  if aoai_session_pool is not None:
+    await aoai_session_pool.close_pool()
+
+
 def _safe_json(text: str):
   try:
-    return json.loads(text)
+    return codec.loads(text)
   except Exception:
     return None
 
@@ -145,6 +275,31 @@ def _now_ms() -> int:
   return int(time.time() * 1000)
 
 
+def _start_recorder(state: "StreamState", path: str | None) -> CallRecorder | None:
+  if not RECORD_DIR:
+    return None
+  rec = CallRecorder(
+    media_recorder.recording_path(RECORD_DIR, state.call_connection_id),
+    {
+      "callConnectionId": state.call_connection_id,
+      "correlationId": state.corr_id,
+      "path": path,
+      "startedMs": state.connected_ms,
+      "aoaiTargetRate": AOAI_TARGET_RATE,
+      "acsFrameMs": ACS_FRAME_MS,
+    },
+    max_buffer_bytes=RECORD_MAX_BUFFER_KB * 1024,
+    flush_ms=RECORD_FLUSH_MS,
+  )
+  rec.start()
+  return rec
+
+
+def _record_event(state: "StreamState", kind: int, message):
+  if state.recorder is not None:
+    state.recorder.event(kind, message)
+
+
 @dataclass
 class StreamState:
   call_connection_id: str | None
@@ -154,16 +309,114 @@ class StreamState:
   encoding: str | None = None
   bytes_in: int = 0
   last_stat_ms: int = 0
+  connected_ms: int = 0
+  aoai_profile: str | None = None
   aoai: object | None = None
   aoai_ready: asyncio.Event = field(default_factory=asyncio.Event)
-  aoai_rate_state: object | None = None
+  aoai_ready_ms: int = 0
+  aoai_first_audio_ms: int = 0
+  aoai_pending_in: bytearray = field(default_factory=bytearray)
+  channel_router: ChannelRouter = field(
+    default_factory=lambda: ChannelRouter(CHANNEL_MODE, pick_index=PICK_CHANNEL, pick_participant=PICK_PARTICIPANT)
+  )
+  inbound_streams: dict[str, InboundStream] = field(default_factory=dict)
+  inbound_mixer: StreamMixer = field(default_factory=StreamMixer)
+  # Ungated mix of the same streams for local barge-in detection (VAD gate on).
+  inbound_raw_mixer: StreamMixer = field(default_factory=StreamMixer)
   aoai_inflight: bool = False
   aoai_pending_commit_task: asyncio.Task | None = None
   aoai_pump_task: asyncio.Task | None = None
-  aoai_to_acs_rate_state: object | None = None
-  aoai_out_buf: bytearray = field(default_factory=bytearray)
+  aoai_out_resampler: Resampler | None = None
+  dsp_in: DspLane | None = None
+  dsp_out: DspLane | None = None
+  acs_sender: PacedSender | None = None
+  recorder: CallRecorder | None = None
+  archive: CallArchive | None = None
+  archive_participant: str | None = None
+  aoai_send_queue: BoundedSendQueue | None = None
+  aoai_coalescer: IngressCoalescer | None = None
+  barge_in_detector: BargeInDetector | None = None
+  # Level of recent playout (loop side); passed to the detector with each inbound job.
+  echo_ref: EchoReference = field(default_factory=EchoReference)
+  barge_in_task: asyncio.Task | None = None
+  local_barge_in_ms: int = 0
+  barge_in_confirmed: int = 0
+  barge_in_unconfirmed: int = 0
+  barge_in_reaction_ms: dict[str, list[int]] = field(default_factory=dict)
+  turn: metrics.TurnTimer = field(default_factory=metrics.TurnTimer)
+  overload_reason: str | None = None
   drop_aoai_audio_until_ms: int = 0
   aoai_out_transcript_buf: list[str] = field(default_factory=list)
+  # Entry in the process-wide call registry (/api/calls, callback routing).
+  call: call_registry.CallRecord | None = None
+
+
+def _resampler_info(rs: Resampler | None) -> dict | None:
+  if rs is None:
+    return None
+  return {"kind": rs.kind, "srcRate": rs.src_rate, "dstRate": rs.dst_rate}
+
+
+def _describe_call(state: StreamState, detail: bool) -> dict:
+  """Live counters for /api/calls (call_registry describe hook)."""
+  sender = state.acs_sender
+  q = state.aoai_send_queue
+  q_stats = q.stats() if q is not None else None
+  # A DSP pool thread may add streams meanwhile: iterate over a snapshot.
+  inbound = list(state.inbound_streams.items())
+  out = {
+    "bytesIn": state.bytes_in,
+    "bytesOut": sender.bytes_sent if sender is not None else 0,
+    "aoaiBytesOut": q.sent_bytes if q is not None else 0,
+    "format": {"sampleRate": state.sample_rate, "channels": state.channels, "encoding": state.encoding},
+    "aoai": {
+      "profile": state.aoai_profile,
+      "connected": state.aoai is not None,
+      "ready": state.aoai_ready.is_set(),
+      "inflightResponse": state.aoai_inflight,
+      "assistantSpeaking": _assistant_speaking(state),
+    },
+    "resamplers": {
+      "in": {key: _resampler_info(st.resampler) for key, st in inbound},
+      "out": _resampler_info(state.aoai_out_resampler),
+    },
+    "queues": {
+      "acsOutMs": sender.depth_ms if sender is not None else 0,
+      "aoaiAppendItems": q_stats["queued"] if q_stats is not None else 0,
+      "aoaiAppendBytes": q_stats["queuedBytes"] if q_stats is not None else 0,
+      "aoaiPreReadyBytes": len(state.aoai_pending_in),
+    },
+    "overloadReason": state.overload_reason,
+  }
+  if detail:
+    out["acsOut"] = sender.stats() if sender is not None else None
+    out["aoaiOut"] = q_stats
+    out["aoaiAppend"] = state.aoai_coalescer.stats() if state.aoai_coalescer is not None else None
+    now = _now_ms()
+    out["inbound"] = {key: st.stats(now) for key, st in inbound}
+    out["bargeIn"] = {
+      "localTriggers": state.barge_in_detector.triggers if state.barge_in_detector is not None else 0,
+      "confirmed": state.barge_in_confirmed,
+      "unconfirmed": state.barge_in_unconfirmed,
+      "pendingConfirm": bool(state.local_barge_in_ms),
+    }
+    out["recording"] = state.recorder.stats() if state.recorder is not None else None
+    out["archive"] = state.archive.stats() if state.archive is not None else None
+  return out
+
+
+def _control_call(state: StreamState, action: str, data: dict) -> None:
+  """Control action routed to this session (call_registry.route, e.g. from /api/callbacks)."""
+  log("Call control", {"callConnectionId": state.call_connection_id, "action": action, "reason": data.get("reason")})
+  if action == call_registry.ACTION_HANGUP:
+    ws = state._acs_ws  # type: ignore[attr-defined]
+    close = getattr(ws, "close", None)
+    if close is not None:
+      reason = str(data.get("reason") or "call control")[:120]
+      state._close_task = asyncio.create_task(close(code=1000, reason=reason))  # type: ignore[attr-defined]
+  elif action == call_registry.ACTION_STOP_AUDIO:
+    if _assistant_speaking(state):
+      state.barge_in_task = asyncio.create_task(_barge_in_cancel(state, reason="control"))
 
 
 def _normalize_jp(text: str) -> str:
@@ -208,114 +461,389 @@ def _extract_text_delta(ev: dict) -> str | None:
   return None
 
 
-def _resample_pcm16_mono(
-  pcm: bytes,
-  *,
-  src_rate: int,
-  dst_rate: int,
-  state: object | None,
-  final: bool = False,
-):
-  if not pcm:
-    # Allow flushing stateful resamplers at end-of-stream.
-    if not final:
-      return b"", state
-    if soxr is not None and np is not None and isinstance(state, dict) and state.get("kind") == "soxr":
-      try:
-        stream = state.get("stream")
-        if stream is None:
-          return b"", None
-        y = stream.resample_chunk(np.zeros((0,), dtype=np.float32), last=True)
-        if y is None or len(y) == 0:
-          return b"", None
-        y16 = np.clip(y * 32768.0, -32768.0, 32767.0).astype(np.int16)
-        return y16.tobytes(), None
-      except Exception:
-        return b"", None
-    # audioop doesn't have an explicit flush mechanism we rely on here.
-    return b"", None
-  if src_rate == dst_rate:
-    return pcm, state
-
-  want_soxr = RESAMPLER in ("auto", "soxr")
-  want_audioop = RESAMPLER in ("auto", "audioop")
-
-  # Prefer soxr when available (better quality than audioop.ratecv for downsampling).
-  # Use a stateful resampler to avoid chunk-boundary artifacts.
-  if want_soxr and soxr is not None and np is not None:
-    # Ensure we have whole samples (2 bytes/sample).
-    pcm = pcm[: len(pcm) - (len(pcm) % 2)]
-    if not pcm:
-      return b"", None
+def _make_resampler(src_rate: int, dst_rate: int) -> Resampler:
+  return Resampler(src_rate, dst_rate, method=RESAMPLER, quality=SOXR_QUALITY)
+
+
+def _outbound_resampler(state: StreamState) -> Resampler | None:
+  """AOAI (24kHz) -> ACS rate resampler, (re)created when the ACS rate is known/changes."""
+  if state.sample_rate is None:
+    return None
+  rs = state.aoai_out_resampler
+  if rs is None or rs.dst_rate != int(state.sample_rate):
+    rs = state.aoai_out_resampler = _make_resampler(AOAI_TARGET_RATE, int(state.sample_rate))
+  return rs
+
+
+_DSP: DspExecutor | None = None
+
+
+def _dsp_executor() -> DspExecutor | None:
+  """Process-wide DSP thread pool (created on first use), or None when disabled."""
+  global _DSP
+  if not DSP_EXECUTOR:
+    return None
+  if _DSP is None:
+    _DSP = DspExecutor(threads=DSP_THREADS, max_inflight=DSP_MAX_INFLIGHT or None, max_batch=DSP_MAX_BATCH)
+  return _DSP
+
+
+_ARCHIVER: WavArchiver | None = None
+
+
+def _collect_archive_metrics():
+  a = _ARCHIVER
+  metrics.ARCHIVE_WRITTEN_BYTES.value = a.written_bytes
+  metrics.ARCHIVE_WRITE_SECONDS.value = round(a.write_ns / 1e9, 6)
+  metrics.ARCHIVE_BACKLOG_BYTES.set(a.backlog_bytes)
+  metrics.ARCHIVE_DROPPED_BYTES["call_backlog"].value = a.dropped_call_backlog_bytes
+  metrics.ARCHIVE_DROPPED_BYTES["backlog"].value = a.dropped_backlog_bytes
+
+
+def _call_archive(state: StreamState, participant_id: str | None) -> CallArchive | None:
+  """Per-call archive (opened once the ACS format is known), or None when off / unsupported."""
+  global _ARCHIVER
+  if not ARCHIVE_DIR or state.sample_rate is None or state.channels not in (None, 1):
+    return None
+  if state.archive is None:
+    if _ARCHIVER is None:
+      _ARCHIVER = WavArchiver(
+        ARCHIVE_DIR,
+        fmt=ARCHIVE_FORMAT,
+        flush_ms=ARCHIVE_FLUSH_MS,
+        call_backlog_ms=ARCHIVE_CALL_BACKLOG_MS,
+        max_backlog_bytes=ARCHIVE_MAX_BACKLOG_MB << 20,
+        on_closed=lambda arc: log("Call archive", {"callConnectionId": arc.call_id, **arc.stats()}),
+      )
+      metrics.REGISTRY.collector(_collect_archive_metrics)
+    state.archive = _ARCHIVER.open_call(state.call_connection_id, state.sample_rate)
+    state.archive_participant = participant_id
+  # Unmixed audio: the caller track follows the first participant only; the file
+  # keeps the first format.
+  if participant_id != state.archive_participant or state.archive.sample_rate != state.sample_rate:
+    return None
+  return state.archive
+
+
+def _resample_timed(rs: Resampler, pcm):
+  """(output, CPU ns). May run on a DSP pool thread: the caller counts the time on the loop."""
+  t0 = time.perf_counter_ns()
+  out = rs.process(pcm)
+  return out, time.perf_counter_ns() - t0
+
+
+def _inbound_stream(state: StreamState, key: str) -> InboundStream:
+  gate = None
+  if VAD_GATE:
+    gate = VadGate(
+      AOAI_TARGET_RATE,
+      start_db=VAD_START_DB,
+      stop_db=VAD_STOP_DB,
+      zcr_max=VAD_ZCR_MAX,
+      attack_ms=VAD_ATTACK_MS,
+      hangover_ms=VAD_HANGOVER_MS,
+      preroll_ms=VAD_PREROLL_MS,
+    )
+  return InboundStream(key, _make_resampler(int(state.sample_rate), AOAI_TARGET_RATE), gate=gate)
+
+
+def _process_inbound_audio(state: StreamState, pcm: bytes, participant_id: str | None, now_ms: int):
+  """ACS frame -> mono AOAI-rate PCM: route channels/participants, resample, gate, mix.
+
+  Each stream has its own VAD gate, so one participant's background noise does not
+  keep the mix open for everyone. Returns (raw, pcm_out, vad_edge, resample_ns): the
+  ungated mix (local barge-in detection), the gated mix for AOAI, whether any gate
+  opened or closed, and the resampler CPU time.
+  """
+  parts = state.channel_router.route(pcm, state.channels or 1, participant_id)
+  if not parts:
+    return b"", b"", False, 0
+
+  streams = state.inbound_streams
+  single = len(parts) == 1 and len(streams) <= 1
+  vad_edge = False
+  resample_ns = 0
+  for key, mono in parts:
+    st = streams.get(key)
+    if st is None:
+      st = streams[key] = _inbound_stream(state, key)
+      single = single and len(streams) == 1
+    st.bytes_in += len(mono)
+    st.last_seen_ms = now_ms
+    out = b""
+    if mono:
+      out, ns = _resample_timed(st.resampler, mono)
+      resample_ns += ns
+    gated = out
+    gate = st.gate
+    if gate is not None and out:
+      was_speaking = gate.speaking
+      gated = gate.process(out)
+      vad_edge = vad_edge or gate.speaking != was_speaking
+    if single:
+      return out, gated, vad_edge, resample_ns
+    if gated or not out:
+      state.inbound_mixer.push(key, gated, now_ms)
+    else:
+      # Gated silence: nothing to mix, don't hold the other streams back.
+      state.inbound_mixer.idle(key)
+    if gate is not None:
+      state.inbound_raw_mixer.push(key, out, now_ms)
+  pcm_out = state.inbound_mixer.pop(now_ms)
+  raw = state.inbound_raw_mixer.pop(now_ms) if VAD_GATE else pcm_out
+  return raw, pcm_out, vad_edge, resample_ns
+
+
+def _vad_stats(state: StreamState) -> dict | None:
+  """Per-stream VAD gate stats (None when gating is off)."""
+  if not VAD_GATE:
+    return None
+  return {key: st.gate.stats() for key, st in list(state.inbound_streams.items()) if st.gate is not None}
+
+
+def _on_send_overload(state: StreamState, reason: str):
+  """Disconnect policy: tear the call down instead of buffering without bound."""
+  if state.overload_reason is not None:
+    return
+  state.overload_reason = reason
+  log(
+    "Send queue overload; disconnecting", {"callConnectionId": state.call_connection_id, "reason": reason}, level="warning"
+  )
+  ws = state._acs_ws  # type: ignore[attr-defined]
+  close = getattr(ws, "close", None)
+  if close is not None:
+    state._close_task = asyncio.create_task(close(code=1011, reason="send queue overload"))  # type: ignore[attr-defined]
+
+
+def _aoai_send_queue(state: StreamState, rt) -> BoundedSendQueue:
+  """Per-call ACS -> AOAI writer queue (input_audio_buffer.append)."""
+  q = state.aoai_send_queue
+  if q is None:
+    async def _send(pcm):
+      await rt.append_audio(pcm)
+      metrics.AOAI_BYTES_OUT.inc(len(pcm))
+
+    q = state.aoai_send_queue = BoundedSendQueue(
+      _send,
+      name="aoai_append",
+      max_items=AOAI_SEND_QUEUE_MAX_ITEMS,
+      max_bytes=AOAI_TARGET_RATE * 2 * max(20, AOAI_SEND_QUEUE_MAX_MS) // 1000,
+      policy=SEND_OVERLOAD_POLICY,
+      on_overload=lambda reason: _on_send_overload(state, reason),
+    )
+  return q
+
+
+def _barge_in_detector(state: StreamState) -> BargeInDetector:
+  det = state.barge_in_detector
+  if det is None:
+    det = state.barge_in_detector = BargeInDetector(
+      AOAI_TARGET_RATE,
+      threshold_db=BARGE_IN_LOCAL_THRESHOLD_DB,
+      min_speech_ms=BARGE_IN_LOCAL_MIN_SPEECH_MS,
+      echo_margin_db=BARGE_IN_LOCAL_ECHO_MARGIN_DB,
+      cooldown_ms=BARGE_IN_LOCAL_COOLDOWN_MS,
+    )
+  return det
+
+
+def _assistant_speaking(state: StreamState) -> bool:
+  """A response is being generated, or its audio is still queued for playout."""
+  sender = state.acs_sender
+  return state.aoai_inflight or (sender is not None and sender.depth_ms > 0)
+
+
+def _barge_in_reaction(state: StreamState, reason: str, now: int) -> int | None:
+  """Caller speech onset (as seen on our inbound leg) -> playout paused / cancel issued."""
+  det = state.barge_in_detector
+  onset = det.last_onset_ms if det is not None else None
+  reaction_ms = now - onset if onset is not None and now - onset < 10_000 else None
+  if reaction_ms is not None:
+    state.barge_in_reaction_ms.setdefault(reason, []).append(reaction_ms)
+  return reaction_ms
+
+
+def _barge_in_pause(state: StreamState, now: int):
+  """Local barge-in: hold playout until AOAI confirms (speech_started) or the window expires."""
+  state.local_barge_in_ms = now
+  reaction_ms = _barge_in_reaction(state, "local_pause", now)
+  log("Barge-in local pause", {"callConnectionId": state.call_connection_id, "reactionMs": reaction_ms})
+  if state.acs_sender is not None:
+    state.acs_sender.pause()
+  # Get the caller's speech to AOAI now so it can confirm quickly.
+  _flush_ingress(state)
+
+
+async def _barge_in_cancel(state: StreamState, *, reason: str, transcript: str | None = None):
+  now = _now_ms()
+  reaction_ms = _barge_in_reaction(state, reason, now)
+  log(
+    "AOAI barge-in",
+    {
+      "callConnectionId": state.call_connection_id,
+      "reason": reason,
+      "text": transcript,
+      "reactionMs": reaction_ms,
+    },
+  )
+  # Don't hold the user's speech back in a partial append window.
+  _flush_ingress(state)
+  # Drop any already-in-flight audio deltas for a short window.
+  state.drop_aoai_audio_until_ms = now + max(0, int(BARGE_IN_DROP_MS))
+  # Drop any audio not yet sent to ACS, have ACS drop what it already buffered (StopAudio)
+  # and restart the outbound resampler, all before the next await so no stale audio or
+  # resampler tail can slip in between.
+  if state.acs_sender is not None:
+    state.acs_sender.interrupt()
+  if state.archive is not None:
+    state.archive.interrupt()
+  if state.aoai_out_resampler is not None:
+    if state.dsp_out is not None:
+      # A DSP thread may be inside it: start a fresh one; in-flight output is discarded.
+      state.aoai_out_resampler = None
+    else:
+      state.aoai_out_resampler.reset()
+  # Best-effort cancel (only while generating; playout-only audio was dropped above).
+  # If unsupported, AOAI will emit an error event.
+  rt = state.aoai
+  if rt is not None and state.aoai_inflight:
     try:
-      x = np.frombuffer(pcm, dtype=np.int16).astype(np.float32) / 32768.0
-
-      soxr_state: dict | None = state if isinstance(state, dict) and state.get("kind") == "soxr" else None
-      if (
-        soxr_state is None
-        or soxr_state.get("src_rate") != src_rate
-        or soxr_state.get("dst_rate") != dst_rate
-        or soxr_state.get("quality") != SOXR_QUALITY
-        or soxr_state.get("stream") is None
-      ):
-        stream = soxr.ResampleStream(src_rate, dst_rate, 1, dtype="float32", quality=SOXR_QUALITY)
-        soxr_state = {
-          "kind": "soxr",
-          "src_rate": src_rate,
-          "dst_rate": dst_rate,
-          "quality": SOXR_QUALITY,
-          "stream": stream,
-        }
-
-      stream = soxr_state["stream"]
-      y = stream.resample_chunk(x, last=final)
-      y16 = np.clip(y * 32768.0, -32768.0, 32767.0).astype(np.int16)
-      return y16.tobytes(), soxr_state
+      await rt.cancel_response(event_id=f"barge_in_cancel_{now}")
+      _record_event(state, media_recorder.AOAI_OUT_EVENT, {"type": "response.cancel", "reason": reason})
     except Exception:
-      # Fall back to audioop if allowed.
-      if RESAMPLER == "soxr":
-        return b"", None
+      pass
+  state.aoai_inflight = False
 
-  if want_audioop and audioop is not None:
-    # width=2 bytes, channels=1
-    converted, new_state = audioop.ratecv(pcm, 2, 1, src_rate, dst_rate, state)
-    return converted, new_state
 
-  # No resampler available.
-  return b"", state
+def _local_barge_in_armed(state: StreamState, now_ms: int) -> bool:
+  """Expire an unconfirmed local barge-in; True when the detector may fire now."""
+  if state.local_barge_in_ms:
+    if now_ms - state.local_barge_in_ms <= BARGE_IN_CONFIRM_MS:
+      return False
+    state.barge_in_unconfirmed += 1
+    log("Barge-in unconfirmed", {"callConnectionId": state.call_connection_id, "localMs": state.local_barge_in_ms})
+    state.local_barge_in_ms = 0
+    # Nothing was cancelled: play on from where it paused.
+    if state.acs_sender is not None:
+      state.acs_sender.resume()
+  return BARGE_IN_LOCAL and state.aoai is not None and _assistant_speaking(state)
 
 
-def _downmix_pcm16_stereo_to_mono(pcm: bytes) -> bytes:
-  if audioop is None:
-    return b""
-  try:
-    return audioop.tomono(pcm, 2, 0.5, 0.5)
-  except Exception:
-    return b""
+def _inbound_dsp(
+  state: StreamState, pcm: bytes, participant_id: str | None, now_ms: int, armed: bool, echo_db: float | None
+):
+  """CPU part of one ACS frame: resample, per-stream VAD gate, mix, local barge-in detection.
+
+  Touches only this call's DSP state, so it may run on a DSP pool thread; loop-side
+  inputs (`armed`, `echo_db`) come in as arguments. Returns (pcm_out, barge_in,
+  vad_edge, resample_ns).
+  """
+  raw, pcm_out, vad_edge, resample_ns = _process_inbound_audio(state, pcm, participant_id, now_ms)
+  barge_in = bool(raw) and _barge_in_detector(state).process(raw, now_ms, armed=armed, echo_db=echo_db)
+  return pcm_out, barge_in, vad_edge, resample_ns
+
+
+def _append_to_aoai(state: StreamState, rt, pcm):
+  """Coalesce inbound audio into windows and queue full windows for the AOAI writer."""
+  co = state.aoai_coalescer
+  if co is None:
+    co = state.aoai_coalescer = IngressCoalescer(AOAI_TARGET_RATE, window_ms=AOAI_APPEND_WINDOW_MS)
+  batch = co.push(pcm)
+  if batch:
+    _aoai_send_queue(state, rt).put(batch)
+
+
+def _flush_ingress(state: StreamState):
+  """Send the partial coalescing window now (VAD edge / barge-in)."""
+  co = state.aoai_coalescer
+  if co is None or state.aoai is None:
+    return
+  batch = co.flush()
+  if batch:
+    _aoai_send_queue(state, state.aoai).put(batch)
+
+
+def _acs_sender(state: StreamState) -> PacedSender | None:
+  """Per-call paced sender toward ACS, (re)created when the ACS rate is known/changes."""
+  if state.sample_rate is None:
+    return None
+  sender = state.acs_sender
+  if sender is None or sender.sample_rate != int(state.sample_rate):
+    if sender is not None:
+      sender.clear()
+      asyncio.create_task(sender.close())
+    ws = state._acs_ws  # type: ignore[attr-defined]
+
+    async def _send(pcm: bytes):
+      await ws.send(codec.encode_acs_audio(pcm))
+      now = _now_ms()
+      state.call.last_acs_out_ms = now
+      if state.recorder is not None:
+        state.recorder.audio(media_recorder.ACS_OUT_AUDIO, pcm)
+      metrics.ACS_BYTES_OUT.inc(len(pcm))
+      state.turn.mark(metrics.STAGE_FIRST_SEND, now)
+      # Echo reference for the local barge-in detector.
+      state.echo_ref.note_playout(pcm, now)
+
+    async def _send_stop():
+      await ws.send(codec.ACS_STOP_AUDIO)
+      _record_event(state, media_recorder.ACS_OUT_EVENT, codec.ACS_STOP_AUDIO)
+
+    sender = state.acs_sender = PacedSender(
+      _send,
+      sample_rate=int(state.sample_rate),
+      frame_ms=ACS_FRAME_MS,
+      lead_ms=ACS_PLAYOUT_LEAD_MS,
+      paced=ACS_PACING,
+      max_queue_ms=ACS_SEND_QUEUE_MAX_MS,
+      policy=SEND_OVERLOAD_POLICY,
+      on_overload=lambda reason: _on_send_overload(state, reason),
+      send_stop=_send_stop if ACS_STOP_AUDIO_ON_BARGE_IN else None,
+    )
+  return sender
 
 
 async def _connect_aoai(state: StreamState):
   if AOAIRealtime is None:
     if _AOAI_IMPORT_ERROR:
-      print(
+      log(
         "AOAIRealtime import failed; skipping",
         {"callConnectionId": state.call_connection_id, **_AOAI_IMPORT_ERROR},
       )
     else:
-      print("AOAIRealtime not available; skipping", {"callConnectionId": state.call_connection_id})
+      log("AOAIRealtime not available; skipping", {"callConnectionId": state.call_connection_id})
     state.aoai = None
     state.aoai_ready.set()
     return
 
+  t0 = _now_ms()
   try:
-    rt = AOAIRealtime()
-    await rt.connect()
+    source = "cold"
+    pool = aoai_session_pool.get_pool() if aoai_session_pool is not None else None
+    rt = pool.acquire_nowait() if pool is not None else None
+    if rt is not None:
+      source = "pool"
+      # Pooled sessions are configured with the default profile; retarget if needed.
+      await rt.apply_profile(state.aoai_profile)
+    else:
+      rt = AOAIRealtime(profile=state.aoai_profile)
+      await rt.connect()
     state.aoai = rt
-    print("AOAI connected", {"callConnectionId": state.call_connection_id, "ts": _now_ms()})
+    metrics.AOAI_CONNECT_SECONDS[source].observe((_now_ms() - t0) / 1000.0)
+    log(
+      "AOAI connected",
+      {
+        "callConnectionId": state.call_connection_id,
+        "source": source,
+        "profile": state.aoai_profile,
+        "connectMs": _now_ms() - t0,
+      },
+    )
   except Exception as e:
-    print("AOAI connect failed", {"callConnectionId": state.call_connection_id, "error": repr(e)})
+    log("AOAI connect failed", {"callConnectionId": state.call_connection_id, "error": repr(e)}, level="error")
     state.aoai = None
   finally:
+    state.aoai_ready_ms = _now_ms()
     state.aoai_ready.set()
 
 
@@ -325,67 +853,30 @@ async def _aoai_pump(state: StreamState):
   if rt is None:
     return
 
-  async def _barge_in_cancel(*, reason: str, transcript: str | None = None):
-    print(
-      "AOAI barge-in",
-      {
-        "callConnectionId": state.call_connection_id,
-        "reason": reason,
-        "text": transcript,
-      },
-    )
-    # Drop any already-in-flight audio deltas for a short window.
-    state.drop_aoai_audio_until_ms = _now_ms() + max(0, int(BARGE_IN_DROP_MS))
-    # Clear any buffered audio not yet sent to ACS.
-    state.aoai_out_buf.clear()
-    state.aoai_to_acs_rate_state = None
-    # Best-effort cancel. If unsupported, AOAI will emit an error event.
-    try:
-      await rt.cancel_response(event_id=f"barge_in_cancel_{_now_ms()}")
-    except Exception:
-      pass
-    state.aoai_inflight = False
-
-  async def _flush_aoai_audio_to_acs():
+  def _flush_aoai_audio_to_acs():
     if not ACS_SEND_AUDIO:
       return
     if not ACS_SEND_FLUSH_ON_DONE:
       return
-    if not state.aoai_out_buf:
+    sender = state.acs_sender
+    if sender is None:
       return
-    try:
-      # Flush any residual samples in the output resampler.
-      if state.sample_rate is not None:
-        tail, state.aoai_to_acs_rate_state = _resample_pcm16_mono(
-          b"",
-          src_rate=AOAI_TARGET_RATE,
-          dst_rate=int(state.sample_rate),
-          state=state.aoai_to_acs_rate_state,
-          final=True,
-        )
-        if tail:
-          state.aoai_out_buf.extend(tail)
-
-      payload = bytes(state.aoai_out_buf)
-      state.aoai_out_buf.clear()
-      b64 = base64.b64encode(payload).decode("ascii")
-      await state._acs_ws.send(
-        json.dumps(
-          {
-            "kind": "AudioData",
-            "audioData": {
-              "data": b64,
-            },
-          }
-        )
-      )
-    except Exception as e:
-      print("ACS flush AudioData failed", {"callConnectionId": state.call_connection_id, "error": repr(e)})
+    # Flush any residual samples in the output resampler, then the partial frame.
+    # (Skipped while a DSP thread still owns it, e.g. when the pump is cancelled mid-job.)
+    rs = _outbound_resampler(state)
+    lane = state.dsp_out
+    if rs is not None and (lane is None or not (lane.busy or lane.pending)):
+      tail = rs.flush()
+      if state.archive is not None:
+        state.archive.assistant(tail)
+      sender.push(tail)
+    sender.flush()
 
   async def _send_aoai_audio_to_acs(pcm24: bytes):
     # If we just barged-in/cancelled, drop late deltas for a short window.
     if state.drop_aoai_audio_until_ms and _now_ms() < state.drop_aoai_audio_until_ms:
       return
+    state.turn.mark(metrics.STAGE_FIRST_DELTA, _now_ms())
 
     # Only possible after we received ACS AudioMetadata (so we know target rate).
     if not ACS_SEND_AUDIO:
@@ -399,37 +890,25 @@ async def _aoai_pump(state: StreamState):
       return
 
     # AOAI outputs 24kHz PCM16 mono; resample to ACS input rate (commonly 16kHz).
-    pcm_out, state.aoai_to_acs_rate_state = _resample_pcm16_mono(
-      pcm24,
-      src_rate=AOAI_TARGET_RATE,
-      dst_rate=int(state.sample_rate),
-      state=state.aoai_to_acs_rate_state,
-    )
+    rs = _outbound_resampler(state)
+    dsp = _dsp_executor()
+    if dsp is not None:
+      if state.dsp_out is None:
+        state.dsp_out = dsp.lane("out")
+      pcm_out, resample_ns = await dsp.run(state.dsp_out, _resample_timed, rs, pcm24)
+      metrics.RESAMPLER_CPU_SECONDS.inc(resample_ns)
+      if rs is not state.aoai_out_resampler:
+        # Barge-in while this chunk was being resampled.
+        return
+    else:
+      pcm_out, resample_ns = _resample_timed(rs, pcm24)
+      metrics.RESAMPLER_CPU_SECONDS.inc(resample_ns)
     if not pcm_out:
       return
-
-    state.aoai_out_buf.extend(pcm_out)
-    # Coalesce into bigger frames to reduce overhead.
-    if len(state.aoai_out_buf) < ACS_SEND_MIN_CHUNK_BYTES:
-      return
-
-    payload = bytes(state.aoai_out_buf)
-    state.aoai_out_buf.clear()
-
-    try:
-      b64 = base64.b64encode(payload).decode("ascii")
-      await state._acs_ws.send(
-        json.dumps(
-          {
-            "kind": "AudioData",
-            "audioData": {
-              "data": b64,
-            },
-          }
-        )
-      )
-    except Exception as e:
-      print("ACS send AudioData failed", {"callConnectionId": state.call_connection_id, "error": repr(e)})
+    if state.archive is not None:
+      state.archive.assistant(pcm_out)
+    # Queue for the paced sender task; never blocks on the ACS socket.
+    _acs_sender(state).push(pcm_out)
 
   async def _fallback_create_response():
     try:
@@ -437,6 +916,8 @@ async def _aoai_pump(state: StreamState):
       if AOAI_AUTO_CREATE_RESPONSE and not state.aoai_inflight:
         state.aoai_inflight = True
         await rt.create_response(event_id=f"response_create_{_now_ms()}")
+        state.turn.mark(metrics.STAGE_CREATE_SENT, _now_ms())
+        _record_event(state, media_recorder.AOAI_OUT_EVENT, {"type": "response.create", "trigger": "fallback"})
     except asyncio.CancelledError:
       return
     except Exception:
@@ -445,6 +926,10 @@ async def _aoai_pump(state: StreamState):
   try:
     async for ev in rt.events():
       t = ev.get("type", "")
+      state.call.last_aoai_event_ms = _now_ms()
+      state.call.last_aoai_event = t
+      if state.recorder is not None and t not in codec.AOAI_AUDIO_DELTA_TYPES:
+        state.recorder.event(media_recorder.AOAI_IN_EVENT, ev)
 
       if t in (
         "session.created",
@@ -459,28 +944,54 @@ async def _aoai_pump(state: StreamState):
         "conversation.item.input_audio_transcription.failed",
         "error",
       ):
-        print("AOAI event", {"type": t, "callConnectionId": state.call_connection_id})
+        log("AOAI event", {"type": t, "callConnectionId": state.call_connection_id})
+
+      # Per-turn timeline (speech_stopped -> ... -> first ACS send).
+      if t == "input_audio_buffer.speech_stopped":
+        state.turn.start(_now_ms())
+      elif t == "input_audio_buffer.committed":
+        state.turn.mark(metrics.STAGE_COMMITTED, _now_ms())
+      elif t == "conversation.item.input_audio_transcription.completed":
+        state.turn.mark(metrics.STAGE_TRANSCRIPTION, _now_ms())
+      elif t == "response.created":
+        state.turn.mark(metrics.STAGE_CREATED, _now_ms())
 
       if t == "response.created":
         state.aoai_inflight = True
         # New response begins; allow audio through.
         state.drop_aoai_audio_until_ms = 0
 
+      if t in ("input_audio_buffer.speech_started", "input_audio_buffer.speech_stopped"):
+        # VAD edge: flush the partial append window so latency stays bounded.
+        _flush_ingress(state)
+
       # Immediate barge-in: as soon as the user starts speaking, cancel current assistant response.
       if t == "input_audio_buffer.speech_started":
-        if BARGE_IN_ON_SPEECH_STARTED and state.aoai_inflight:
-          await _barge_in_cancel(reason="speech_started")
+        if state.local_barge_in_ms:
+          # Playout is paused locally; AOAI confirms it was real speech: cancel for good.
+          state.barge_in_confirmed += 1
+          log(
+            "Barge-in confirmed",
+            {"callConnectionId": state.call_connection_id, "localLeadMs": _now_ms() - state.local_barge_in_ms},
+          )
+          state.local_barge_in_ms = 0
+          await _barge_in_cancel(state, reason="local_vad")
+          continue
+        if BARGE_IN_ON_SPEECH_STARTED and _assistant_speaking(state):
+          await _barge_in_cancel(state, reason="speech_started")
           continue
 
       if t == "response.done":
         state.aoai_inflight = False
-        await _flush_aoai_audio_to_acs()
+        _flush_aoai_audio_to_acs()
+        if state.turn.start_ms:
+          log("AOAI turn timing", {"callConnectionId": state.call_connection_id, **state.turn.summary()})
         # If the service didn't emit a dedicated transcript done event, still log what we collected.
         if LOG_AOAI_OUTPUT_TRANSCRIPT and state.aoai_out_transcript_buf:
           text = "".join(state.aoai_out_transcript_buf).strip()
           state.aoai_out_transcript_buf.clear()
           if text:
-            print("AOAI output transcript", {"callConnectionId": state.call_connection_id, "text": text})
+            log("AOAI output transcript", {"callConnectionId": state.call_connection_id, "text": text})
 
       if t in ("input_audio_buffer.committed", "input_audio_buffer.speech_stopped"):
         # If transcription is slow/missing, still kick off a response after a short delay.
@@ -491,22 +1002,24 @@ async def _aoai_pump(state: StreamState):
       if t == "conversation.item.input_audio_transcription.completed":
         tr = _extract_transcript_text(ev)
         if tr:
-          print("AOAI transcription", {"callConnectionId": state.call_connection_id, "text": tr})
+          log("AOAI transcription", {"callConnectionId": state.call_connection_id, "text": tr})
 
         # Barge-in trigger: cancel current response if the user says a stop phrase.
         if tr and _is_barge_in(tr):
-          await _barge_in_cancel(reason="phrase", transcript=tr)
+          await _barge_in_cancel(state, reason="phrase", transcript=tr)
           continue
 
         if AOAI_AUTO_CREATE_RESPONSE and not state.aoai_inflight:
           state.aoai_inflight = True
           try:
             await rt.create_response(event_id=f"response_create_{_now_ms()}")
+            state.turn.mark(metrics.STAGE_CREATE_SENT, _now_ms())
+            _record_event(state, media_recorder.AOAI_OUT_EVENT, {"type": "response.create", "trigger": "transcription"})
           except Exception:
             state.aoai_inflight = False
 
       if t in ("conversation.item.input_audio_transcription.failed", "error"):
-        print("AOAI error", {"callConnectionId": state.call_connection_id, "event": ev})
+        log("AOAI error", {"callConnectionId": state.call_connection_id, "aoaiEvent": ev}, level="warning")
 
       # Assistant output transcript (when available)
       if LOG_AOAI_OUTPUT_TRANSCRIPT and t in (
@@ -526,7 +1039,7 @@ async def _aoai_pump(state: StreamState):
           state.aoai_out_transcript_buf.clear()
           full = (full or "").strip()
           if full:
-            print("AOAI output transcript", {"callConnectionId": state.call_connection_id, "text": full})
+            log("AOAI output transcript", {"callConnectionId": state.call_connection_id, "text": full})
 
       # Forward AOAI audio deltas back to ACS (bidirectional streaming).
       if t in ("response.output_audio.delta", "response.audio.delta"):
@@ -534,23 +1047,46 @@ async def _aoai_pump(state: StreamState):
         if not b64:
           continue
         try:
-          pcm24 = base64.b64decode(b64)
+          pcm24 = codec.b64decode(b64)
         except Exception:
           continue
+        if state.recorder is not None:
+          state.recorder.audio(media_recorder.AOAI_IN_AUDIO, pcm24)
+        if not state.aoai_first_audio_ms:
+          state.aoai_first_audio_ms = _now_ms()
+          log(
+            "AOAI first audio",
+            {
+              "callConnectionId": state.call_connection_id,
+              "sinceConnectMs": state.aoai_first_audio_ms - state.connected_ms,
+              "aoaiReadyMs": state.aoai_ready_ms - state.connected_ms if state.aoai_ready_ms else None,
+            },
+          )
         await _send_aoai_audio_to_acs(pcm24)
 
       # Some variants emit audio-done separately; flush any remainder.
       if t in ("response.output_audio.done", "response.audio.done"):
-        await _flush_aoai_audio_to_acs()
+        _flush_aoai_audio_to_acs()
 
   except asyncio.CancelledError:
     try:
-      await _flush_aoai_audio_to_acs()
+      _flush_aoai_audio_to_acs()
     except Exception:
       pass
     return
   except Exception as e:
-    print("AOAI pump error", {"callConnectionId": state.call_connection_id, "error": repr(e)})
+    log("AOAI pump error", {"callConnectionId": state.call_connection_id, "error": repr(e)}, level="error")
+
+
+def _profile_from_path(path: str | None) -> str | None:
+  # Per-call AOAI instructions profile: /ws/media?profile=<name> (set by /api/call/start).
+  try:
+    values = parse_qs(urlsplit(path or "").query).get("profile")
+  except Exception:
+    return None
+  if not values:
+    return None
+  return values[0].strip() or None
 
 
 async def handler(ws):
@@ -558,12 +1094,24 @@ async def handler(ws):
   state = StreamState(
     call_connection_id=headers.get("x-ms-call-connection-id"),
     corr_id=headers.get("x-ms-call-correlation-id"),
+    connected_ms=_now_ms(),
+    aoai_profile=_profile_from_path(ws.request.path),
   )
   # Stash the ACS websocket so AOAI pump can send audio back (bidirectional).
   # (We keep this private attribute off the dataclass fields to avoid repr noise.)
   state._acs_ws = ws  # type: ignore[attr-defined]
+  # Records logged from this call (and the tasks it starts) carry its id.
+  bind_call(state.call_connection_id)
+  state.recorder = _start_recorder(state, ws.request.path)
+  state.call = call_registry.REGISTRY.register(
+    state.call_connection_id,
+    state.corr_id,
+    path=ws.request.path,
+    describe=lambda detail: _describe_call(state, detail),
+    control=lambda action, data: _control_call(state, action, data),
+  )
 
-  print(
+  log(
     "ACS WS connected (media)",
     {
       "path": ws.request.path,
@@ -578,23 +1126,43 @@ async def handler(ws):
   )
 
   aoai_task: asyncio.Task | None = None
+  metrics.CALLS_TOTAL.inc()
+  metrics.ACTIVE_CALLS.inc()
 
   try:
     async for message in ws:
+      if state.overload_reason is not None:
+        break
+      state.call.last_acs_in_ms = _now_ms()
       if isinstance(message, bytes):
         try:
           text = message.decode("utf-8", errors="strict")
         except Exception:
-          print("RX non-utf8 bytes", {"len": len(message), "callConnectionId": state.call_connection_id})
+          log("RX non-utf8 bytes", {"len": len(message), "callConnectionId": state.call_connection_id})
           continue
       else:
         text = message
 
-      obj = _safe_json(text)
-      if not isinstance(obj, dict):
-        continue
+      # ~50 AudioData frames/s: take the fast path, fully parse everything else.
+      obj = None
+      b64 = None
+      participant_id = None
+      audio = codec.extract_acs_audio(text) if codec.SLICE_FAST_PATH else None
+      if audio is not None:
+        kind = "AudioData"
+        b64, participant_id = audio
+      else:
+        obj = _safe_json(text)
+        if not isinstance(obj, dict):
+          continue
+        kind = obj.get("kind")
+        if kind == "AudioData":
+          ad = obj.get("audioData") or {}
+          b64 = ad.get("data")
+          participant_id = ad.get("participantRawID")
+        elif state.recorder is not None:
+          state.recorder.event(media_recorder.ACS_IN_EVENT, text)
 
-      kind = obj.get("kind")
       if kind == "AudioMetadata":
         md = obj.get("audioMetadata") or {}
         try:
@@ -606,8 +1174,12 @@ async def handler(ws):
         except Exception:
           state.channels = None
         state.encoding = md.get("encoding")
+        # Format may have changed: start per-stream resamplers afresh.
+        state.inbound_streams.clear()
+        state.inbound_mixer = StreamMixer()
+        state.inbound_raw_mixer = StreamMixer()
 
-        print(
+        log(
           "AudioMetadata",
           {
             "callConnectionId": state.call_connection_id,
@@ -623,69 +1195,90 @@ async def handler(ws):
           aoai_task = asyncio.create_task(_connect_aoai(state))
 
       elif kind == "AudioData":
-        ad = obj.get("audioData") or {}
-        b64 = ad.get("data")
         if not b64:
           continue
         try:
-          pcm = base64.b64decode(b64)
+          pcm = codec.b64decode(b64)
         except Exception:
           continue
 
         state.bytes_in += len(pcm)
-
-        if ENABLE_AOAI and state.sample_rate and state.channels in (1, 2):
-          # Wait for AOAI connect (best-effort) then forward.
+        metrics.ACS_BYTES_IN.inc(len(pcm))
+        if state.recorder is not None:
+          state.recorder.audio(media_recorder.ACS_IN_AUDIO, pcm, participant_id)
+        if ARCHIVE_DIR:
+          arc = _call_archive(state, participant_id)
+          if arc is not None:
+            arc.caller(pcm)
+
+        if ENABLE_AOAI and state.sample_rate:
+          # Normally started on AudioMetadata; connect now if metadata was missed.
           if aoai_task is None:
             aoai_task = asyncio.create_task(_connect_aoai(state))
-          try:
-            await asyncio.wait_for(state.aoai_ready.wait(), timeout=0.0)
-          except Exception:
-            pass
 
+          ready = state.aoai_ready.is_set()
           rt = state.aoai
-          if rt is not None:
-            # Start AOAI event pump once per connection.
-            if state.aoai_pump_task is None:
-              state.aoai_pump_task = asyncio.create_task(_aoai_pump(state))
-
-            pcm_mono = pcm
-            if state.channels == 2:
-              pcm_mono = _downmix_pcm16_stereo_to_mono(pcm)
-              if not pcm_mono:
-                # Can't downmix without audioop; skip.
-                pcm_mono = b""
-
-            if pcm_mono:
-              pcm_out, state.aoai_rate_state = _resample_pcm16_mono(
-                pcm_mono,
-                src_rate=state.sample_rate,
-                dst_rate=AOAI_TARGET_RATE,
-                state=state.aoai_rate_state,
+          if not ready or rt is not None:
+            now = _now_ms()
+            armed = _local_barge_in_armed(state, now)
+            echo_db = state.echo_ref.level(now)
+            dsp = _dsp_executor()
+            if dsp is not None:
+              if state.dsp_in is None:
+                state.dsp_in = dsp.lane("in")
+              pcm_out, barge_in, vad_edge, resample_ns = await dsp.run(
+                state.dsp_in, _inbound_dsp, state, pcm, participant_id, now, armed, echo_db
               )
+            else:
+              pcm_out, barge_in, vad_edge, resample_ns = _inbound_dsp(state, pcm, participant_id, now, armed, echo_db)
+            metrics.RESAMPLER_CPU_SECONDS.inc(resample_ns)
+            if barge_in:
+              _barge_in_pause(state, now)
+
+            if not ready:
+              # AOAI still connecting: keep the most recent audio instead of dropping it.
+              if pcm_out:
+                state.aoai_pending_in.extend(pcm_out)
+                cap = AOAI_TARGET_RATE * 2 * max(0, AOAI_PREREADY_BUFFER_MS) // 1000
+                if len(state.aoai_pending_in) > cap:
+                  del state.aoai_pending_in[: len(state.aoai_pending_in) - cap]
+            else:
+              # Start AOAI event pump once per connection.
+              if state.aoai_pump_task is None:
+                state.aoai_pump_task = asyncio.create_task(_aoai_pump(state))
+
+              if state.aoai_pending_in:
+                pcm_out = bytes(state.aoai_pending_in) + pcm_out
+                state.aoai_pending_in.clear()
+
               if pcm_out:
-                try:
-                  await rt.append_audio(pcm_out)
-                except Exception:
-                  pass
+                # Queue for the AOAI writer task; never blocks on the AOAI socket.
+                _append_to_aoai(state, rt, pcm_out)
+              if vad_edge:
+                _flush_ingress(state)
 
         now = _now_ms()
         if LOG_AUDIO_STATS and now - state.last_stat_ms >= max(200, int(LOG_AUDIO_STATS_INTERVAL_MS)):
           state.last_stat_ms = now
-          print(
+          log(
             "AudioData stats",
             {
               "callConnectionId": state.call_connection_id,
               "bytesIn": state.bytes_in,
+              "acsOut": state.acs_sender.stats() if state.acs_sender is not None else None,
+              "aoaiOut": state.aoai_send_queue.stats() if state.aoai_send_queue is not None else None,
+              "aoaiAppend": state.aoai_coalescer.stats() if state.aoai_coalescer is not None else None,
+              "vad": _vad_stats(state),
+              "dsp": _DSP.stats() if _DSP is not None else None,
             },
           )
 
       elif kind == "DtmfData":
         dd = obj.get("dtmfData") or {}
-        print("DTMF", {"callConnectionId": state.call_connection_id, "data": dd.get("data")})
+        log("DTMF", {"callConnectionId": state.call_connection_id, "data": dd.get("data")})
 
   except websockets.exceptions.ConnectionClosed as e:
-    print(
+    log(
       "ACS WS closed (media)",
       {
         "callConnectionId": state.call_connection_id,
@@ -695,8 +1288,10 @@ async def handler(ws):
       },
     )
   except Exception as e:
-    print("ACS WS error (media)", {"callConnectionId": state.call_connection_id, "error": repr(e)})
+    log("ACS WS error (media)", {"callConnectionId": state.call_connection_id, "error": repr(e)}, level="error")
   finally:
+    metrics.ACTIVE_CALLS.dec()
+    call_registry.REGISTRY.unregister(state.call)
     if aoai_task is not None:
       try:
         aoai_task.cancel()
@@ -715,18 +1310,57 @@ async def handler(ws):
       except Exception:
         pass
 
+    if state.aoai_send_queue is not None:
+      await state.aoai_send_queue.close()
+      log("AOAI send stats", {"callConnectionId": state.call_connection_id, **state.aoai_send_queue.stats()})
+    if state.aoai_coalescer is not None:
+      log("AOAI append coalescing", {"callConnectionId": state.call_connection_id, **state.aoai_coalescer.stats()})
+    if state.barge_in_task is not None and not state.barge_in_task.done():
+      state.barge_in_task.cancel()
+    if state.barge_in_detector is not None:
+      log(
+        "Barge-in stats",
+        {
+          "callConnectionId": state.call_connection_id,
+          "localTriggers": state.barge_in_detector.triggers,
+          "confirmed": state.barge_in_confirmed,
+          "unconfirmed": state.barge_in_unconfirmed,
+          "echoRejects": state.barge_in_detector.echo_rejects,
+          "reactionMsAvg": {
+            k: round(sum(v) / len(v)) for k, v in state.barge_in_reaction_ms.items() if v
+          },
+        },
+      )
+    for key, gate_stats in (_vad_stats(state) or {}).items():
+      log("VAD gate stats", {"callConnectionId": state.call_connection_id, "stream": key, **gate_stats})
+
     if state.aoai is not None:
       try:
         await state.aoai.close()
       except Exception:
         pass
 
+    if state.acs_sender is not None:
+      await state.acs_sender.close()
+      log("ACS playout stats", {"callConnectionId": state.call_connection_id, **state.acs_sender.stats()})
+
+    if state.archive is not None:
+      # Finalized by the writer thread ("Call archive" log).
+      state.archive.close()
+
+    if state.recorder is not None:
+      log("Call recording", {"callConnectionId": state.call_connection_id, **await state.recorder.close()})
+
 
 async def main():
   _log_audio_config()
-  async with websockets.serve(handler, HOST, PORT):
-    print(f"ACS media WS server listening on ws://{HOST}:{PORT} (set MEDIA_WS_PORT to change)")
-    await asyncio.Future()  # run forever
+  _start_aoai_session_pool()
+  try:
+    async with websockets.serve(handler, HOST, PORT):
+      log(f"ACS media WS server listening on ws://{HOST}:{PORT} (set MEDIA_WS_PORT to change)")
+      await asyncio.Future()  # run forever
+  finally:
+    await _close_aoai_session_pool()
 
 
 if __name__ == "__main__":
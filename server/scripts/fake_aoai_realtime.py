@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+"""Local stand-in for the Azure OpenAI Realtime WebSocket API (load tests, no Azure).
+
+Point the gateway at it and drive calls with `scripts/ws_load.py`:
+
+  python scripts/fake_aoai_realtime.py --port 18765
+  AZURE_OPENAI_ENDPOINT=http://127.0.0.1:18765 AZURE_OPENAI_DEPLOYMENT=fake \
+    AZURE_OPENAI_API_KEY=fake MEDIA_WS_ENABLE_AOAI=1 python app.py
+
+Behaviour per session (scripted, deterministic timing):
+- `session.update` -> `session.updated` (turn_detection.silence_duration_ms is honoured)
+- appended audio runs through a simple energy VAD: `input_audio_buffer.speech_started`
+  on speech, then after the silence duration `speech_stopped` + `committed`, and
+  `conversation.item.input_audio_transcription.completed` after --transcription-ms
+- `response.create` -> `response.created`, then after --first-audio-ms, --response-ms of
+  audio as `response.output_audio.delta` chunks (sent --pace x faster than real time),
+  `response.output_audio.done` and `response.done`
+- `response.cancel` stops the audio and ends the response with status "cancelled"
+
+`GET /stats` returns configuration and counters as JSON (used by ws_load.py).
+"""
+
+import argparse
+import array
+import asyncio
+import base64
+import json
+import math
+import os
+import sys
+import time
+from http import HTTPStatus
+
+import websockets
+
+# Ensure `server/` is importable when running as `python scripts/xxx.py`.
+SERVER_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if SERVER_ROOT not in sys.path:
+  sys.path.insert(0, SERVER_ROOT)
+
+from media.vad import pcm16_level  # noqa: E402
+
+RATE = 24000
+
+
+class Config:
+  def __init__(self, args):
+    self.vad_db = float(args.vad_db)
+    self.silence_ms = args.silence_ms
+    self.transcription_ms = int(args.transcription_ms)
+    self.first_audio_ms = int(args.first_audio_ms)
+    self.response_ms = int(args.response_ms)
+    self.delta_ms = max(10, int(args.delta_ms))
+    self.pace = max(0.0, float(args.pace))
+    self.transcript = args.transcript
+
+  def to_dict(self) -> dict:
+    return {
+      "vadDb": self.vad_db,
+      "silenceMs": self.silence_ms,
+      "transcriptionMs": self.transcription_ms,
+      "firstAudioMs": self.first_audio_ms,
+      "responseMs": self.response_ms,
+      "deltaMs": self.delta_ms,
+      "pace": self.pace,
+    }
+
+
+STATS = {
+  "sessions": 0,
+  "active": 0,
+  "appendedMs": 0.0,
+  "speechStarted": 0,
+  "turns": 0,
+  "responses": 0,
+  "cancelled": 0,
+  "audioMsSent": 0,
+}
+
+
+def _response_chunk(ms: int) -> str:
+  """Base64 of `ms` of a voiced tone (what the caller would 'hear')."""
+  n = RATE * ms // 1000
+  a = array.array("h", (int(6000 * (math.sin(2 * math.pi * 190 * i / RATE) + 0.4 * math.sin(2 * math.pi * 380 * i / RATE))) for i in range(n)))
+  if sys.byteorder != "little":
+    a.byteswap()
+  return base64.b64encode(a.tobytes()).decode("ascii")
+
+
+class Session:
+  def __init__(self, ws, cfg: Config, chunk_b64: str):
+    self.ws = ws
+    self.cfg = cfg
+    self.chunk_b64 = chunk_b64
+    self.silence_ms = cfg.silence_ms if cfg.silence_ms is not None else 500
+    self.audio_ms = 0.0
+    self.speaking = False
+    self.quiet_ms = 0.0
+    self.speech_start_ms = 0.0
+    self.response_task: asyncio.Task | None = None
+    self.tasks: set[asyncio.Task] = set()
+    self.seq = 0
+
+  def _id(self, prefix: str) -> str:
+    self.seq += 1
+    return f"{prefix}_{self.seq}"
+
+  async def send(self, ev: dict):
+    ev.setdefault("event_id", self._id("event"))
+    try:
+      await self.ws.send(json.dumps(ev))
+    except websockets.exceptions.ConnectionClosed:
+      pass
+
+  def _spawn(self, coro):
+    t = asyncio.create_task(coro)
+    self.tasks.add(t)
+    t.add_done_callback(self.tasks.discard)
+    return t
+
+  async def on_session_update(self, ev: dict):
+    if self.cfg.silence_ms is None:
+      td = (((ev.get("session") or {}).get("audio") or {}).get("input") or {}).get("turn_detection") or {}
+      if isinstance(td.get("silence_duration_ms"), int):
+        self.silence_ms = td["silence_duration_ms"]
+    await self.send({"type": "session.updated", "session": ev.get("session") or {}})
+
+  async def on_append(self, ev: dict):
+    try:
+      pcm = base64.b64decode(ev.get("audio") or "")
+    except Exception:
+      return
+    ms = len(pcm) / (RATE * 2) * 1000.0
+    if ms <= 0:
+      return
+    STATS["appendedMs"] += ms
+    db, _ = pcm16_level(pcm)
+    start = self.audio_ms
+    self.audio_ms += ms
+    if db >= self.cfg.vad_db:
+      self.quiet_ms = 0.0
+      if not self.speaking:
+        self.speaking = True
+        self.speech_start_ms = start
+        STATS["speechStarted"] += 1
+        await self.send({"type": "input_audio_buffer.speech_started", "audio_start_ms": int(start), "item_id": self._id("item")})
+      return
+    if not self.speaking:
+      return
+    self.quiet_ms += ms
+    if self.quiet_ms >= self.silence_ms:
+      self.speaking = False
+      self.quiet_ms = 0.0
+      STATS["turns"] += 1
+      item_id = self._id("item")
+      await self.send({"type": "input_audio_buffer.speech_stopped", "audio_end_ms": int(self.audio_ms), "item_id": item_id})
+      await self.send({"type": "input_audio_buffer.committed", "item_id": item_id, "previous_item_id": None})
+      self._spawn(self._transcription(item_id))
+
+  async def _transcription(self, item_id: str):
+    await asyncio.sleep(self.cfg.transcription_ms / 1000.0)
+    await self.send(
+      {
+        "type": "conversation.item.input_audio_transcription.completed",
+        "item_id": item_id,
+        "content_index": 0,
+        "transcript": self.cfg.transcript,
+      }
+    )
+
+  async def on_response_create(self, ev: dict):
+    if self.response_task is not None and not self.response_task.done():
+      await self.send(
+        {"type": "error", "error": {"type": "invalid_request_error", "code": "conversation_already_has_active_response"}}
+      )
+      return
+    self.response_task = self._spawn(self._respond(self._id("resp")))
+
+  async def _respond(self, resp_id: str):
+    STATS["responses"] += 1
+    status = "completed"
+    await self.send({"type": "response.created", "response": {"id": resp_id, "status": "in_progress"}})
+    try:
+      await asyncio.sleep(self.cfg.first_audio_ms / 1000.0)
+      item_id = self._id("item")
+      sent = 0
+      t0 = time.perf_counter()
+      while sent < self.cfg.response_ms:
+        await self.send(
+          {
+            "type": "response.output_audio.delta",
+            "response_id": resp_id,
+            "item_id": item_id,
+            "output_index": 0,
+            "content_index": 0,
+            "delta": self.chunk_b64,
+          }
+        )
+        sent += self.cfg.delta_ms
+        STATS["audioMsSent"] += self.cfg.delta_ms
+        if self.cfg.pace > 0:
+          # Stay `pace` x ahead of real time, like the service.
+          ahead = t0 + sent / 1000.0 / self.cfg.pace - time.perf_counter()
+          if ahead > 0:
+            await asyncio.sleep(ahead)
+      await self.send({"type": "response.output_audio.done", "response_id": resp_id, "item_id": item_id})
+    except asyncio.CancelledError:
+      status = "cancelled"
+      STATS["cancelled"] += 1
+    await self.send({"type": "response.done", "response": {"id": resp_id, "status": status}})
+
+  async def on_response_cancel(self, ev: dict):
+    t = self.response_task
+    if t is not None and not t.done():
+      t.cancel()
+      return
+    await self.send({"type": "error", "error": {"type": "invalid_request_error", "code": "response_cancel_not_active"}})
+
+  async def run(self):
+    await self.send({"type": "session.created", "session": {"id": self._id("sess")}})
+    handlers = {
+      "session.update": self.on_session_update,
+      "input_audio_buffer.append": self.on_append,
+      "response.create": self.on_response_create,
+      "response.cancel": self.on_response_cancel,
+    }
+    try:
+      async for msg in self.ws:
+        try:
+          ev = json.loads(msg)
+        except Exception:
+          continue
+        h = handlers.get(ev.get("type"))
+        if h is not None:
+          await h(ev)
+    finally:
+      for t in list(self.tasks):
+        t.cancel()
+
+
+def _process_request(connection, request):
+  path = request.path.split("?", 1)[0]
+  if path == "/stats":
+    body = json.dumps({"config": CONFIG.to_dict(), **{k: round(v, 1) if isinstance(v, float) else v for k, v in STATS.items()}})
+    return connection.respond(HTTPStatus.OK, body + "\n")
+  if path == "/healthz":
+    return connection.respond(HTTPStatus.OK, "ok\n")
+  return None
+
+
+CONFIG: Config
+
+
+async def _serve(host: str, port: int):
+  chunk_b64 = _response_chunk(CONFIG.delta_ms)
+
+  async def handler(ws):
+    STATS["sessions"] += 1
+    STATS["active"] += 1
+    try:
+      await Session(ws, CONFIG, chunk_b64).run()
+    except websockets.exceptions.ConnectionClosed:
+      pass
+    finally:
+      STATS["active"] -= 1
+
+  async with websockets.serve(handler, host, port, process_request=_process_request, max_size=None):
+    print(f"fake AOAI Realtime listening on ws://{host}:{port} (stats: http://{host}:{port}/stats)", flush=True)
+    await asyncio.Future()
+
+
+def main() -> int:
+  global CONFIG
+  ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+  ap.add_argument("--host", default="127.0.0.1")
+  ap.add_argument("--port", type=int, default=18765)
+  ap.add_argument("--vad-db", type=float, default=-40.0, help="Speech threshold (dBFS) of the fake server VAD.")
+  ap.add_argument("--silence-ms", type=int, default=None, help="Override turn_detection.silence_duration_ms.")
+  ap.add_argument("--transcription-ms", type=int, default=200)
+  ap.add_argument("--first-audio-ms", type=int, default=300, help="response.create -> first audio delta.")
+  ap.add_argument("--response-ms", type=int, default=2000, help="Audio length of each response.")
+  ap.add_argument("--delta-ms", type=int, default=100, help="Audio per response.output_audio.delta.")
+  ap.add_argument("--pace", type=float, default=4.0, help="Delta rate vs real time (0 = as fast as possible).")
+  ap.add_argument("--transcript", default="テストです")
+  args = ap.parse_args()
+  CONFIG = Config(args)
+  try:
+    asyncio.run(_serve(args.host, args.port))
+  except KeyboardInterrupt:
+    pass
+  return 0
+
+
+if __name__ == "__main__":
+  raise SystemExit(main())
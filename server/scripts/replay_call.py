@@ -0,0 +1,558 @@
+#!/usr/bin/env python3
+"""Replay a recorded call (MEDIA_WS_RECORD_DIR) through /ws/media against a fake AOAI peer.
+
+The ACS side sends the recorded AudioMetadata / AudioData on the recorded timeline. An
+in-process AOAI Realtime peer plays back the recorded AOAI side:
+- input-side events (speech_started/stopped, committed, transcription, errors) fire
+  once the ACS side has replayed the audio up to the point they were recorded at
+- each `response.create` from the gateway starts the next recorded response (created,
+  audio deltas, transcripts, done) with its recorded delays; `response.cancel` stops it
+- responses the service started on its own (no recorded response.create) fire on the
+  recorded timeline like input-side events
+
+The report compares the replay with the recording: responses, barge-in cancels,
+StopAudio, audio returned to ACS, first-audio latency (response.create -> first
+AudioData toward ACS) and outbound pacing jitter.
+
+By default a standalone media server (scripts/acs_media_ws_server.py) is started with
+its AOAI endpoint pointed at the peer. With --url, an already running gateway is used;
+start it with AZURE_OPENAI_ENDPOINT=http://127.0.0.1:<--aoai-port>.
+
+--speed 1 replays in real time (faithful timing, barge-in and pacing). Faster replays
+(--speed 2, or 0 = as fast as possible) hold the caller audio at every recorded
+response.create until that response has been requested and played out, so turns stay
+in order; caller speech over a response (barge-in) is not reproduced that way.
+
+Usage (from `server/`):
+  python scripts/replay_call.py rec.acsrec [--speed 1] [--json out.json] [--check]
+  python scripts/replay_call.py rec.acsrec --url http://127.0.0.1:8000 --aoai-port 18770
+  python scripts/replay_call.py rec.acsrec --dump
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+import websockets
+
+# Ensure `server/` is importable when running as `python scripts/xxx.py`.
+SERVER_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if SERVER_ROOT not in sys.path:
+  sys.path.insert(0, SERVER_ROOT)
+
+from media import codec  # noqa: E402
+from media import recorder as rec  # noqa: E402
+
+try:
+  from scripts.ws_probe import _normalize_base_url  # noqa: E402
+except ImportError:  # run as `python scripts/replay_call.py`
+  from ws_probe import _normalize_base_url  # noqa: E402
+
+# Small gaps between outbound frames are pacing; larger ones are pauses between responses.
+_PACING_GAP_MAX_MS = 200
+
+
+# --- recording -> replay script ---
+
+
+class _Block:
+  """One recorded response: events/audio with delays relative to its trigger."""
+
+  __slots__ = ("response_id", "triggered", "t_us", "items")
+
+  def __init__(self, response_id: str | None, triggered: bool, t_us: int):
+    self.response_id = response_id
+    self.triggered = triggered
+    self.t_us = t_us
+    self.items: list[tuple[int, int, bytes]] = []
+
+
+class Script:
+  def __init__(self, path: str):
+    self.header, self.records = rec.read_recording(path)
+    self.acs: list[tuple[int, str]] = []
+    self.timeline: list[tuple[int, bytes]] = []
+    self.blocks: list[_Block] = []
+    # Recorded response.create times: turn boundaries for faster-than-real-time replay.
+    self.creates: list[int] = []
+    self.sample_rate = 16000
+    self.gaps = 0
+    last_create_us: int | None = None
+    block: _Block | None = None
+    for kind, t_us, payload in self.records:
+      if kind == rec.ACS_IN_EVENT:
+        text = payload.decode("utf-8", "replace")
+        self.acs.append((t_us, text))
+        try:
+          md = json.loads(text).get("audioMetadata") or {}
+          self.sample_rate = int(md.get("sampleRate") or self.sample_rate)
+        except Exception:
+          pass
+      elif kind == rec.ACS_IN_AUDIO:
+        pid, pcm = rec.split_acs_audio(payload)
+        ad = {"data": codec.b64encode_str(pcm), "silent": False}
+        if pid:
+          ad["participantRawID"] = pid
+        self.acs.append((t_us, json.dumps({"kind": "AudioData", "audioData": ad})))
+      elif kind == rec.AOAI_OUT_EVENT:
+        if _type_of(payload) == "response.create":
+          last_create_us = t_us
+          self.creates.append(t_us)
+      elif kind == rec.AOAI_IN_EVENT:
+        ev = json.loads(payload)
+        t = ev.get("type") or ""
+        if t.startswith("session."):
+          continue
+        if t == "response.created":
+          rid = (ev.get("response") or {}).get("id")
+          triggered = last_create_us is not None
+          block = _Block(rid, triggered, last_create_us if triggered else t_us)
+          last_create_us = None
+          self.blocks.append(block)
+        if t.startswith("response.") and block is not None:
+          block.items.append((t_us - block.t_us, kind, payload))
+          if t == "response.done":
+            block = None
+        else:
+          self.timeline.append((t_us, payload))
+      elif kind == rec.AOAI_IN_AUDIO:
+        if block is not None:
+          block.items.append((t_us - block.t_us, kind, payload))
+      elif kind == rec.GAP:
+        self.gaps += 1
+    # Responses the service started itself run on the recorded timeline.
+    self.auto_blocks = [b for b in self.blocks if not b.triggered]
+    self.create_blocks = [b for b in self.blocks if b.triggered]
+
+  def recorded_report(self) -> dict:
+    creates: list[int] = []
+    out: list[tuple[int, int]] = []
+    cancels = stops = 0
+    for kind, t_us, payload in self.records:
+      if kind == rec.AOAI_OUT_EVENT:
+        t = _type_of(payload)
+        if t == "response.create":
+          creates.append(t_us)
+        elif t == "response.cancel":
+          cancels += 1
+      elif kind == rec.ACS_OUT_AUDIO:
+        out.append((t_us, len(payload)))
+      elif kind == rec.ACS_OUT_EVENT:
+        stops += 1
+    return _report(creates, out, cancels, stops, self.sample_rate)
+
+
+def _type_of(payload: bytes) -> str:
+  try:
+    return json.loads(payload).get("type") or ""
+  except Exception:
+    return ""
+
+
+def _report(creates_us: list[int], out: list[tuple[int, int]], cancels: int, stops: int, rate: int) -> dict:
+  first_audio = []
+  j = 0
+  for i, c in enumerate(creates_us):
+    nxt = creates_us[i + 1] if i + 1 < len(creates_us) else None
+    while j < len(out) and out[j][0] < c:
+      j += 1
+    if j < len(out) and (nxt is None or out[j][0] < nxt):
+      first_audio.append((out[j][0] - c) / 1000.0)
+  jitter = []
+  for (t0, _), (t1, _) in zip(out, out[1:]):
+    gap = (t1 - t0) / 1000.0
+    if gap < _PACING_GAP_MAX_MS:
+      jitter.append(gap)
+  return {
+    "responsesCreated": len(creates_us),
+    "cancels": cancels,
+    "stopAudio": stops,
+    "audioOutMs": round(sum(n for _, n in out) / (rate * 2) * 1000.0),
+    "firstAudioMsP50": round(statistics.median(first_audio), 1) if first_audio else None,
+    "firstAudioMsMax": round(max(first_audio), 1) if first_audio else None,
+    "frameGapMsP50": round(statistics.median(jitter), 1) if jitter else None,
+    "frameGapMsMax": round(max(jitter), 1) if jitter else None,
+  }
+
+
+# --- fake AOAI peer ---
+
+
+class Replay:
+  def __init__(self, script: Script, speed: float, min_response_ms: int = 0):
+    self.script = script
+    self.speed = speed
+    self.min_response_s = min_response_ms / 1000.0 if speed != 1 else 0.0
+    self.position_us = -1  # recorded time of the last ACS record sent
+    self.changed = asyncio.Condition()
+    self.claimed = False
+    self.session_ready = asyncio.Event()
+    self.started = 0
+    self.finished = 0
+    self.last_append = 0.0
+    self.creates_us: list[int] = []
+    self.cancels = 0
+    self.t0 = time.perf_counter()
+
+  def now_us(self) -> int:
+    return int((time.perf_counter() - self.t0) * 1e6)
+
+  async def wait_position(self, t_us: int):
+    async with self.changed:
+      await self.changed.wait_for(lambda: self.position_us >= t_us)
+
+  async def advance(self, t_us: int):
+    async with self.changed:
+      self.position_us = t_us
+      self.changed.notify_all()
+
+  async def count(self, *, finished: int = 0):
+    async with self.changed:
+      self.finished += finished
+      self.changed.notify_all()
+
+  async def wait_turn(self, n: int, timeout_s: float) -> bool:
+    """Wait until the n-th response was requested and every started one finished."""
+    async with self.changed:
+      try:
+        await asyncio.wait_for(
+          self.changed.wait_for(lambda: len(self.creates_us) >= n and self.finished >= self.started), timeout_s
+        )
+        return True
+      except asyncio.TimeoutError:
+        return False
+
+  async def sleep_scaled(self, us: int):
+    if self.speed > 0 and us > 0:
+      await asyncio.sleep(us / 1e6 / self.speed)
+    else:
+      await asyncio.sleep(0)
+
+
+class PeerSession:
+  def __init__(self, ws, replay: Replay):
+    self.ws = ws
+    self.replay = replay
+    self.response: asyncio.Task | None = None
+    self.response_id: str | None = None
+    self.next_block = 0
+    self.tasks: set[asyncio.Task] = set()
+
+  async def send(self, text):
+    try:
+      await self.ws.send(text)
+    except websockets.exceptions.ConnectionClosed:
+      pass
+
+  def spawn(self, coro) -> asyncio.Task:
+    t = asyncio.create_task(coro)
+    self.tasks.add(t)
+    t.add_done_callback(self.tasks.discard)
+    return t
+
+  def claim(self):
+    # The first session that streams audio (or asks for a response) gets the timeline.
+    if self.replay.claimed:
+      return
+    self.replay.claimed = True
+    self.spawn(self.play_timeline())
+
+  async def play_timeline(self):
+    s = self.replay.script
+    events = [(t, payload, None) for t, payload in s.timeline] + [(b.t_us, None, b) for b in s.auto_blocks]
+    events.sort(key=lambda x: x[0])
+    for t_us, payload, block in events:
+      await self.replay.wait_position(t_us)
+      if self.replay.speed != 1:
+        # The gateway works through the burst of caller audio behind the replay
+        # position: wait until it stopped appending, as the service would.
+        while time.perf_counter() - self.replay.last_append < 0.05:
+          await asyncio.sleep(0.01)
+      if block is not None:
+        self.start_block(block)
+      else:
+        await self.send(payload.decode("utf-8"))
+
+  def start_block(self, block: _Block):
+    if self.response is not None and not self.response.done():
+      self.response.cancel()
+    self.response_id = block.response_id
+    self.replay.started += 1
+    self.response = self.spawn(self.play_block(block))
+
+  async def play_block(self, block: _Block):
+    elapsed = 0
+    started = time.perf_counter()
+    last = len(block.items) - 1
+    try:
+      for i, (dt_us, kind, payload) in enumerate(block.items):
+        await self.replay.sleep_scaled(dt_us - elapsed)
+        elapsed = dt_us
+        if i == last and self.replay.min_response_s:
+          # The gateway's fallback response.create timer runs in wall-clock time.
+          await asyncio.sleep(max(0.0, started + self.replay.min_response_s - time.perf_counter()))
+        if kind == rec.AOAI_IN_AUDIO:
+          delta = {"type": "response.output_audio.delta", "response_id": block.response_id, "delta": codec.b64encode_str(payload)}
+          await self.send(json.dumps(delta))
+        else:
+          await self.send(payload.decode("utf-8"))
+    except asyncio.CancelledError:
+      await self.send(json.dumps({"type": "response.done", "response": {"id": block.response_id, "status": "cancelled"}}))
+    finally:
+      await self.replay.count(finished=1)
+
+  async def on_event(self, ev: dict):
+    t = ev.get("type")
+    if t == "session.update":
+      await self.send(json.dumps({"type": "session.updated", "session": ev.get("session") or {}}))
+      self.replay.session_ready.set()
+    elif t == "input_audio_buffer.append":
+      self.replay.last_append = time.perf_counter()
+      self.claim()
+    elif t == "response.create":
+      self.claim()
+      self.replay.creates_us.append(self.replay.now_us())
+      if self.response is not None and not self.response.done():
+        await self.send(json.dumps({"type": "error", "error": {"code": "conversation_already_has_active_response"}}))
+        return
+      blocks = self.replay.script.create_blocks
+      if self.next_block < len(blocks):
+        block = blocks[self.next_block]
+        self.next_block += 1
+        self.start_block(block)
+        await self.replay.count()
+      else:
+        # More responses than recorded: answer with an empty one.
+        rid = f"resp_extra_{self.next_block}"
+        self.next_block += 1
+        await self.send(json.dumps({"type": "response.created", "response": {"id": rid, "status": "in_progress"}}))
+        await self.send(json.dumps({"type": "response.done", "response": {"id": rid, "status": "completed"}}))
+    elif t == "response.cancel":
+      self.replay.cancels += 1
+      if self.response is not None and not self.response.done():
+        self.response.cancel()
+
+  async def run(self):
+    await self.send(json.dumps({"type": "session.created", "session": {"id": "sess_replay"}}))
+    try:
+      async for msg in self.ws:
+        try:
+          ev = json.loads(msg)
+        except Exception:
+          continue
+        await self.on_event(ev)
+    except websockets.exceptions.ConnectionClosed:
+      pass
+    finally:
+      for t in list(self.tasks):
+        t.cancel()
+
+
+# --- ACS side ---
+
+
+async def _play_acs(uri: str, replay: Replay, call_id: str, drain_s: float) -> tuple[list[tuple[int, int]], int]:
+  out: list[tuple[int, int]] = []
+  stops = 0
+  last_rx = 0.0
+  # Faster than real time, the gateway's own timers can't keep up with the recording:
+  # hold the caller audio at each recorded turn until that response has played out.
+  sync = list(replay.script.creates) if replay.speed == 0 or replay.speed > 1 else []
+  turn = 0
+
+  async def receive(ws):
+    nonlocal stops, last_rx
+    async for msg in ws:
+      try:
+        ev = json.loads(msg)
+      except Exception:
+        continue
+      if ev.get("kind") == "AudioData":
+        data = (ev.get("audioData") or {}).get("data") or ""
+        out.append((replay.now_us(), len(codec.b64decode(data))))
+        last_rx = time.perf_counter()
+      elif ev.get("kind") == "StopAudio":
+        stops += 1
+
+  async with websockets.connect(uri, additional_headers={"x-ms-call-connection-id": call_id}, max_size=None) as ws:
+    rx = asyncio.create_task(receive(ws))
+    replay.t0 = time.perf_counter()
+    for t_us, text in replay.script.acs:
+      while turn < len(sync) and t_us > sync[turn]:
+        await replay.advance(sync[turn])
+        turn += 1
+        if not await replay.wait_turn(turn, 10.0):
+          print(f"warning: turn {turn}: no response.create within 10s; continuing")
+        # ... and until the gateway has played it out (no caller speech over it).
+        deadline = time.perf_counter() + 30.0
+        while time.perf_counter() < deadline and time.perf_counter() - last_rx < 0.3:
+          await asyncio.sleep(0.05)
+        if replay.speed > 0:
+          # Restart the clock so later records aren't sent in a burst.
+          replay.t0 = time.perf_counter() - t_us / 1e6 / replay.speed
+      if not replay.session_ready.is_set() and replay.position_us >= 0:
+        # Audio before the AOAI session exists would only fill the pre-ready buffer.
+        try:
+          await asyncio.wait_for(replay.session_ready.wait(), 15.0)
+        except asyncio.TimeoutError:
+          pass
+      if replay.speed > 0:
+        delay = replay.t0 + t_us / 1e6 / replay.speed - time.perf_counter()
+        if delay > 0:
+          await asyncio.sleep(delay)
+      else:
+        await asyncio.sleep(0)
+      await ws.send(text)
+      await replay.advance(t_us)
+    await replay.advance(1 << 62)
+    await asyncio.sleep(drain_s)
+    rx.cancel()
+  return out, stops
+
+
+def _free_port() -> int:
+  with socket.socket() as s:
+    s.bind(("127.0.0.1", 0))
+    return s.getsockname()[1]
+
+
+async def _wait_port(port: int, timeout_s: float = 20.0):
+  deadline = time.monotonic() + timeout_s
+  while time.monotonic() < deadline:
+    try:
+      _, w = await asyncio.open_connection("127.0.0.1", port)
+      w.close()
+      return
+    except OSError:
+      await asyncio.sleep(0.1)
+  raise SystemExit(f"media server did not start on port {port}")
+
+
+async def _replay(args, script: Script) -> dict:
+  replay = Replay(script, args.speed, args.min_response_ms)
+
+  async def peer(ws):
+    await PeerSession(ws, replay).run()
+
+  aoai_port = args.aoai_port or _free_port()
+  proc = None
+  async with websockets.serve(peer, "127.0.0.1", aoai_port, max_size=None):
+    if args.url:
+      uri = _normalize_base_url(args.url) + args.path
+    else:
+      port = _free_port()
+      env = dict(os.environ)
+      env.update(
+        {
+          "MEDIA_WS_HOST": "127.0.0.1",
+          "MEDIA_WS_PORT": str(port),
+          "MEDIA_WS_ENABLE_AOAI": "1",
+          "AZURE_OPENAI_ENDPOINT": f"http://127.0.0.1:{aoai_port}",
+          "AZURE_OPENAI_DEPLOYMENT": "replay",
+          "AZURE_OPENAI_API_KEY": "replay",
+          "MEDIA_WS_RECORD_DIR": args.record_dir or "",
+          "AOAI_POOL_MIN_SIZE": "0",
+        }
+      )
+      log = open(args.server_log, "w") if args.server_log else subprocess.DEVNULL
+      proc = subprocess.Popen(
+        [sys.executable, os.path.join(SERVER_ROOT, "scripts", "acs_media_ws_server.py")],
+        cwd=SERVER_ROOT,
+        env=env,
+        stdout=log,
+        stderr=subprocess.STDOUT,
+      )
+      await _wait_port(port)
+      uri = f"ws://127.0.0.1:{port}/ws/media"
+    try:
+      call_id = f"replay-{script.header.get('callConnectionId') or 'call'}"
+      out, stops = await _play_acs(uri, replay, call_id, args.drain_seconds)
+    finally:
+      if proc is not None:
+        proc.terminate()
+        try:
+          proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+          proc.kill()
+  return _report(replay.creates_us, out, replay.cancels, stops, script.sample_rate)
+
+
+def _dump(script: Script) -> None:
+  counts: dict[str, int] = {}
+  for kind, _, _ in script.records:
+    name = rec.KIND_NAMES.get(kind, str(kind))
+    counts[name] = counts.get(name, 0) + 1
+  duration = script.records[-1][1] / 1e6 if script.records else 0.0
+  print(json.dumps(script.header, ensure_ascii=False))
+  print(f"duration: {duration:.1f}s  records: {len(script.records)}  gaps: {script.gaps}")
+  for name, n in sorted(counts.items()):
+    print(f"  {name:<16} {n}")
+  print(f"responses: {len(script.create_blocks)} after response.create, {len(script.auto_blocks)} server-initiated")
+
+
+def main() -> int:
+  ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+  ap.add_argument("recording")
+  ap.add_argument("--speed", type=float, default=1.0, help="1 = real time, 2 = twice as fast, 0 = as fast as possible.")
+  ap.add_argument("--url", help="Use a running gateway instead of starting the standalone media server.")
+  ap.add_argument("--path", default="/ws/media")
+  ap.add_argument("--aoai-port", type=int, default=0, help="Fake AOAI peer port (required with --url).")
+  ap.add_argument(
+    "--min-response-ms",
+    type=int,
+    default=int(os.getenv("MEDIA_WS_AOAI_RESPONSE_FALLBACK_DELAY_MS", "600")) + 200,
+    help="Faster replays: shortest response (keeps the gateway's fallback timer from firing).",
+  )
+  ap.add_argument("--drain-seconds", type=float, default=3.0, help="Wait after the last frame for playout.")
+  ap.add_argument("--record-dir", help="Re-record the replayed call here (spawned server only).")
+  ap.add_argument("--server-log", help="Write the spawned media server's log to this file.")
+  ap.add_argument("--dump", action="store_true", help="Summarize the recording and exit.")
+  ap.add_argument("--check", action="store_true", help="Exit 1 when the replay diverges from the recording.")
+  ap.add_argument("--tolerance-ms", type=float, default=100.0, help="Allowed first-audio latency increase for --check.")
+  ap.add_argument("--json", help="Write the comparison as JSON to this path.")
+  args = ap.parse_args()
+  if args.url and not args.aoai_port:
+    ap.error("--url needs --aoai-port (the gateway's AZURE_OPENAI_ENDPOINT must point at it)")
+
+  script = Script(args.recording)
+  if args.dump:
+    _dump(script)
+    return 0
+  if script.gaps:
+    print(f"warning: recording has {script.gaps} gap(s) (records dropped while recording)")
+
+  recorded = script.recorded_report()
+  replayed = asyncio.run(_replay(args, script))
+  print(f"{'metric':<18} {'recorded':>10} {'replayed':>10}")
+  for key in recorded:
+    r0, r1 = recorded[key], replayed[key]
+    print(f"{key:<18} {'-' if r0 is None else r0:>10} {'-' if r1 is None else r1:>10}")
+
+  problems = []
+  for key in ("responsesCreated", "cancels", "stopAudio"):
+    if recorded[key] != replayed[key]:
+      problems.append(f"{key}: {recorded[key]} -> {replayed[key]}")
+  if recorded["firstAudioMsP50"] is not None and replayed["firstAudioMsP50"] is not None:
+    if replayed["firstAudioMsP50"] > recorded["firstAudioMsP50"] + args.tolerance_ms:
+      problems.append(f"firstAudioMsP50: {recorded['firstAudioMsP50']} -> {replayed['firstAudioMsP50']}")
+  for p in problems:
+    print("diverged:", p)
+  if args.json:
+    with open(args.json, "w", encoding="utf-8") as f:
+      json.dump(
+        {"tool": "replay_call", "recording": args.recording, "speed": args.speed, "recorded": recorded, "replayed": replayed, "diverged": problems},
+        f,
+        indent=2,
+        ensure_ascii=False,
+      )
+  return 1 if args.check and problems else 0
+
+
+if __name__ == "__main__":
+  raise SystemExit(main())
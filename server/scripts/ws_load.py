@@ -0,0 +1,371 @@
+#!/usr/bin/env python3
+"""Simulate N concurrent ACS media-streaming calls against the gateway's /ws/media.
+
+Each call sends `AudioMetadata`, then `AudioData` paced in real time (20 ms frames)
+from WAV files (16-bit PCM, 16 or 24 kHz; looped) or, without --wav, a synthetic
+"speak 1.5 s / pause 4 s" pattern. Run the gateway against
+`scripts/fake_aoai_realtime.py` so every pause produces a scripted response.
+
+Concurrency ramps through --ramp; each step reports:
+- turn latency: last voiced frame sent -> first AudioData received back (p50/p95/max);
+  includes the (fake) server VAD silence duration
+- dropped frames: response audio expected (responses x --response-ms) but not received
+- connect/call errors and how often the load generator itself fell behind real time
+- gateway CPU %, RSS and event-loop lag p99 from its /metrics (one worker per scrape
+  when GATEWAY_WORKERS > 1)
+
+Choose WAVs whose pauses are longer than a response, otherwise caller speech barges
+in and truncated responses count as dropped frames.
+
+Usage (from `server/`):
+  python scripts/ws_load.py --url http://127.0.0.1:8000 --ramp 10,25,50,100 --step-seconds 30 \
+    [--wav a.wav --wav b.wav] [--fake-aoai http://127.0.0.1:18765] [--json out.json]
+"""
+
+import argparse
+import array
+import asyncio
+import base64
+import json
+import math
+import os
+import statistics
+import sys
+import time
+import urllib.request
+import wave
+
+import websockets
+
+try:
+  from scripts.ws_probe import _normalize_base_url
+except ImportError:  # run as `python scripts/ws_load.py`
+  from ws_probe import _normalize_base_url
+
+FRAME_MS = 20
+VOICED_DB = -40.0
+
+
+# --- audio source ---
+
+
+def _frame_db(frame: bytes) -> float:
+  a = array.array("h")
+  a.frombytes(frame[: len(frame) - len(frame) % 2])
+  if sys.byteorder != "little":
+    a.byteswap()
+  if not a:
+    return -120.0
+  ms = sum(x * x for x in a) / len(a)
+  return 10 * math.log10(ms / (32768.0 * 32768.0)) if ms > 0 else -120.0
+
+
+def _load_wav(path: str) -> tuple[int, int, bytes]:
+  with wave.open(path, "rb") as w:
+    if w.getsampwidth() != 2 or w.getcomptype() != "NONE":
+      raise SystemExit(f"{path}: only 16-bit PCM WAV is supported")
+    rate = w.getframerate()
+    if rate not in (16000, 24000):
+      raise SystemExit(f"{path}: sample rate {rate} (ACS streams 16000 or 24000 Hz)")
+    return rate, w.getnchannels(), w.readframes(w.getnframes())
+
+
+def _synthetic(rate: int, speech_ms: int = 1500, pause_ms: int = 4000) -> bytes:
+  n_speech = rate * speech_ms // 1000
+  a = array.array("h")
+  for i in range(n_speech):
+    env = 0.3 + 0.7 * abs(math.sin(math.pi * 4 * i / rate))
+    v = math.sin(2 * math.pi * 150 * i / rate) + 0.5 * math.sin(2 * math.pi * 300 * i / rate)
+    a.append(int(5000 * env * v))
+  a.extend([0] * (rate * pause_ms // 1000))
+  if sys.byteorder != "little":
+    a.byteswap()
+  return a.tobytes()
+
+
+class Source:
+  """Pre-encoded AudioData messages with a per-frame voiced flag."""
+
+  def __init__(self, name: str, rate: int, channels: int, pcm: bytes):
+    self.name = name
+    self.rate = rate
+    self.channels = channels
+    size = rate * FRAME_MS // 1000 * 2 * channels
+    self.frames: list[tuple[str, bool]] = []
+    for off in range(0, len(pcm) - size + 1, size):
+      frame = pcm[off : off + size]
+      msg = json.dumps({"kind": "AudioData", "audioData": {"data": base64.b64encode(frame).decode("ascii"), "silent": False}})
+      self.frames.append((msg, _frame_db(frame) >= VOICED_DB))
+    if not self.frames:
+      raise SystemExit(f"{name}: shorter than one frame")
+    self.metadata = json.dumps(
+      {"kind": "AudioMetadata", "audioMetadata": {"encoding": "PCM", "sampleRate": rate, "channels": channels, "length": size}}
+    )
+
+
+# --- one simulated call ---
+
+
+class CallResult:
+  __slots__ = ("latencies_ms", "responses", "recv_ms", "stops", "behind", "error")
+
+  def __init__(self):
+    self.latencies_ms: list[float] = []
+    self.responses = 0
+    self.recv_ms = 0.0
+    self.stops = 0
+    self.behind = 0
+    self.error: str | None = None
+
+
+async def _run_call(uri: str, call_id: str, src: Source, *, offset: int, seconds: float, drain_s: float) -> CallResult:
+  res = CallResult()
+  speech_end: float | None = None
+  # The gateway always sends mono audio back to ACS (at the call's sample rate); the
+  # channel count only sizes the outgoing frames.
+  recv_bytes_per_ms = src.rate * 2 / 1000.0
+
+  async def receive(ws):
+    nonlocal speech_end
+    async for msg in ws:
+      if isinstance(msg, bytes):
+        msg = msg.decode("utf-8", "replace")
+      try:
+        ev = json.loads(msg)
+      except Exception:
+        continue
+      kind = ev.get("kind")
+      if kind == "AudioData":
+        data = (ev.get("audioData") or {}).get("data") or ""
+        res.recv_ms += (len(data) * 3 // 4) / recv_bytes_per_ms
+        if speech_end is not None:
+          res.latencies_ms.append((time.perf_counter() - speech_end) * 1000.0)
+          res.responses += 1
+          speech_end = None
+      elif kind == "StopAudio":
+        res.stops += 1
+
+  try:
+    async with websockets.connect(
+      uri, additional_headers={"x-ms-call-connection-id": call_id}, open_timeout=15, max_size=None
+    ) as ws:
+      rx = asyncio.create_task(receive(ws))
+      await ws.send(src.metadata)
+      frames = src.frames
+      n = len(frames)
+      was_voiced = False
+      t0 = time.perf_counter()
+      end = t0 + seconds
+      i = 0
+      while True:
+        due = t0 + i * FRAME_MS / 1000.0
+        if due >= end:
+          break
+        delay = due - time.perf_counter()
+        if delay > 0:
+          await asyncio.sleep(delay)
+        elif delay < -FRAME_MS / 1000.0:
+          res.behind += 1
+        msg, voiced = frames[(offset + i) % n]
+        await ws.send(msg)
+        now = time.perf_counter()
+        if voiced:
+          # Caller talks again: a response still pending is no longer a clean turn.
+          speech_end = None
+        elif was_voiced:
+          speech_end = now
+        was_voiced = voiced
+        i += 1
+      # Let the last response play out.
+      await asyncio.sleep(drain_s)
+      rx.cancel()
+  except Exception as e:
+    res.error = f"{type(e).__name__}: {e}"
+  return res
+
+
+# --- gateway / fake AOAI observation ---
+
+
+def _get(url: str, timeout: float = 5.0) -> str | None:
+  try:
+    with urllib.request.urlopen(url, timeout=timeout) as r:
+      return r.read().decode("utf-8")
+  except Exception:
+    return None
+
+
+def _parse_prom(text: str | None) -> dict:
+  out: dict = {"lag_buckets": {}}
+  for line in (text or "").splitlines():
+    if not line or line.startswith("#"):
+      continue
+    name, _, value = line.rpartition(" ")
+    try:
+      v = float(value)
+    except ValueError:
+      continue
+    if name == "process_cpu_seconds_total":
+      out["cpu"] = v
+    elif name == "process_resident_memory_bytes":
+      out["rss"] = v
+    elif name == "acs_media_active_calls":
+      out["active"] = v
+    elif name.startswith("event_loop_lag_seconds_bucket"):
+      le = name.split('le="', 1)[1].split('"', 1)[0]
+      out["lag_buckets"][float("inf") if le == "+Inf" else float(le)] = v
+  return out
+
+
+def _lag_p99_ms(before: dict, after: dict) -> float | None:
+  b0, b1 = before.get("lag_buckets") or {}, after.get("lag_buckets") or {}
+  bounds = sorted(b1)
+  if not bounds:
+    return None
+  deltas = [(le, b1[le] - b0.get(le, 0.0)) for le in bounds]
+  total = deltas[-1][1]
+  if total <= 0:
+    return None
+  for le, cum in deltas:
+    if cum >= 0.99 * total:
+      return le * 1000.0 if le != float("inf") else float("inf")
+  return None
+
+
+def _pct(values: list[float], p: float) -> float | None:
+  if not values:
+    return None
+  s = sorted(values)
+  return s[min(len(s) - 1, max(0, int(round(p / 100.0 * (len(s) - 1)))))]
+
+
+async def _step(uri: str, sources: list[Source], calls: int, *, step: int, seconds: float, drain_s: float, metrics_url: str | None, response_ms: int) -> dict:
+  before = _parse_prom(_get(metrics_url)) if metrics_url else {}
+  cpu0, w0 = time.process_time(), time.perf_counter()
+  coros = []
+  for i in range(calls):
+    src = sources[i % len(sources)]
+    # Spread calls over the source so they don't all talk at once.
+    offset = (i * 7919) % len(src.frames)
+    coros.append(_run_call(uri, f"load-{step}-{i}", src, offset=offset, seconds=seconds, drain_s=drain_s))
+  results = await asyncio.gather(*coros)
+  cpu1, w1 = time.process_time(), time.perf_counter()
+  after = _parse_prom(_get(metrics_url)) if metrics_url else {}
+
+  lat = [x for r in results for x in r.latencies_ms]
+  responses = sum(r.responses for r in results)
+  expected_ms = responses * response_ms
+  recv_ms = sum(r.recv_ms for r in results)
+  dropped_ms = max(0.0, expected_ms - recv_ms)
+  errors = [r.error for r in results if r.error]
+  gw_cpu = None
+  if "cpu" in before and "cpu" in after:
+    gw_cpu = round(100.0 * (after["cpu"] - before["cpu"]) / (w1 - w0), 1)
+  p99 = _lag_p99_ms(before, after)
+  return {
+    "calls": calls,
+    "turns": len(lat),
+    "latencyMsP50": round(statistics.median(lat), 1) if lat else None,
+    "latencyMsP95": round(_pct(lat, 95), 1) if lat else None,
+    "latencyMsMax": round(max(lat), 1) if lat else None,
+    "droppedFrames": int(dropped_ms // FRAME_MS),
+    "droppedPct": round(100.0 * dropped_ms / expected_ms, 1) if expected_ms else 0.0,
+    "stopAudio": sum(r.stops for r in results),
+    "errors": len(errors),
+    "errorSample": errors[:3],
+    "clientBehindFrames": sum(r.behind for r in results),
+    "clientCpuPct": round(100.0 * (cpu1 - cpu0) / (w1 - w0), 1),
+    "gatewayCpuPct": gw_cpu,
+    "gatewayRssMb": round(after["rss"] / 1e6, 1) if "rss" in after else None,
+    "gatewayLoopLagMsP99": p99,
+  }
+
+
+def _fmt(v, spec: str = "") -> str:
+  if v is None:
+    return "-"
+  return format(v, spec) if spec else str(v)
+
+
+def main() -> int:
+  ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+  ap.add_argument("--url", default=os.getenv("CALLBACK_URI_HOST", "http://127.0.0.1:8000"), help="Gateway base URL.")
+  ap.add_argument("--path", default="/ws/media")
+  ap.add_argument("--wav", action="append", default=[], help="16-bit PCM WAV (16/24 kHz), repeatable; looped.")
+  ap.add_argument("--rate", type=int, default=16000, help="Sample rate of the synthetic source (no --wav).")
+  ap.add_argument("--ramp", default="1,5,10,25,50", help="Comma-separated concurrent call counts.")
+  ap.add_argument("--step-seconds", type=float, default=30.0)
+  ap.add_argument("--response-ms", type=int, default=2000, help="Audio per response (fake_aoai_realtime --response-ms).")
+  ap.add_argument("--fake-aoai", help="fake_aoai_realtime base URL; its /stats supplies --response-ms and counters.")
+  ap.add_argument("--metrics-url", help="Gateway Prometheus endpoint (default: <url>/metrics).")
+  ap.add_argument("--no-metrics", action="store_true")
+  ap.add_argument("--max-p95-ms", type=float, default=0.0, help="Stop the ramp once turn latency p95 exceeds this.")
+  ap.add_argument("--max-drop-pct", type=float, default=0.0, help="Stop the ramp once dropped frames exceed this %%.")
+  ap.add_argument("--json", help="Write results as JSON to this path.")
+  args = ap.parse_args()
+
+  base = _normalize_base_url(args.url)
+  uri = f"{base}{args.path}"
+  http_base = "http" + base[2:] if base.startswith("ws") else base
+  metrics_url = None if args.no_metrics else (args.metrics_url or f"{http_base}/metrics")
+
+  response_ms = args.response_ms
+  if args.fake_aoai:
+    st = _get(args.fake_aoai.rstrip("/") + "/stats")
+    if st:
+      response_ms = int(json.loads(st)["config"]["responseMs"])
+  drain_s = response_ms / 1000.0 + 1.5
+
+  if args.wav:
+    sources = [Source(p, *_load_wav(p)) for p in args.wav]
+  else:
+    sources = [Source("synthetic", args.rate, 1, _synthetic(args.rate))]
+
+  ramp = [int(x) for x in args.ramp.split(",") if x.strip()]
+  print(f"uri: {uri}  metrics: {metrics_url or '-'}  sources: {', '.join(s.name for s in sources)}")
+  header = (
+    f"{'calls':>5} {'turns':>6} {'lat p50':>8} {'lat p95':>8} {'lat max':>8} {'drop%':>6} {'err':>4} "
+    f"{'gw cpu%':>8} {'gw MB':>7} {'lag p99':>8} {'cli cpu%':>8} {'behind':>6}"
+  )
+  print(header)
+  rows = []
+  capacity = None
+  for step, calls in enumerate(ramp):
+    r = asyncio.run(
+      _step(uri, sources, calls, step=step, seconds=args.step_seconds, drain_s=drain_s, metrics_url=metrics_url, response_ms=response_ms)
+    )
+    rows.append(r)
+    print(
+      f"{calls:>5} {r['turns']:>6} {_fmt(r['latencyMsP50'], '.0f'):>8} {_fmt(r['latencyMsP95'], '.0f'):>8} "
+      f"{_fmt(r['latencyMsMax'], '.0f'):>8} {r['droppedPct']:>6.1f} {r['errors']:>4} {_fmt(r['gatewayCpuPct']):>8} "
+      f"{_fmt(r['gatewayRssMb']):>7} {_fmt(r['gatewayLoopLagMsP99']):>8} {r['clientCpuPct']:>8} {r['clientBehindFrames']:>6}"
+    )
+    if r["errorSample"]:
+      print("  errors:", "; ".join(r["errorSample"]))
+    failed = (
+      r["errors"] > 0
+      or (args.max_p95_ms and (r["latencyMsP95"] or 0) > args.max_p95_ms)
+      or (args.max_drop_pct and r["droppedPct"] > args.max_drop_pct)
+    )
+    if failed:
+      print(f"stopping ramp: limits exceeded at {calls} calls")
+      break
+    capacity = calls
+  print(f"capacity (last step within limits): {capacity if capacity is not None else '-'} calls")
+
+  fake_stats = json.loads(_get(args.fake_aoai.rstrip("/") + "/stats") or "null") if args.fake_aoai else None
+  if fake_stats:
+    print("fake AOAI:", json.dumps(fake_stats, ensure_ascii=False))
+  if args.json:
+    with open(args.json, "w", encoding="utf-8") as f:
+      json.dump(
+        {"tool": "ws_load", "uri": uri, "responseMs": response_ms, "capacity": capacity, "steps": rows, "fakeAoai": fake_stats},
+        f,
+        indent=2,
+        ensure_ascii=False,
+      )
+  return 0
+
+
+if __name__ == "__main__":
+  raise SystemExit(main())
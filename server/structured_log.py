@@ -0,0 +1,191 @@
+from __future__ import annotations
+
+import atexit
+import contextvars
+import json
+import os
+import queue
+import sys
+import threading
+import time
+
+import metrics
+
+# Non-blocking structured logging.
+#
+# `log(event, fields)` has the same shape as the previous `print("Event", {...})`
+# calls, but only builds a small dict and hands it to a queue; a background thread
+# serializes and writes it. A slow stdout pipe (container logging) therefore never
+# blocks the event loop.
+#
+# - Call context: `bind_call(call_id)` sets a contextvar that tasks created
+#   afterwards inherit; records without `callConnectionId` get it added.
+# - Sampling / rate limiting per event (or per `event:type` when the record has a
+#   `type` field, e.g. "AOAI event:response.created"):
+#     LOG_SAMPLE="AOAI event=10,AudioData stats=5"   (keep 1 in N)
+#     LOG_RATE_LIMIT="AOAI event=50"                  (max records per second)
+# - LOG_FORMAT=json (default) | text ("Event {...}" lines, as before).
+# - The queue is bounded (LOG_QUEUE_MAX); overflow is dropped and counted.
+# Time spent inside log() and dropped records are exported via metrics.py.
+
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json").strip().lower()
+LOG_QUEUE_MAX = int(os.getenv("LOG_QUEUE_MAX", "10000"))
+
+_call_id: contextvars.ContextVar[str | None] = contextvars.ContextVar("call_id", default=None)
+
+
+def bind_call(call_id: str | None) -> None:
+  """Attach a call id to records logged from this context (and tasks started from it)."""
+  _call_id.set(call_id)
+
+
+def _parse_rules(raw: str | None) -> dict[str, int]:
+  rules: dict[str, int] = {}
+  for part in (raw or "").split(","):
+    key, sep, value = part.rpartition("=")
+    if not sep or not key.strip():
+      continue
+    try:
+      rules[key.strip()] = max(1, int(value))
+    except ValueError:
+      continue
+  return rules
+
+
+class _Rule:
+  __slots__ = ("sample_every", "per_second", "seen", "window_s", "window_count")
+
+  def __init__(self, sample_every: int = 1, per_second: int = 0):
+    self.sample_every = sample_every
+    self.per_second = per_second
+    self.seen = 0
+    self.window_s = 0
+    self.window_count = 0
+
+
+def _build_rules() -> dict[str, _Rule]:
+  rules: dict[str, _Rule] = {}
+  for key, n in _parse_rules(os.getenv("LOG_SAMPLE")).items():
+    rules.setdefault(key, _Rule()).sample_every = n
+  for key, n in _parse_rules(os.getenv("LOG_RATE_LIMIT")).items():
+    rules.setdefault(key, _Rule()).per_second = n
+  return rules
+
+
+_RULES = _build_rules()
+_TYPED_RULES = any(":" in k for k in _RULES)
+
+
+def _allow(rule: _Rule, now: float) -> bool:
+  rule.seen += 1
+  if rule.sample_every > 1 and rule.seen % rule.sample_every != 1:
+    metrics.LOG_DROPPED["sampled"].inc()
+    return False
+  if rule.per_second:
+    second = int(now)
+    if second != rule.window_s:
+      rule.window_s = second
+      rule.window_count = 0
+    rule.window_count += 1
+    if rule.window_count > rule.per_second:
+      metrics.LOG_DROPPED["rate_limited"].inc()
+      return False
+  return True
+
+
+class _Writer:
+  """Background thread that drains the record queue to a stream."""
+
+  def __init__(self, stream=None, *, max_queue: int = LOG_QUEUE_MAX, fmt: str = LOG_FORMAT):
+    self.stream = stream
+    self.max_queue = max(1, int(max_queue))
+    self.fmt = fmt
+    self.queue: queue.SimpleQueue = queue.SimpleQueue()
+    self._thread: threading.Thread | None = None
+    self._lock = threading.Lock()
+
+  def put(self, record: dict) -> None:
+    if self.queue.qsize() >= self.max_queue:
+      metrics.LOG_DROPPED["queue_full"].inc()
+      return
+    self.queue.put(record)
+    metrics.LOG_RECORDS.inc()
+    if self._thread is None:
+      self._start()
+
+  def _start(self) -> None:
+    with self._lock:
+      if self._thread is None:
+        self._thread = threading.Thread(target=self._run, name="structured-log", daemon=True)
+        self._thread.start()
+
+  def _format(self, record: dict) -> str:
+    if self.fmt == "text":
+      event = record.pop("event")
+      record.pop("ts", None)
+      record.pop("level", None)
+      return f"{event} {record}" if record else str(event)
+    return json.dumps(record, ensure_ascii=False, default=str)
+
+  def _write(self, record: dict) -> None:
+    stream = self.stream or sys.stdout
+    try:
+      stream.write(self._format(record) + "\n")
+    except Exception:
+      return
+
+  def _run(self) -> None:
+    q = self.queue
+    while True:
+      record = q.get()
+      if record is None:
+        break
+      self._write(record)
+      # Flush once per burst rather than per line.
+      if q.empty():
+        try:
+          (self.stream or sys.stdout).flush()
+        except Exception:
+          pass
+
+  def flush(self, timeout: float = 2.0) -> None:
+    """Best effort: wait until queued records are written (used at exit)."""
+    deadline = time.monotonic() + timeout
+    while not self.queue.empty() and time.monotonic() < deadline:
+      time.sleep(0.01)
+    try:
+      (self.stream or sys.stdout).flush()
+    except Exception:
+      pass
+
+
+_WRITER = _Writer()
+atexit.register(_WRITER.flush)
+
+
+def log(event: str, fields: dict | None = None, *, level: str = "info") -> None:
+  """Queue one structured record; never blocks on I/O."""
+  t0 = time.perf_counter_ns()
+  now = time.time()
+  if _RULES:
+    rule = None
+    if _TYPED_RULES and fields and "type" in fields:
+      rule = _RULES.get(f"{event}:{fields['type']}")
+    if rule is None:
+      rule = _RULES.get(event)
+    if rule is not None and not _allow(rule, now):
+      metrics.LOG_CALL_SECONDS.inc(time.perf_counter_ns() - t0)
+      return
+  record = {"ts": round(now, 3), "level": level, "event": event}
+  if fields:
+    record.update(fields)
+  if "callConnectionId" not in record:
+    call_id = _call_id.get()
+    if call_id is not None:
+      record["callConnectionId"] = call_id
+  _WRITER.put(record)
+  metrics.LOG_CALL_SECONDS.inc(time.perf_counter_ns() - t0)
+
+
+def flush(timeout: float = 2.0) -> None:
+  _WRITER.flush(timeout)
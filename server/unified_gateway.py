@@ -3,6 +3,7 @@ from __future__ import annotations
 import asyncio
 import os
 import pathlib
+import time
 from contextlib import suppress
 from typing import Any, Callable
 
@@ -11,16 +12,28 @@ from aiohttp import web
 import httpx
 import uvicorn
 
+import admission
+import asgi_bridge
+import loop_backend
+import loop_monitor
+import metrics
+from structured_log import log
+
 # Reuse the proven ACS Media Streaming handler logic.
 # We'll run it *inside* the gateway by adapting aiohttp's WebSocket to look like
 # a websockets-style connection object.
 from scripts.acs_media_ws_server import handler as acs_media_ws_handler
 from scripts.acs_media_ws_server import _log_audio_config as _log_media_audio_config
+from scripts.acs_media_ws_server import _start_aoai_session_pool, _close_aoai_session_pool
 
 PUBLIC_HOST = os.getenv("CALLBACK_URI_HOST", "").rstrip("/")
 
 GATEWAY_HOST = os.getenv("GATEWAY_HOST", "0.0.0.0")
 GATEWAY_PORT = int(os.getenv("GATEWAY_PORT", "8000"))
+# Worker processes sharing GATEWAY_PORT via SO_REUSEPORT (gateway_supervisor.py).
+# 1 = single process (default). Workers load the FastAPI app from GATEWAY_FASTAPI_APP.
+GATEWAY_WORKERS = max(1, int(os.getenv("GATEWAY_WORKERS", "1")))
+GATEWAY_FASTAPI_APP = os.getenv("GATEWAY_FASTAPI_APP", "app:app").strip() or "app:app"
 
 # Internal FastAPI endpoint. We default to a Unix domain socket to avoid extra TCP ports.
 FASTAPI_UDS = (os.getenv("FASTAPI_UDS") or "").strip()
@@ -28,8 +41,29 @@ if not FASTAPI_UDS:
   # Keep it inside the repo (and unique per workspace) to avoid permission issues.
   FASTAPI_UDS = str(pathlib.Path(__file__).resolve().parent / ".run" / "fastapi.sock")
 
+# How HTTP requests reach FastAPI:
+# - uds:  run uvicorn on FASTAPI_UDS and reverse-proxy over it (default, proven path)
+# - asgi: call the FastAPI app in-process through an ASGI bridge (no socket hop)
+FASTAPI_MODE = (os.getenv("GATEWAY_FASTAPI_MODE", "uds").strip().lower() or "uds")
+if FASTAPI_MODE not in ("uds", "asgi"):
+  FASTAPI_MODE = "uds"
+
 # Exposed WebSocket endpoints handled by the gateway.
 MEDIA_WS_PATH = os.getenv("GATEWAY_MEDIA_WS_PATH", "/ws/media").strip() or "/ws/media"
+# Prometheus text exposition of in-process metrics (media/AOAI; see metrics.py).
+METRICS_PATH = os.getenv("GATEWAY_METRICS_PATH", "/metrics").strip() or "/metrics"
+# Largest inbound WS message accepted on the media socket (ACS frames are a few KB).
+# 0 disables the limit (unbounded memory per message); not recommended.
+WS_MAX_MSG_SIZE = int(os.getenv("GATEWAY_WS_MAX_MSG_SIZE", str(1024 * 1024)))
+
+# Upstream (gateway -> FastAPI) connection pool and timeouts.
+UPSTREAM_MAX_CONNECTIONS = int(os.getenv("GATEWAY_UPSTREAM_MAX_CONNECTIONS", "100"))
+UPSTREAM_MAX_KEEPALIVE = int(os.getenv("GATEWAY_UPSTREAM_MAX_KEEPALIVE", "20"))
+UPSTREAM_KEEPALIVE_EXPIRY_S = float(os.getenv("GATEWAY_UPSTREAM_KEEPALIVE_EXPIRY_S", "30"))
+UPSTREAM_CONNECT_TIMEOUT_S = float(os.getenv("GATEWAY_UPSTREAM_CONNECT_TIMEOUT_S", "5"))
+UPSTREAM_READ_TIMEOUT_S = float(os.getenv("GATEWAY_UPSTREAM_TIMEOUT_S", "60"))
+UPSTREAM_POOL_TIMEOUT_S = float(os.getenv("GATEWAY_UPSTREAM_POOL_TIMEOUT_S", "10"))
+UPSTREAM_CHUNK_BYTES = int(os.getenv("GATEWAY_UPSTREAM_CHUNK_BYTES", "65536"))
 
 
 class _WSRequest:
@@ -44,7 +78,8 @@ class _AiohttpWSAdapter:
   def __init__(self, request: web.Request, ws: web.WebSocketResponse):
     # The upstream handler expects lower-case header keys.
     hdrs = {k.lower(): v for k, v in request.headers.items()}
-    self.request = _WSRequest(path=request.path, headers=hdrs)
+    # Keep the query string: it carries per-call options (e.g. ?profile=...).
+    self.request = _WSRequest(path=request.path_qs, headers=hdrs)
     self._ws = ws
 
   def __aiter__(self):
@@ -65,14 +100,13 @@ class _AiohttpWSAdapter:
     else:
       await self._ws.send_str(str(data))
 
+  async def close(self, code: int = 1000, reason: str = ""):
+    await self._ws.close(code=code, message=reason.encode("utf-8"))
 
-async def _proxy_http(request: web.Request) -> web.StreamResponse:
-  """Reverse proxy all HTTP requests to the internal FastAPI server."""
-  # Always proxy to FastAPI via UDS (single public port design).
-  upstream = f"http://fastapi{request.rel_url}"
 
-  # Copy headers but drop hop-by-hop headers.
-  hop_by_hop = {
+# Hop-by-hop headers are connection-scoped and must not be forwarded by a proxy.
+_HOP_BY_HOP = frozenset(
+  {
     "connection",
     "keep-alive",
     "proxy-authenticate",
@@ -82,48 +116,116 @@ async def _proxy_http(request: web.Request) -> web.StreamResponse:
     "transfer-encoding",
     "upgrade",
   }
-  headers = {k: v for k, v in request.headers.items() if k.lower() not in hop_by_hop}
+)
 
-  body = await request.read()
+UPSTREAM_CLIENT_KEY = web.AppKey("upstream_client", httpx.AsyncClient)
+ASGI_APP_KEY = web.AppKey("asgi_app", object)
 
-  transport = httpx.AsyncHTTPTransport(uds=FASTAPI_UDS)
-  async with httpx.AsyncClient(timeout=httpx.Timeout(60.0), transport=transport) as client:
-    resp = await client.request(
-      request.method,
-      upstream,
-      headers=headers,
-      content=body,
-    )
 
-  out = web.Response(status=resp.status_code, body=resp.content)
-  for k, v in resp.headers.items():
-    if k.lower() in hop_by_hop:
-      continue
-    # aiohttp forbids setting some headers; ignore failures.
-    with suppress(Exception):
-      out.headers[k] = v
-  return out
+def create_upstream_client(*, uds_path: str | None = None) -> httpx.AsyncClient:
+  """Create the long-lived, pooled client used to reach FastAPI over UDS.
+
+  One client is shared by every proxied request so UDS connections are kept
+  alive and reused instead of being opened/torn down per request.
+  """
+  limits = httpx.Limits(
+    max_connections=UPSTREAM_MAX_CONNECTIONS,
+    max_keepalive_connections=UPSTREAM_MAX_KEEPALIVE,
+    keepalive_expiry=UPSTREAM_KEEPALIVE_EXPIRY_S,
+  )
+  timeout = httpx.Timeout(
+    UPSTREAM_READ_TIMEOUT_S,
+    connect=UPSTREAM_CONNECT_TIMEOUT_S,
+    pool=UPSTREAM_POOL_TIMEOUT_S,
+  )
+  transport = httpx.AsyncHTTPTransport(uds=uds_path or FASTAPI_UDS, limits=limits)
+  return httpx.AsyncClient(timeout=timeout, transport=transport)
+
+
+async def _proxy_http(request: web.Request) -> web.StreamResponse:
+  """Reverse proxy all HTTP requests to the internal FastAPI server.
+
+  Request and response bodies are streamed chunk by chunk; nothing is buffered
+  in full on either side.
+  """
+  client = request.app[UPSTREAM_CLIENT_KEY]
+  # Always proxy to FastAPI via UDS (single public port design).
+  upstream = f"http://fastapi{request.rel_url}"
+
+  # Copy headers but drop hop-by-hop headers.
+  headers = {k: v for k, v in request.headers.items() if k.lower() not in _HOP_BY_HOP}
+
+  content = None
+  if request.body_exists:
+    content = request.content.iter_chunked(UPSTREAM_CHUNK_BYTES)
+
+  upstream_req = client.build_request(request.method, upstream, headers=headers, content=content)
+  try:
+    resp = await client.send(upstream_req, stream=True)
+  except httpx.TimeoutException:
+    return web.json_response({"error": "upstream timeout"}, status=504)
+  except httpx.TransportError as e:
+    return web.json_response({"error": "upstream unavailable", "details": repr(e)}, status=502)
+
+  try:
+    out = web.StreamResponse(status=resp.status_code, reason=resp.reason_phrase or None)
+    for k, v in resp.headers.multi_items():
+      if k.lower() in _HOP_BY_HOP:
+        continue
+      # aiohttp forbids setting some headers; ignore failures.
+      with suppress(Exception):
+        out.headers.add(k, v)
+    # Without an upstream Content-Length aiohttp falls back to chunked encoding.
+    await out.prepare(request)
+    # Raw bytes: Content-Encoding is passed through untouched.
+    async for chunk in resp.aiter_raw():
+      await out.write(chunk)
+    await out.write_eof()
+    return out
+  finally:
+    await resp.aclose()
 
 
 async def gateway_handler(request: web.Request) -> web.StreamResponse:
+  asgi_app = request.app.get(ASGI_APP_KEY)
+  if asgi_app is not None:
+    return await asgi_bridge.dispatch(request, asgi_app)
   return await _proxy_http(request)
 
 
+async def metrics_handler(request: web.Request) -> web.Response:
+  return web.Response(body=metrics.render().encode("utf-8"), headers={"Content-Type": metrics.CONTENT_TYPE})
+
+
 async def ws_media(request: web.Request) -> web.StreamResponse:
-  ws = web.WebSocketResponse(autoping=True, max_msg_size=0)
-  await ws.prepare(request)
-  adapter = _AiohttpWSAdapter(request, ws)
-  # Run the existing handler until the socket closes.
-  await acs_media_ws_handler(adapter)
-  return ws
+  # Admission control (admission.py): reject before the upgrade so ACS sees a plain 503.
+  call_id = request.headers.get("x-ms-call-connection-id")
+  reason = await admission.ADMISSION.acquire(call_id)
+  if reason is not None:
+    capacity = admission.ADMISSION.capacity()
+    log("Media WS rejected (admission)", {"callConnectionId": call_id, "reason": reason, "capacity": capacity}, level="warning")
+    return web.json_response(
+      {"error": "gateway at capacity", "reason": reason, "capacity": capacity},
+      status=503,
+      headers={"Retry-After": str(admission.RETRY_AFTER_S)},
+    )
+  try:
+    ws = web.WebSocketResponse(autoping=True, max_msg_size=WS_MAX_MSG_SIZE)
+    await ws.prepare(request)
+    adapter = _AiohttpWSAdapter(request, ws)
+    # Run the existing handler until the socket closes.
+    await acs_media_ws_handler(adapter)
+    return ws
+  finally:
+    admission.ADMISSION.release()
 
 
 ASGIApp = Any
 
 
-async def start_fastapi(*, fastapi_app: ASGIApp) -> uvicorn.Server:
+async def start_fastapi(*, fastapi_app: ASGIApp, uds: str | None = None) -> uvicorn.Server:
   # Ensure UDS dir exists and old socket is removed.
-  uds_path = pathlib.Path(FASTAPI_UDS)
+  uds_path = pathlib.Path(uds or FASTAPI_UDS)
   uds_path.parent.mkdir(parents=True, exist_ok=True)
   with suppress(FileNotFoundError):
     uds_path.unlink()
@@ -133,6 +235,9 @@ async def start_fastapi(*, fastapi_app: ASGIApp) -> uvicorn.Server:
     uds=str(uds_path),
     log_level=os.getenv("UVICORN_LOG_LEVEL", "info"),
     reload=False,
+    # serve() runs on the gateway's loop (GATEWAY_LOOP, see loop_backend.py); don't let
+    # uvicorn install its own event-loop policy.
+    loop="none",
   )
   server = uvicorn.Server(config)
   asyncio.create_task(server.serve())
@@ -142,18 +247,64 @@ async def start_fastapi(*, fastapi_app: ASGIApp) -> uvicorn.Server:
   return server
 
 
-async def start_gateway() -> web.AppRunner:
+async def start_gateway(
+  *,
+  upstream_client: httpx.AsyncClient | None = None,
+  asgi_app: ASGIApp | None = None,
+  host: str = GATEWAY_HOST,
+  port: int = GATEWAY_PORT,
+  reuse_port: bool = False,
+) -> web.AppRunner:
+  """Start the public aiohttp server.
+
+  HTTP goes in-process to `asgi_app` when given, otherwise through `upstream_client` (UDS).
+  `reuse_port` binds with SO_REUSEPORT so several worker processes can share the port.
+  """
+  if asgi_app is None and upstream_client is None:
+    raise ValueError("start_gateway needs upstream_client (uds mode) or asgi_app (asgi mode)")
   app = web.Application()
+  if upstream_client is not None:
+    app[UPSTREAM_CLIENT_KEY] = upstream_client
+  if asgi_app is not None:
+    app[ASGI_APP_KEY] = asgi_app
   app.router.add_get(MEDIA_WS_PATH, ws_media)
+  app.router.add_get(METRICS_PATH, metrics_handler)
   app.router.add_route("*", "/{tail:.*}", gateway_handler)
   runner = web.AppRunner(app)
   await runner.setup()
-  site = web.TCPSite(runner, host=GATEWAY_HOST, port=GATEWAY_PORT)
+  site = web.TCPSite(runner, host=host, port=port, reuse_port=reuse_port or None)
   await site.start()
   return runner
 
 
-async def main(*, fastapi_app: ASGIApp):
+def _worker_uds(worker_id: int) -> str:
+  # One UDS per worker next to FASTAPI_UDS: fastapi.sock -> fastapi-w0.sock, ...
+  p = pathlib.Path(FASTAPI_UDS)
+  return str(p.with_name(f"{p.stem}-w{worker_id}{p.suffix}"))
+
+
+async def _report_status(worker_id: int, status_queue) -> None:
+  """Periodically push this worker's status to the supervisor (gateway_supervisor.py)."""
+  from gateway_supervisor import STATUS_INTERVAL_S
+
+  started = time.monotonic()
+  while True:
+    with suppress(Exception):
+      status_queue.put_nowait(
+        {
+          "worker": worker_id,
+          "pid": os.getpid(),
+          "ts": time.time(),
+          "uptimeS": round(time.monotonic() - started, 1),
+          "activeCalls": metrics.ACTIVE_CALLS.value,
+          "callsTotal": metrics.CALLS_TOTAL.value,
+          "accepting": admission.ADMISSION.accepting(),
+        }
+      )
+    await asyncio.sleep(STATUS_INTERVAL_S)
+
+
+async def main(*, fastapi_app: ASGIApp, worker_id: int | None = None, status_queue=None):
   # Log audio/resampler configuration on the common entrypoint (gateway).
   # (acs_media_ws_server.py's main() is not executed when used as an imported handler.)
   try:
@@ -161,52 +312,101 @@ async def main(*, fastapi_app: ASGIApp):
   except Exception:
     pass
 
-  print(
+  uds_path = FASTAPI_UDS if worker_id is None else _worker_uds(worker_id)
+  log(
     "Unified gateway starting",
     {
       "public": PUBLIC_HOST,
       "gateway": f"http://{GATEWAY_HOST}:{GATEWAY_PORT}",
-      "fastapi": f"uds://{FASTAPI_UDS}",
+      "worker": worker_id,
+      "fastapi": f"uds://{uds_path}" if FASTAPI_MODE == "uds" else "asgi://in-process",
       "mediaPath": MEDIA_WS_PATH,
+      "loop": loop_backend.describe(),
+      "admission": {
+        "maxCalls": admission.MAX_CALLS or None,
+        "maxLoopLagMs": admission.MAX_LOOP_LAG_MS or None,
+        "deferMs": admission.DEFER_MS,
+      },
+      "upstream": {
+        "maxConnections": UPSTREAM_MAX_CONNECTIONS,
+        "maxKeepalive": UPSTREAM_MAX_KEEPALIVE,
+        "keepaliveExpiryS": UPSTREAM_KEEPALIVE_EXPIRY_S,
+        "timeoutS": UPSTREAM_READ_TIMEOUT_S,
+      },
     },
   )
 
   fastapi_server = None
   gateway_runner = None
+  upstream_client = None
+  lifespan = None
+  status_task = None
 
   try:
-    fastapi_server = await start_fastapi(fastapi_app=fastapi_app)
+    # Warm AOAI sessions in the background while the servers come up.
+    _start_aoai_session_pool()
+    if FASTAPI_MODE == "asgi":
+      lifespan = asgi_bridge.AsgiLifespan(fastapi_app)
+      await lifespan.startup()
+    else:
+      fastapi_server = await start_fastapi(fastapi_app=fastapi_app, uds=uds_path)
+      upstream_client = create_upstream_client(uds_path=uds_path)
     try:
-      gateway_runner = await start_gateway()
+      gateway_runner = await start_gateway(
+        upstream_client=upstream_client,
+        asgi_app=fastapi_app if FASTAPI_MODE == "asgi" else None,
+        reuse_port=worker_id is not None,
+      )
     except OSError as e:
       if getattr(e, "errno", None) == 98:  # EADDRINUSE
-        print(
+        log(
           "ERROR: gateway port already in use",
           {
             "host": GATEWAY_HOST,
             "port": GATEWAY_PORT,
             "hint": "Stop the process using the port, or set GATEWAY_PORT to another value.",
           },
+          level="error",
         )
       raise
 
+    loop_monitor.start()
+    if status_queue is not None:
+      status_task = asyncio.create_task(_report_status(worker_id or 0, status_queue))
     await asyncio.Future()
   finally:
+    loop_monitor.stop()
+    if status_task is not None:
+      status_task.cancel()
     if gateway_runner is not None:
       with suppress(Exception):
         await gateway_runner.cleanup()
+    if upstream_client is not None:
+      with suppress(Exception):
+        await upstream_client.aclose()
+    if lifespan is not None:
+      with suppress(Exception):
+        await lifespan.shutdown()
+    with suppress(Exception):
+      await _close_aoai_session_pool()
     if fastapi_server is not None:
       # Stop uvicorn
       with suppress(Exception):
         fastapi_server.should_exit = True
     # Clean up the UDS file.
     with suppress(Exception):
-      pathlib.Path(FASTAPI_UDS).unlink()
+      pathlib.Path(uds_path).unlink()
 
 
 def run(*, fastapi_app: ASGIApp) -> None:
+  if GATEWAY_WORKERS > 1:
+    # Each worker re-imports the FastAPI app itself (spawned processes).
+    import gateway_supervisor
+
+    gateway_supervisor.run(GATEWAY_WORKERS, app_ref=GATEWAY_FASTAPI_APP)
+    return
   try:
-    asyncio.run(main(fastapi_app=fastapi_app))
+    loop_backend.run(main(fastapi_app=fastapi_app))
   except KeyboardInterrupt:
     # Normal shutdown
     return